@@ -0,0 +1,77 @@
+"""
+Read-only JSON endpoints for computed sheets, mounted on nicegui's FastAPI app.
+
+    GET /api/characters                 -> names of the known characters
+    GET /api/characters/{name}/sheet    -> the computed sheet, with an ETag
+
+The sheet is JSON, or with `Accept: application/x-pfchar-sheet` the compact
+binary encoding of `pfchar.wire`.
+
+The ETag is the character's fingerprint, so it is the same in every process
+serving the app. Rendered responses are cached against it, so polling an
+unchanged sheet costs a string comparison, and a matching If-None-Match gets a
+304 without a body.
+
+The endpoints are coroutines so FastAPI runs them on the event loop, alongside
+the UI, rather than in its threadpool: the sheet caches and the characters
+aren't locked.
+"""
+
+import json
+from typing import Mapping
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from pfchar.char.character import Character
+from pfchar.sheet import get_sheet, sheet_to_dict
+from pfchar.wire import MEDIA_TYPE, VERSION, encode_sheet
+
+# (character name, media type) -> (etag, rendered body)
+_RESPONSES: dict[tuple[str, str], tuple[str, bytes]] = {}
+
+
+def _render(character: Character, media_type: str = "application/json") -> tuple[str, bytes]:
+    # Each representation has its own ETag, and each version of the binary one.
+    suffix = f".bin{VERSION}" if media_type == MEDIA_TYPE else ""
+    etag = f'"{character.fingerprint}{suffix}"'
+    cached = _RESPONSES.get((character.name, media_type))
+    if cached is not None and cached[0] == etag:
+        return cached
+
+    if media_type == MEDIA_TYPE:
+        body = encode_sheet(get_sheet(character))
+    else:
+        body = json.dumps(
+            {"name": character.name, "sheet": sheet_to_dict(get_sheet(character))},
+            separators=(",", ":"),
+        ).encode()
+    _RESPONSES[character.name, media_type] = (etag, body)
+    return etag, body
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def register_api(app: FastAPI, characters: Mapping[str, Character]) -> None:
+    @app.get("/api/characters")
+    async def list_characters() -> list[str]:
+        return list(characters)
+
+    @app.get("/api/characters/{name}/sheet")
+    async def character_sheet(name: str, request: Request) -> Response:
+        character = characters.get(name)
+        if character is None:
+            raise HTTPException(status_code=404, detail=f"Unknown character {name!r}")
+
+        media_type = "application/json"
+        if MEDIA_TYPE in request.headers.get("accept", ""):
+            media_type = MEDIA_TYPE
+        etag, body = _render(character, media_type)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
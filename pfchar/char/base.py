@@ -30,6 +30,15 @@ class Statistic(enum.StrEnum):
     CHARISMA = "Charisma"
 
 
+# Fixed order of the statistics in statistic vectors.
+STATISTICS = tuple(Statistic)
+STATISTIC_INDEX = {stat: i for i, stat in enumerate(STATISTICS)}
+
+
+def statistic_vector(values: dict[Statistic, int], default: int = 0) -> tuple[int, ...]:
+    return tuple(values.get(stat, default) for stat in STATISTICS)
+
+
 class Save(enum.StrEnum):
     FORTITUDE = "Fortitude"
     REFLEX = "Reflex"
@@ -69,24 +78,114 @@ def stat_modifier(value: int) -> int:
     return (value - 10) // 2
 
 
+class DamageType(enum.StrEnum):
+    # Weapon damage, reduced by damage reduction.
+    PHYSICAL = "Physical"
+    FIRE = "Fire"
+    COLD = "Cold"
+    ELECTRICITY = "Electricity"
+    ACID = "Acid"
+    SONIC = "Sonic"
+
+
+# Fixed order of the damage types in typed damage vectors.
+DAMAGE_TYPES = tuple(DamageType)
+DAMAGE_TYPE_INDEX = {damage_type: i for i, damage_type in enumerate(DAMAGE_TYPES)}
+
+
 @dataclasses.dataclass
 class Dice:
     num: int
     sides: int = 1
     modifier: int = 0
-    # type
+    type: DamageType = DamageType.PHYSICAL
 
     def is_variable(self) -> bool:
         return self.sides > 1
 
 
+class CreatureType(enum.StrEnum):
+    ABERRATION = "Aberration"
+    ANIMAL = "Animal"
+    CONSTRUCT = "Construct"
+    DRAGON = "Dragon"
+    FEY = "Fey"
+    HUMANOID = "Humanoid"
+    MAGICAL_BEAST = "Magical Beast"
+    MONSTROUS_HUMANOID = "Monstrous Humanoid"
+    OOZE = "Ooze"
+    OUTSIDER = "Outsider"
+    PLANT = "Plant"
+    UNDEAD = "Undead"
+    VERMIN = "Vermin"
+
+
+class Alignment(enum.StrEnum):
+    LAWFUL_GOOD = "LG"
+    NEUTRAL_GOOD = "NG"
+    CHAOTIC_GOOD = "CG"
+    LAWFUL_NEUTRAL = "LN"
+    NEUTRAL = "N"
+    CHAOTIC_NEUTRAL = "CN"
+    LAWFUL_EVIL = "LE"
+    NEUTRAL_EVIL = "NE"
+    CHAOTIC_EVIL = "CE"
+
+    def has(self, component: str) -> bool:
+        """Whether the alignment is eg, "Lawful" or "Evil".
+
+        "Neutral" is neutral on either axis, so "LN" and "NE" have it as well
+        as "N".
+        """
+        return component[0] in self.value
+
+
+# Creatures which take no nonlethal or precision damage.
+NONLETHAL_IMMUNE = frozenset({CreatureType.CONSTRUCT, CreatureType.UNDEAD})
+PRECISION_IMMUNE = frozenset({CreatureType.OOZE})
+
+
+@dataclasses.dataclass(frozen=True)
+class Target:
+    """Who is being attacked, for effects which depend on it."""
+
+    name: str = "Target"
+    creature_type: CreatureType | None = None
+    alignment: Alignment | None = None
+    flanked: bool = False
+    flat_footed: bool = False
+
+    @property
+    def key(self) -> str:
+        """The target's profile as a string, the same for equal targets."""
+        return "|".join(
+            (
+                self.creature_type or "",
+                self.alignment or "",
+                "flanked" if self.flanked else "",
+                "flat-footed" if self.flat_footed else "",
+            )
+        )
+
+    def takes_nonlethal_damage(self) -> bool:
+        return self.creature_type not in NONLETHAL_IMMUNE
+
+    def takes_precision_damage(self) -> bool:
+        return self.creature_type not in PRECISION_IMMUNE
+
+
 class Condition:
-    def __call__(self, character: "Character") -> bool:
+    # Conditions get the target being attacked, or None for a sheet without a
+    # target, in which case conditions on the target are taken to hold.
+    # `uses_target` is set by conditions which look at it.
+    uses_target = False
+
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
         raise NotImplementedError
 
 
 class NullCondition(Condition):
-    def __call__(self, character: "Character") -> bool:
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
         return True
 
 
@@ -97,6 +196,21 @@ class CriticalBonus:
     damage_bonus: list[Dice] = dataclasses.field(default_factory=list)
 
 
+@dataclasses.dataclass(frozen=True)
+class Attack:
+    """One attack of a full attack, see `Character.full_attack`."""
+
+    weapon: str
+    bonus: int
+    # Weapon dice and flat modifiers, multiplied on a critical hit.
+    damage: tuple[Dice, ...]
+    # Extra dice (eg, flaming, sneak attack) which are not multiplied.
+    extra_damage: tuple[Dice, ...] = ()
+    critical: CriticalBonus = CriticalBonus()
+    # "main", "off" (off hand) or "extra" (eg, natural attacks).
+    hand: str = "main"
+
+
 @dataclasses.dataclass
 class Effect:
     name: str
@@ -105,6 +219,13 @@ class Effect:
     def statistic_bonus(self, character: "Character", statistic: Statistic) -> int:
         return 0
 
+    def statistic_vector(self, character: "Character") -> tuple[int, ...]:
+        """`statistic_bonus` for every statistic, in `STATISTICS` order.
+
+        Subclasses with fixed bonuses override this to skip the per statistic calls.
+        """
+        return tuple(self.statistic_bonus(character, stat) for stat in STATISTICS)
+
     def statistic_modifier_bonus(
         self, character: "Character", statistic: Statistic, mult: float = 1.0
     ) -> int:
@@ -0,0 +1,361 @@
+"""
+A data driven catalog of effects, as an alternative to one-off Effect subclasses.
+
+Each entry is a dict (usually loaded from JSON) which is compiled once at load
+time. Constant bonuses are folded into plain values so evaluating them doesn't
+go through any of the generic `Effect` machinery.
+
+    {
+        "name": "Power Attack",
+        "kind": "feat",                       # feat, item, ability, enchantment or status
+        "condition": {"toggle": false},       # or {"weapon_type": "Hammer"},
+                                              # {"creature_type": "Undead"} or
+                                              # {"alignment": "Evil"} of the target
+        "attack": {"of": "bab", "base": -1, "every": 4, "step": -1},
+        "damage": {"of": "bab", "base": 2, "every": 4, "step": 2},
+        "two_handed_multiplier": 1.5,
+    }
+
+Other fields: "statistics" ({"Strength": 4}), "armour_class" ({"Deflection": 2}),
+"max_dex_bonus", "saves" ({"Will": 2} or {"All": 1}), "damage_dice" (list of
+{"num", "sides", "modifier", "type"}, the type "Physical" unless given) and
+"critical" ({"range": "double" or 19, "multiplier": 1, "damage": [dice],
+"burst": 10}, burst dice having the type of the first damage dice).
+
+Scaled values are `base + step * (max(0, value - after) // every)`, capped at
+"max" if given, where value is the character's "level" or "bab".
+"""
+
+import dataclasses
+import json
+import pathlib
+from typing import Iterable, Mapping
+
+from pfchar.char.base import (
+    ACType,
+    Condition,
+    CreatureType,
+    CriticalBonus,
+    DamageType,
+    Dice,
+    Effect,
+    NullCondition,
+    STATISTICS,
+    Save,
+    Statistic,
+    WeaponType,
+    statistic_vector,
+)
+from pfchar.char.conditions import (
+    AlignmentCondition,
+    CreatureTypeCondition,
+    EnabledCondition,
+    WeaponTypeCondition,
+)
+
+DEFAULT_CATALOG_PATH = pathlib.Path(__file__).parent.parent / "data" / "effects.json"
+
+KINDS = ("feat", "item", "ability", "enchantment", "status")
+CONDITIONS = {"toggle", "weapon_type", "creature_type", "alignment"}
+ALIGNMENT_COMPONENTS = ("Lawful", "Chaotic", "Good", "Evil")
+ALL_SAVES = "All"
+
+_FIELDS = {
+    "name",
+    "kind",
+    "condition",
+    "attack",
+    "damage",
+    "damage_dice",
+    "two_handed_multiplier",
+    "statistics",
+    "armour_class",
+    "max_dex_bonus",
+    "saves",
+    "critical",
+}
+_SCALING_FIELDS = {"of", "base", "step", "every", "after", "max"}
+_CRITICAL_FIELDS = {"range", "multiplier", "damage", "burst"}
+
+
+class CatalogError(ValueError):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Scaling:
+    of: str
+    base: int = 0
+    step: int = 1
+    every: int = 1
+    after: int = 0
+    max: int | None = None
+
+    def __call__(self, character) -> int:
+        value = character.level if self.of == "level" else character.base_attack_bonus
+        result = self.base + self.step * (max(0, value - self.after) // self.every)
+        if self.max is not None:
+            result = min(result, self.max)
+        return result
+
+
+@dataclasses.dataclass(frozen=True)
+class CriticalModifier:
+    # "double" or the lowest roll that threatens.
+    crit_range: str | int | None = None
+    multiplier: int = 0
+    damage: tuple[Dice, ...] = ()
+    # Sides of the extra dice per multiplier above x1, eg, flaming burst.
+    burst: int | None = None
+    burst_type: DamageType = DamageType.PHYSICAL
+
+    def __call__(self, critical_bonus: CriticalBonus) -> CriticalBonus:
+        crit_range = critical_bonus.crit_range
+        if self.crit_range == "double":
+            crit_range = 21 - (21 - crit_range) * 2
+        elif self.crit_range is not None:
+            crit_range = min(crit_range, self.crit_range)
+        damage = critical_bonus.damage_bonus + list(self.damage)
+        if self.burst:
+            damage.append(
+                Dice(
+                    num=critical_bonus.crit_multiplier - 1,
+                    sides=self.burst,
+                    type=self.burst_type,
+                )
+            )
+        return CriticalBonus(
+            crit_range=crit_range,
+            crit_multiplier=critical_bonus.crit_multiplier + self.multiplier,
+            damage_bonus=damage,
+        )
+
+
+class CatalogEffect(Effect):
+    """An effect compiled from a catalog entry, see `CatalogEntry.create`."""
+
+    def __init__(self, entry: "CatalogEntry", condition: Condition):
+        super().__init__(name=entry.name, condition=condition)
+        self.kind = entry.kind
+        self._entry = entry
+        if entry.max_dex_bonus is not None:
+            self.max_dex_bonus = entry.max_dex_bonus
+
+    def statistic_bonus(self, character, statistic: Statistic) -> int:
+        return self._entry.statistics.get(statistic, 0)
+
+    def statistic_vector(self, character) -> tuple[int, ...]:
+        return self._entry.statistic_vector
+
+    def attack_bonus(self, character) -> int:
+        entry = self._entry
+        bonus = entry.attack if isinstance(entry.attack, int) else entry.attack(character)
+        if entry.statistics:
+            bonus += super().attack_bonus(character)
+        return bonus
+
+    def damage_bonus(self, character) -> list[Dice]:
+        entry = self._entry
+        if entry.constant_damage is not None:
+            return list(entry.constant_damage)
+
+        value = entry.damage if isinstance(entry.damage, int) else entry.damage(character)
+        if entry.two_handed_multiplier != 1 and character.is_two_handed():
+            value = int(value * entry.two_handed_multiplier)
+        if entry.statistics:
+            bonus = super().damage_bonus(character)
+            value += sum(dice.num for dice in bonus)
+        dice = list(entry.damage_dice)
+        if value:
+            dice.append(Dice(value))
+        return dice
+
+    def critical_bonus(self, character, critical_bonus: CriticalBonus) -> CriticalBonus:
+        if self._entry.critical is None:
+            return critical_bonus
+        return self._entry.critical(critical_bonus)
+
+    def armour_class_bonus(self, character) -> dict[ACType, int]:
+        return dict(self._entry.armour_class)
+
+    def saves_bonuses(self, character) -> dict[Save, int]:
+        return dict(self._entry.saves)
+
+
+@dataclasses.dataclass(frozen=True)
+class CatalogEntry:
+    name: str
+    kind: str
+    condition: dict
+    attack: int | Scaling = 0
+    damage: int | Scaling = 0
+    damage_dice: tuple[Dice, ...] = ()
+    two_handed_multiplier: float = 1.0
+    statistics: dict[Statistic, int] = dataclasses.field(default_factory=dict)
+    armour_class: dict[ACType, int] = dataclasses.field(default_factory=dict)
+    max_dex_bonus: int | None = None
+    saves: dict[Save, int] = dataclasses.field(default_factory=dict)
+    critical: CriticalModifier | None = None
+    # Damage that doesn't depend on the character, folded at compile time.
+    constant_damage: tuple[Dice, ...] | None = None
+    # `statistics` in STATISTICS order.
+    statistic_vector: tuple[int, ...] = (0,) * len(STATISTICS)
+
+    def create(self) -> CatalogEffect:
+        """A new instance of the effect, with its own condition state."""
+        if "toggle" in self.condition:
+            condition = EnabledCondition(self.condition["toggle"])
+        elif "weapon_type" in self.condition:
+            condition = WeaponTypeCondition(WeaponType(self.condition["weapon_type"]))
+        elif "creature_type" in self.condition:
+            condition = CreatureTypeCondition(CreatureType(self.condition["creature_type"]))
+        elif "alignment" in self.condition:
+            condition = AlignmentCondition(self.condition["alignment"])
+        else:
+            condition = NullCondition()
+        return CatalogEffect(self, condition)
+
+
+def _scaling(name: str, value: object) -> int | Scaling:
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, Mapping) or value.get("of") not in ("level", "bab"):
+        raise CatalogError(
+            f"{name}: expected an int or a scaling with 'of' set to level or bab"
+        )
+    if unknown := set(value) - _SCALING_FIELDS:
+        raise CatalogError(f"{name}: unknown scaling fields {sorted(unknown)}")
+    return Scaling(**value)
+
+
+def _dice(name: str, values: Iterable[Mapping]) -> tuple[Dice, ...]:
+    try:
+        return tuple(
+            Dice(**{**value, "type": DamageType(value.get("type", DamageType.PHYSICAL))})
+            for value in values
+        )
+    except (TypeError, ValueError) as e:
+        raise CatalogError(f"{name}: invalid dice ({e})") from None
+
+
+def _enum_mapping(name: str, enum_type, values: Mapping[str, int]) -> dict:
+    try:
+        return {enum_type(key): value for key, value in values.items()}
+    except ValueError as e:
+        raise CatalogError(f"{name}: {e}") from None
+
+
+def compile_entry(data: Mapping) -> CatalogEntry:
+    name = data.get("name")
+    if not name:
+        raise CatalogError(f"Catalog entry without a name: {data!r}")
+    if unknown := set(data) - _FIELDS:
+        raise CatalogError(f"{name}: unknown fields {sorted(unknown)}")
+    kind = data.get("kind", "status")
+    if kind not in KINDS:
+        raise CatalogError(f"{name}: kind must be one of {KINDS}, not {kind!r}")
+
+    condition = dict(data.get("condition", {}))
+    if len(condition) > 1 or set(condition) - CONDITIONS:
+        raise CatalogError(f"{name}: condition must be one of {sorted(CONDITIONS)}")
+    if "weapon_type" in condition:
+        _enum_mapping(name, WeaponType, {condition["weapon_type"]: 0})
+    if "creature_type" in condition:
+        _enum_mapping(name, CreatureType, {condition["creature_type"]: 0})
+    if condition.get("alignment", ALIGNMENT_COMPONENTS[0]) not in ALIGNMENT_COMPONENTS:
+        raise CatalogError(f"{name}: alignment must be one of {ALIGNMENT_COMPONENTS}")
+
+    saves = dict(data.get("saves", {}))
+    if ALL_SAVES in saves:
+        everything = saves.pop(ALL_SAVES)
+        saves = {save.value: everything for save in Save} | saves
+
+    armour_class = _enum_mapping(name, ACType, data.get("armour_class", {}))
+    if ACType.ENHANCEMENT in armour_class and not (
+        {ACType.ARMOR, ACType.SHIELD} & set(armour_class)
+    ):
+        raise CatalogError(f"{name}: an enhancement bonus must apply to armor or shield")
+
+    damage_dice = _dice(name, data.get("damage_dice", ()))
+    critical = None
+    if (crit := data.get("critical")) is not None:
+        if unknown := set(crit) - _CRITICAL_FIELDS:
+            raise CatalogError(f"{name}: unknown critical fields {sorted(unknown)}")
+        critical = CriticalModifier(
+            crit_range=crit.get("range"),
+            multiplier=crit.get("multiplier", 0),
+            damage=_dice(name, crit.get("damage", ())),
+            burst=crit.get("burst"),
+            burst_type=damage_dice[0].type if damage_dice else DamageType.PHYSICAL,
+        )
+
+    damage = _scaling(name, data.get("damage", 0))
+    two_handed_multiplier = data.get("two_handed_multiplier", 1.0)
+    statistics = _enum_mapping(name, Statistic, data.get("statistics", {}))
+    constant_damage = None
+    if isinstance(damage, int) and not statistics and two_handed_multiplier == 1:
+        constant_damage = damage_dice + ((Dice(damage),) if damage else ())
+
+    return CatalogEntry(
+        name=name,
+        kind=kind,
+        condition=condition,
+        attack=_scaling(name, data.get("attack", 0)),
+        damage=damage,
+        damage_dice=damage_dice,
+        two_handed_multiplier=two_handed_multiplier,
+        statistics=statistics,
+        armour_class=armour_class,
+        max_dex_bonus=data.get("max_dex_bonus"),
+        saves=_enum_mapping(name, Save, saves),
+        critical=critical,
+        constant_damage=constant_damage,
+        statistic_vector=statistic_vector(statistics),
+    )
+
+
+class Catalog:
+    def __init__(self, entries: Iterable[CatalogEntry] = ()):
+        self.entries: dict[str, CatalogEntry] = {}
+        for entry in entries:
+            if entry.name in self.entries:
+                raise CatalogError(f"Duplicate catalog entry {entry.name!r}")
+            self.entries[entry.name] = entry
+
+    @classmethod
+    def from_data(cls, data: Iterable[Mapping]) -> "Catalog":
+        return cls(compile_entry(item) for item in data)
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> "Catalog":
+        with open(path) as f:
+            return cls.from_data(json.load(f))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def names(self, kind: str | None = None) -> list[str]:
+        return [
+            name
+            for name, entry in self.entries.items()
+            if kind is None or entry.kind == kind
+        ]
+
+    def create(self, name: str) -> CatalogEffect:
+        try:
+            return self.entries[name].create()
+        except KeyError:
+            raise CatalogError(f"Unknown catalog entry {name!r}") from None
+
+
+_DEFAULT_CATALOG: Catalog | None = None
+
+
+def default_catalog() -> Catalog:
+    global _DEFAULT_CATALOG
+    if _DEFAULT_CATALOG is None:
+        _DEFAULT_CATALOG = Catalog.load(DEFAULT_CATALOG_PATH)
+    return _DEFAULT_CATALOG
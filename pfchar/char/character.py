@@ -2,18 +2,36 @@ import dataclasses
 
 from pfchar.char.base import (
     BAB_KEY,
+    STATISTIC_INDEX,
+    STATISTICS,
     stat_modifier,
     ACType,
+    Attack,
     CriticalBonus,
     Dice,
     Effect,
     Save,
     Size,
     Statistic,
+    Target,
 )
 from pfchar.char.feats import Feat
+from pfchar.char.fingerprint import MASK, digest, ordered_digest
 from pfchar.char.items import Item, Weapon
 from pfchar.char.abilities import Ability
+from pfchar.utils import iterative_attacks
+
+# Character attributes holding lists of effects.
+EFFECT_ATTRIBUTES = ("abilities", "feats", "items", "statuses")
+
+TWO_WEAPON_FIGHTING = "Two-Weapon Fighting"
+# Feats giving a further off hand attack each, at -5 per attack.
+EXTRA_OFF_HAND_ATTACKS = (
+    "Improved Two-Weapon Fighting",
+    "Greater Two-Weapon Fighting",
+)
+# Attacks with weapons among the items (eg, natural attacks) are secondary.
+SECONDARY_ATTACK_PENALTY = -5
 
 
 @dataclasses.dataclass
@@ -41,8 +59,152 @@ class Character:
     statuses: list[Effect] = dataclasses.field(default_factory=list)
     _two_handed: bool = False
 
+    # The fingerprint identifies the character's content: two characters with
+    # the same fields, effects and condition states have the same fingerprint,
+    # in any process. It is kept up to date as attributes are assigned and
+    # through the effect methods below; anything editing an effect in place
+    # must call `refresh_fingerprint` afterwards. In place edits of the
+    # statistics and base saves dicts are picked up when the fingerprint is
+    # read, by comparing them with their contents when they were last hashed.
+    #
+    # Each field, and each effect in the effect lists, has its own digest and
+    # the fingerprint is their sum, so a mutation only hashes what changed.
+    # An effect list's digests are combined in order, as of two effects with
+    # the same name the later one wins.
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _FINGERPRINTED and "_digests" in self.__dict__:
+            self._set_digest(name, self._part_digest(name))
+
+    @property
+    def fingerprint(self) -> str:
+        if "_digests" not in self.__dict__:
+            self.refresh_fingerprint()
+        else:
+            hashed = self._hashed_dicts
+            if self.statistics != hashed["statistics"]:
+                self._set_digest("statistics", self._part_digest("statistics"))
+            if self.base_saves != hashed["base_saves"]:
+                self._set_digest("base_saves", self._part_digest("base_saves"))
+        return f"{self._fingerprint:032x}"
+
+    def refresh_fingerprint(self) -> None:
+        digests = {name: self._part_digest(name) for name in _FINGERPRINTED}
+        # Digests are only ever replaced, never mutated, so shallow copies of
+        # the character can't change each other's fingerprints.
+        self.__dict__["_digests"] = digests
+        # Each part's contribution to the sum, see `_digest_total`.
+        totals = {name: _digest_total(part) for name, part in digests.items()}
+        self.__dict__["_part_totals"] = totals
+        self.__dict__["_hashed_dicts"] = {
+            name: dict(getattr(self, name)) for name in _DICT_FIELDS
+        }
+        self.__dict__["_fingerprint"] = sum(totals.values()) & MASK
+
+    def _part_digest(self, name: str) -> int | tuple[int, ...]:
+        value = getattr(self, name)
+        if name in EFFECT_ATTRIBUTES:
+            return tuple(digest(name, effect) for effect in value)
+        return digest(name, value)
+
+    def _set_digest(self, name: str, part: int | tuple[int, ...]) -> None:
+        self.__dict__["_digests"] = self._digests | {name: part}
+        totals = dict(self._part_totals)
+        previous = totals[name]
+        totals[name] = _digest_total(part)
+        self.__dict__["_part_totals"] = totals
+        if name in _DICT_FIELDS:
+            self.__dict__["_hashed_dicts"] = self._hashed_dicts | {
+                name: dict(getattr(self, name))
+            }
+        self.__dict__["_fingerprint"] = (
+            self._fingerprint - previous + totals[name]
+        ) & MASK
+
+    def _effect_digests(self, attribute: str) -> tuple[int, ...]:
+        if "_digests" not in self.__dict__:
+            self.refresh_fingerprint()
+        return self._digests[attribute]
+
+    def _locate(self, effect: Effect) -> tuple[str, int]:
+        for attribute in EFFECT_ATTRIBUTES:
+            for i, candidate in enumerate(getattr(self, attribute)):
+                if candidate is effect:
+                    return attribute, i
+        raise ValueError(f"{effect.name} is not an effect of {self.name}")
+
+    def add_effect(self, effect: Effect, attribute: str = "statuses") -> None:
+        digests = self._effect_digests(attribute)
+        getattr(self, attribute).append(effect)
+        self._set_digest(attribute, digests + (digest(attribute, effect),))
+
+    def remove_effect(self, effect: Effect) -> None:
+        attribute, i = self._locate(effect)
+        digests = self._effect_digests(attribute)
+        del getattr(self, attribute)[i]
+        self._set_digest(attribute, digests[:i] + digests[i + 1 :])
+
+    def set_effects(self, attribute: str, effects: list[Effect]) -> None:
+        """Replace the contents of an effect list in place."""
+        effects = list(effects)
+        current = getattr(self, attribute)
+        known = {
+            id(effect): part
+            for effect, part in zip(current, self._effect_digests(attribute))
+        }
+        current[:] = effects
+        self._set_digest(
+            attribute,
+            tuple(
+                known[id(effect)] if id(effect) in known else digest(attribute, effect)
+                for effect in effects
+            ),
+        )
+
+    def add_status(self, status: Effect) -> None:
+        self.add_effect(status, "statuses")
+
+    def remove_status(self, status: Effect) -> None:
+        self.remove_effect(status)
+
+    def set_toggle(self, effect: Effect, enabled: bool) -> None:
+        attribute, i = self._locate(effect)
+        digests = self._effect_digests(attribute)
+        if effect.condition.enabled == enabled:
+            return
+        effect.condition.enabled = enabled
+        self._set_digest(
+            attribute,
+            digests[:i] + (digest(attribute, effect),) + digests[i + 1 :],
+        )
+
+    def toggle_effect(self, effect: Effect) -> None:
+        self.set_toggle(effect, not effect.condition.enabled)
+
     def all_effects(self) -> list[Effect]:
-        return self.abilities + self.feats + self.statuses + self.items
+        # Weapons among the items make attacks of their own, see `full_attack`,
+        # rather than adding to the main hand's.
+        return (
+            self.abilities
+            + self.feats
+            + self.statuses
+            + [item for item in self.items if not isinstance(item, Weapon)]
+        )
+
+    def extra_weapons(self) -> list[Weapon]:
+        """Weapons among the items, attacking alongside the wielded ones."""
+        return [item for item in self.items if isinstance(item, Weapon)]
+
+    def has_feat(self, name: str) -> bool:
+        return any(feat.name == name for feat in self.feats)
+
+    def toggleable_effects(self) -> list[Effect]:
+        return [
+            effect
+            for effect in self.all_effects()
+            if hasattr(effect.condition, "toggle")
+        ]
 
     def can_be_two_handed(self) -> bool:
         return (
@@ -60,21 +222,49 @@ class Character:
         self._two_handed = not self._two_handed
         return True
 
+    def two_weapon_penalties(self) -> tuple[int, int]:
+        """Attack penalties of the (main hand, off hand) when wielding both."""
+        if self.main_hand is None or self.off_hand is None:
+            return 0, 0
+        light = 2 if self.off_hand.is_light else 0
+        if self.has_feat(TWO_WEAPON_FIGHTING):
+            return -4 + light, -4 + light
+        return -6 + light, -10 + light
+
     def attack_statistic(self) -> Statistic:
         return Statistic.DEXTERITY if self.main_hand.is_ranged else Statistic.STRENGTH
 
-    def modified_statistic(self, stat: Statistic) -> int:
-        original = self.statistics.get(stat, 10)
-        modified = original + sum(
-            effect.statistic_bonus(self, stat) for effect in self.all_effects()
-        )
+    def statistic_vector(self) -> tuple[int, ...]:
+        """Base statistics in `STATISTICS` order."""
+        return tuple(self.statistics.get(stat, 10) for stat in STATISTICS)
+
+    def modified_statistics(self) -> tuple[int, ...]:
+        """Modified statistics in `STATISTICS` order.
+
+        The column sums of the base vector and every effect's statistic vector,
+        remembered against the fingerprint since the sheet asks for them many
+        times over.
+        """
+        fingerprint = self.fingerprint
+        cached = self.__dict__.get("_modified_statistics")
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        vectors = [effect.statistic_vector(self) for effect in self.all_effects()]
+        modified = tuple(map(sum, zip(self.statistic_vector(), *vectors)))
+        self.__dict__["_modified_statistics"] = (fingerprint, modified)
         return modified
 
-    def attack_bonus(self) -> dict[str, int]:
+    def modified_statistic(self, stat: Statistic) -> int:
+        return self.modified_statistics()[STATISTIC_INDEX[stat]]
+
+    # The getters below take the target being attacked, for effects whose
+    # conditions depend on it, see `Target`.
+
+    def attack_bonus(self, target: Target | None = None) -> dict[str, int]:
         modifiers = {
             BAB_KEY: self.base_attack_bonus,
         }
-        if self.main_hand and (enchantment := self.main_hand.attack_bonus(self)):
+        if self.main_hand and (enchantment := self.main_hand.attack_bonus(self, target)):
             modifiers["Weapon Enchantment"] = enchantment
 
         stat = self.attack_statistic()
@@ -82,16 +272,17 @@ class Character:
         modifiers |= {
             effect.name: effect.attack_bonus(self)
             for effect in self.all_effects()
-            if effect.condition(self)
+            if effect.condition(self, target)
         }
+        # After the effects, as the feat of the same name has no bonus itself.
+        modifiers["Two-Weapon Penalty"] = self.two_weapon_penalties()[0]
         return {name: value for name, value in modifiers.items() if value}
 
-    def damage_bonus(self) -> dict[str, list[Dice]]:
+    def damage_bonus(self, target: Target | None = None) -> dict[str, list[Dice]]:
+        """Damage of the main hand, see `full_attack` for the other attacks."""
         modifiers = {
-            self.main_hand.name: self.main_hand.damage_bonus(self),
+            self.main_hand.name: self.main_hand.damage_bonus(self, target),
         }
-        if self.off_hand:
-            modifiers[self.off_hand.name] = self.off_hand.damage_bonus(self)
 
         stat = Statistic.STRENGTH
         strength_mod = stat_modifier(self.statistics[stat])
@@ -102,18 +293,79 @@ class Character:
         modifiers |= {
             effect.name: effect.damage_bonus(self)
             for effect in self.all_effects()
-            if effect.condition(self)
+            if effect.condition(self, target)
         }
         return {name: value for name, value in modifiers.items() if value}
 
-    def critical_bonus(self) -> CriticalBonus:
-        bonus = self.main_hand.critical_bonus(self, None)
+    def critical_bonus(self, target: Target | None = None) -> CriticalBonus:
+        bonus = self.main_hand.critical_bonus(self, None, target)
         for effect in self.all_effects():
-            if effect.condition(self):
+            if effect.condition(self, target):
                 bonus = effect.critical_bonus(self, bonus)
 
         return bonus
 
+    def full_attack(self, target: Target | None = None) -> list[Attack]:
+        """Every attack of a full attack, each with its own bonus, damage and crit.
+
+        The main hand makes its iterative attacks, the off hand one attack plus
+        one per extra attack feat, and weapons among the items one secondary
+        attack each. Off hand and secondary attacks add half the strength
+        modifier to damage. Effects apply to every attack, though those
+        conditioned on a weapon type only look at the main hand.
+        """
+        if self.main_hand is None:
+            return []
+        attack = self.attack_bonus(target)
+        damage = self.damage_bonus(target)
+        main_penalty, off_penalty = self.two_weapon_penalties()
+
+        # Effect damage, split into what a crit multiplies and what it doesn't.
+        del damage[self.main_hand.name]
+        strength = damage.pop(Statistic.STRENGTH.value, [])
+        multiplied, extra = [], []
+        for dice_list in damage.values():
+            for dice in dice_list:
+                (extra if dice.is_variable() else multiplied).append(dice)
+
+        def make_attack(weapon, bonus, strength, critical, hand):
+            weapon_dice = weapon.damage_bonus(self, target)
+            return Attack(
+                weapon=weapon.name,
+                bonus=bonus,
+                damage=(weapon_dice[0], *strength, *multiplied),
+                extra_damage=(*weapon_dice[1:], *extra),
+                critical=critical,
+                hand=hand,
+            )
+
+        critical = self.critical_bonus(target)
+        attacks = [
+            make_attack(self.main_hand, bonus, strength, critical, "main")
+            for bonus in iterative_attacks(attack)
+        ]
+
+        # Other weapons swap the main hand's enchantment and penalty for their own.
+        base = sum(attack.values()) - attack.get("Weapon Enchantment", 0) - main_penalty
+        strength_mod = stat_modifier(self.statistics[Statistic.STRENGTH])
+        half_strength = strength_mod // 2 if strength_mod > 0 else strength_mod
+        strength = [Dice(num=half_strength)] if half_strength else []
+        others = []
+        if self.off_hand is not None:
+            count = 1 + sum(self.has_feat(name) for name in EXTRA_OFF_HAND_ATTACKS)
+            others += [(self.off_hand, "off", off_penalty - 5 * i) for i in range(count)]
+        others += [
+            (weapon, "extra", SECONDARY_ATTACK_PENALTY) for weapon in self.extra_weapons()
+        ]
+        for weapon, hand, penalty in others:
+            critical = weapon.critical_bonus(self, None, target)
+            for effect in self.all_effects():
+                if effect.condition(self, target):
+                    critical = effect.critical_bonus(self, critical)
+            bonus = base + weapon.attack_bonus(self, target) + penalty
+            attacks.append(make_attack(weapon, bonus, strength, critical, hand))
+        return attacks
+
     def armour_bonuses(self) -> dict[ACType, int]:
         bonuses = {ac_type: 0 for ac_type in ACType}
         bonuses[ACType.SIZE] = -self.size.value
@@ -199,7 +451,7 @@ class Character:
         }
         return {name: value for name, value in modifiers.items() if value}
 
-    def get_saves(self) -> dict[Save, dict[str, int]]:
+    def get_saves(self, target: Target | None = None) -> dict[Save, dict[str, int]]:
         mapping = {
             Save.FORTITUDE: Statistic.CONSTITUTION,
             Save.REFLEX: Statistic.DEXTERITY,
@@ -216,8 +468,17 @@ class Character:
         }
 
         for effect in self.all_effects():
-            if effect.condition(self):
+            if effect.condition(self, target):
                 for save, value in effect.saves_bonuses(self).items():
                     saves[save][effect.name] = value
 
         return saves
+
+
+_FINGERPRINTED = frozenset(field.name for field in dataclasses.fields(Character))
+# Fields which are dicts, so can be edited in place without an assignment.
+_DICT_FIELDS = ("statistics", "base_saves")
+
+
+def _digest_total(part: int | tuple[int, ...]) -> int:
+    return ordered_digest(part) if isinstance(part, tuple) else part
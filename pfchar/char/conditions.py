@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from pfchar.char.base import Condition, WeaponType
+from pfchar.char.base import Condition, CreatureType, Target, WeaponType
 
 if TYPE_CHECKING:
     from pfchar.char.character import Character
@@ -10,7 +10,7 @@ class EnabledCondition(Condition):
     def __init__(self, enabled: bool = False):
         self.enabled = enabled
 
-    def __call__(self, character: "Character") -> bool:
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
         return self.enabled
 
     def toggle(self):
@@ -21,6 +21,50 @@ class WeaponTypeCondition(Condition):
     def __init__(self, weapon_type: WeaponType):
         self.weapon_type = weapon_type
 
-    def __call__(self, character: "Character") -> bool:
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
         main_hand = character.main_hand
         return main_hand is not None and main_hand.type == self.weapon_type
+
+
+class CreatureTypeCondition(Condition):
+    uses_target = True
+
+    def __init__(self, creature_type: CreatureType):
+        self.creature_type = creature_type
+
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
+        return target is None or target.creature_type == self.creature_type
+
+
+class AlignmentCondition(Condition):
+    """The target's alignment has a component, eg, "Evil"."""
+
+    uses_target = True
+
+    def __init__(self, component: str):
+        self.component = component
+
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
+        return target is None or (
+            target.alignment is not None and target.alignment.has(self.component)
+        )
+
+
+class VulnerableTargetCondition(Condition):
+    """The target is flanked or flat-footed, and takes precision damage."""
+
+    uses_target = True
+
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
+        return target is None or (
+            (target.flanked or target.flat_footed) and target.takes_precision_damage()
+        )
+
+
+class NonlethalCondition(Condition):
+    """The target takes nonlethal damage."""
+
+    uses_target = True
+
+    def __call__(self, character: "Character", target: Target | None = None) -> bool:
+        return target is None or target.takes_nonlethal_damage()
@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
-from pfchar.char.base import CriticalBonus, Dice, Effect
+from pfchar.char.base import CriticalBonus, DamageType, Dice, Effect
+from pfchar.char.conditions import NonlethalCondition, VulnerableTargetCondition
 
 if TYPE_CHECKING:
     from pfchar.char.character import Character
@@ -19,7 +20,7 @@ class FlamingBurst(WeaponEnchantment):
     def __init__(self):
         super().__init__(
             name="Flaming Burst",
-            damage_dice=[Dice(num=1, sides=6)],
+            damage_dice=[Dice(num=1, sides=6, type=DamageType.FIRE)],
         )
 
     def critical_bonus(self, character: "Character", critical_bonus) -> CriticalBonus:
@@ -28,7 +29,13 @@ class FlamingBurst(WeaponEnchantment):
             crit_multiplier=critical_bonus.crit_multiplier,
             damage_bonus=(
                 critical_bonus.damage_bonus
-                + [Dice(num=critical_bonus.crit_multiplier - 1, sides=10)]
+                + [
+                    Dice(
+                        num=critical_bonus.crit_multiplier - 1,
+                        sides=10,
+                        type=DamageType.FIRE,
+                    )
+                ]
             ),
         )
 
@@ -38,6 +45,7 @@ class Merciful(WeaponEnchantment):
             name="Merciful",
             damage_dice=[Dice(num=1, sides=6)]
         )
+        self.condition = NonlethalCondition()
 
 class Sneaky(WeaponEnchantment):
     def __init__(self):
@@ -45,3 +53,5 @@ class Sneaky(WeaponEnchantment):
             name="Sneaky",
             damage_dice=[Dice(num=7, sides=6)]
         )
+        # Works like sneak attack.
+        self.condition = VulnerableTargetCondition()
@@ -0,0 +1,91 @@
+"""
+Content digests of character parts, for `Character.fingerprint`.
+
+A value is hashed by its content (type, fields and condition state) rather than
+its identity, so equal characters get equal fingerprints in every process.
+Values of any other type raise TypeError rather than falling back to `repr`,
+which may hold memory addresses. The character combines per-part digests by
+addition modulo 2**128, which lets a single part be swapped out without
+rehashing the rest.
+"""
+
+import dataclasses
+import enum
+import hashlib
+import threading
+from typing import Sequence
+
+BITS = 128
+MASK = (1 << BITS) - 1
+
+# Encodings of frozen dataclasses (eg, catalog entries shared by every effect
+# created from them), by id. The object is kept alongside so the id can't be
+# reused while the entry exists. Characters are hashed from the threads
+# precomputing sheets too (see pfchar.toggles), hence the lock.
+_FROZEN: dict[int, tuple[object, bytes]] = {}
+_FROZEN_LIMIT = 4096
+_FROZEN_LOCK = threading.Lock()
+
+
+def _encode(value: object, out: list[bytes]) -> None:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        out.append(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, enum.Enum):
+        out.append(f"{type(value).__qualname__}.{value.name};".encode())
+    elif isinstance(value, (list, tuple)):
+        out.append(b"[")
+        for item in value:
+            _encode(item, out)
+        out.append(b"]")
+    elif isinstance(value, dict):
+        # Sorted by the encoded key, so insertion order doesn't matter.
+        items = []
+        for key, item in value.items():
+            pair: list[bytes] = []
+            _encode(key, pair)
+            _encode(item, pair)
+            items.append(b"".join(pair))
+        out.append(b"{" + b"".join(sorted(items)) + b"}")
+    elif (
+        dataclasses.is_dataclass(value)
+        and type(value).__dataclass_params__.frozen
+    ):
+        with _FROZEN_LOCK:
+            cached = _FROZEN.get(id(value))
+        if cached is None:
+            encoded: list[bytes] = []
+            _encode_object(value, encoded)
+            cached = (value, b"".join(encoded))
+            with _FROZEN_LOCK:
+                if len(_FROZEN) >= _FROZEN_LIMIT:
+                    _FROZEN.clear()
+                _FROZEN[id(value)] = cached
+        out.append(cached[1])
+    elif hasattr(value, "__dict__"):
+        # Dataclasses, effects and conditions, including their private state.
+        _encode_object(value, out)
+    else:
+        raise TypeError(f"Can't fingerprint a {type(value).__qualname__}")
+
+
+def _encode_object(value: object, out: list[bytes]) -> None:
+    cls = type(value)
+    out.append(f"<{cls.__module__}.{cls.__qualname__}".encode())
+    _encode(vars(value), out)
+    out.append(b">")
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=BITS // 8).digest(), "big")
+
+
+def digest(*parts: object) -> int:
+    out: list[bytes] = []
+    for part in parts:
+        _encode(part, out)
+    return _hash(b"".join(out))
+
+
+def ordered_digest(digests: Sequence[int]) -> int:
+    """The digest of a sequence of digests, which depends on their order."""
+    return _hash(b"".join(value.to_bytes(BITS // 8, "big") for value in digests))
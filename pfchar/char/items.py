@@ -8,7 +8,9 @@ from pfchar.char.base import (
     Effect,
     Save,
     Statistic,
+    Target,
     WeaponType,
+    statistic_vector,
 )
 from pfchar.char.enchantments import WeaponEnchantment
 
@@ -29,6 +31,9 @@ class StatisticModifyingItem(Item):
     def statistic_bonus(self, character, stat):
         return self.stats.get(stat, 0)
 
+    def statistic_vector(self, character):
+        return statistic_vector(self.stats)
+
 
 @dataclasses.dataclass(kw_only=True)
 class Weapon(Item):
@@ -36,13 +41,21 @@ class Weapon(Item):
     base_damage: Dice
     critical: CriticalBonus = dataclasses.field(default_factory=CriticalBonus)
     is_ranged: bool = False
+    # Light weapons in the off hand halve the two weapon fighting penalties.
+    is_light: bool = False
     enchantment_modifier: int = 0
     enchantments: list[WeaponEnchantment] = dataclasses.field(default_factory=list)
 
-    def attack_bonus(self, character: "Character") -> int:
-        return self.enchantment_modifier
+    def attack_bonus(self, character: "Character", target: Target | None = None) -> int:
+        return self.enchantment_modifier + sum(
+            enchantment.attack_bonus(character)
+            for enchantment in self.enchantments
+            if enchantment.condition(character, target)
+        )
 
-    def damage_bonus(self, character: "Character") -> list[Dice]:
+    def damage_bonus(
+        self, character: "Character", target: Target | None = None
+    ) -> list[Dice]:
         return [
             Dice(
                 self.base_damage.num,
@@ -52,16 +65,19 @@ class Weapon(Item):
         ] + [
             dice
             for enchantment in self.enchantments
-            if enchantment.condition(character)
+            if enchantment.condition(character, target)
             for dice in enchantment.damage_bonus(character)
         ]
 
     def critical_bonus(
-        self, character: "Character", critical_bonus: "CriticalBonus"
+        self,
+        character: "Character",
+        critical_bonus: "CriticalBonus",
+        target: Target | None = None,
     ) -> CriticalBonus:
         bonus = self.critical
         for enchantment in self.enchantments:
-            if enchantment.condition(character):
+            if enchantment.condition(character, target):
                 bonus = enchantment.critical_bonus(character, bonus)
         return bonus
 
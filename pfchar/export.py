@@ -0,0 +1,314 @@
+"""
+Printable static HTML sheets for a whole roster.
+
+    python -m pfchar.export handouts/                        # the premade characters
+    python -m pfchar.export handouts/ --db characters.db --campaign Runelords
+
+Each character gets one page with its computed attack, damage, critical, AC,
+CMB/CMD and saves, plus an index page linking them all. `manifest.json` in the
+output directory records the fingerprint (see `Character.fingerprint`) each
+sheet was rendered from, and a later export only re-renders the characters
+whose fingerprint changed. With a repository, the unchanged ones are skipped
+by their stored fingerprint without being loaded at all.
+
+Rendering is spread over a process pool in small batches. Each worker writes
+its sheets as it finishes them and the manifest is rewritten after every
+batch, so an interrupted export keeps what it had done.
+"""
+
+import argparse
+import dataclasses
+import html
+import json
+import os
+import pathlib
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable
+
+from pfchar.char.character import Character
+from pfchar.sheet import Sheet, compute_sheet
+from pfchar.utils import crit_to_string, sum_up_dice
+
+# Bump when the page layout changes, to re-render every sheet.
+RENDER_VERSION = 2
+MANIFEST = "manifest.json"
+INDEX = "index.html"
+DEFAULT_BATCH_SIZE = 16
+
+STYLE = """
+body { font-family: Georgia, serif; margin: 2em; color: #111; }
+h1 { margin-bottom: 0.2em; }
+section { break-inside: avoid; margin-bottom: 1em; }
+table { border-collapse: collapse; min-width: 18em; }
+th, td { border: 1px solid #999; padding: 0.15em 0.6em; text-align: left; }
+td.value { text-align: right; }
+.total { font-size: 1.2em; font-weight: bold; }
+@media print { body { margin: 0; } a { color: inherit; text-decoration: none; } }
+"""
+
+
+@dataclasses.dataclass
+class ExportReport:
+    rendered: list[str] = dataclasses.field(default_factory=list)
+    unchanged: int = 0
+    removed: list[str] = dataclasses.field(default_factory=list)
+    # (character name, reason) of sheets which couldn't be computed.
+    errors: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [
+            f"Rendered {len(self.rendered)} sheets, {self.unchanged} unchanged,"
+            f" {len(self.removed)} removed"
+        ]
+        lines += [f"  {name}: {reason}" for name, reason in self.errors]
+        return "\n".join(lines)
+
+
+def _breakdown(rows: Iterable[tuple[str, object]]) -> str:
+    return "".join(
+        f"<tr><td>{html.escape(str(name))}</td><td class=value>{html.escape(str(value))}</td></tr>"
+        for name, value in rows
+    )
+
+
+def _section(title: str, total: object, rows: Iterable[tuple[str, object]]) -> str:
+    return (
+        f"<section><h2>{html.escape(title)}</h2>"
+        f"<div class=total>{html.escape(str(total))}</div>"
+        f"<table>{_breakdown(rows)}</table></section>"
+    )
+
+
+def render_sheet(character: Character, sheet: Sheet) -> str:
+    """The sheet as a standalone printable HTML page."""
+    statistics = "".join(
+        f"<tr><td>{stat.value}</td><td class=value>{base}</td>"
+        f"<td class=value>{modified}</td></tr>"
+        for stat, (base, modified) in sheet.statistics.items()
+    )
+    sections = [
+        "<section><h2>Statistics</h2><table>"
+        "<tr><th></th><th>Base</th><th>Modified</th></tr>"
+        f"{statistics}</table></section>",
+        _section("Attack", sheet.attack_string, (
+            (name, f"{value:+d}") for name, value in sheet.attack.items()
+        )),
+        _section("Damage", sheet.damage_string, (
+            (name, sum_up_dice(dice).strip()) for name, dice in sheet.damage.items()
+        )),
+        _section("Critical", sheet.critical_string, ()),
+        _section("Full Attack", f"{len(sheet.full_attack)} attacks", (
+            (
+                attack.weapon,
+                f"{attack.bonus:+d}, {sum_up_dice([*attack.damage, *attack.extra_damage]).strip()}"
+                f"/{crit_to_string(attack.critical)}",
+            )
+            for attack in sheet.full_attack
+        )),
+        _section(
+            "Armour Class",
+            f"{sheet.total_ac} (touch {sheet.touch_ac},"
+            f" flat-footed {sheet.flat_footed_ac})",
+            ((ac_type.value, f"{value:+d}") for ac_type, value in sheet.armour_class.items()),
+        ),
+        _section("CMB", f"{sheet.cmb_total:+d}", (
+            (name, f"{value:+d}") for name, value in sheet.cmb.items()
+        )),
+        _section("CMD", sheet.cmd_total, (
+            (name, f"{value:+d}") for name, value in sheet.cmd.items()
+        )),
+    ]
+    for save, breakdown in sheet.saves.items():
+        sections.append(_section(save.value, f"{sum(breakdown.values()):+d}", (
+            (name, f"{value:+d}") for name, value in breakdown.items()
+        )))
+
+    name = html.escape(character.name)
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=utf-8><title>{name}</title>"
+        f"<style>{STYLE}</style></head><body>"
+        f"<h1>{name}</h1><p>Level {character.level}</p>"
+        f"{''.join(sections)}</body></html>"
+    )
+
+
+def _write(path: pathlib.Path, text: str) -> None:
+    """Write through a temporary file, so readers never see half a page."""
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(text, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def _render_batch(
+    characters: list[tuple[Character, str]], directory: str
+) -> list[tuple[str, str, str, str | None]]:
+    """(name, file, fingerprint, error) for each (character, file) rendered."""
+    results = []
+    for character, filename in characters:
+        try:
+            page = render_sheet(character, compute_sheet(character))
+        except Exception as e:
+            results.append((character.name, filename, character.fingerprint, repr(e)))
+            continue
+        _write(pathlib.Path(directory) / filename, page)
+        results.append((character.name, filename, character.fingerprint, None))
+    return results
+
+
+def load_manifest(directory: str | pathlib.Path) -> dict[str, dict[str, str]]:
+    """Character name -> {"file", "fingerprint"} of the previous export."""
+    try:
+        with open(pathlib.Path(directory) / MANIFEST) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != RENDER_VERSION:
+        return {}
+    return manifest["sheets"]
+
+
+def _save_manifest(directory: pathlib.Path, sheets: dict[str, dict[str, str]]) -> None:
+    _write(
+        directory / MANIFEST,
+        json.dumps({"version": RENDER_VERSION, "sheets": sheets}, indent=1, sort_keys=True),
+    )
+
+
+def _save_index(directory: pathlib.Path, sheets: dict[str, dict[str, str]]) -> None:
+    links = "".join(
+        f'<li><a href="{html.escape(entry["file"])}">{html.escape(name)}</a></li>'
+        for name, entry in sorted(sheets.items())
+    )
+    _write(
+        directory / INDEX,
+        "<!DOCTYPE html><html><head><meta charset=utf-8><title>Characters</title>"
+        f"<style>{STYLE}</style></head><body><h1>Characters</h1><ul>{links}</ul></body></html>",
+    )
+
+
+def _filename(name: str, taken: set[str]) -> str:
+    stem = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "character"
+    filename, n = f"{stem}.html", 1
+    while filename in taken:
+        n += 1
+        filename = f"{stem}-{n}.html"
+    return filename
+
+
+def export_sheets(
+    characters: Iterable[Character],
+    directory: str | pathlib.Path,
+    processes: int | None = None,
+    force: bool = False,
+    keep: Iterable[str] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ExportReport:
+    """Render the sheets of `characters` which changed since the last export.
+
+    Sheets of characters which aren't given, and aren't named in `keep`, are
+    removed. `keep` is for callers which skipped unchanged characters
+    themselves.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = {} if force else load_manifest(directory)
+    sheets = {name: previous[name] for name in keep if name in previous}
+    taken = {entry["file"] for entry in previous.values()}
+    report = ExportReport(unchanged=len(sheets))
+
+    batches, batch = [], []
+    for character in characters:
+        entry = previous.get(character.name)
+        if entry is not None and entry["fingerprint"] == character.fingerprint:
+            sheets[character.name] = entry
+            report.unchanged += 1
+            continue
+        filename = entry["file"] if entry is not None else _filename(character.name, taken)
+        taken.add(filename)
+        batch.append((character, filename))
+        if len(batch) >= batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+
+    def collect(results) -> None:
+        for name, filename, fingerprint, error in results:
+            if error is not None:
+                report.errors.append((name, error))
+                continue
+            sheets[name] = {"file": filename, "fingerprint": fingerprint}
+            report.rendered.append(name)
+        _save_manifest(directory, sheets)
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(batches) <= 1:
+        for batch in batches:
+            collect(_render_batch(batch, str(directory)))
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(batches))) as pool:
+            futures = [pool.submit(_render_batch, batch, str(directory)) for batch in batches]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    for name, entry in previous.items():
+        if name not in sheets:
+            (directory / entry["file"]).unlink(missing_ok=True)
+            report.removed.append(name)
+    _save_manifest(directory, sheets)
+    _save_index(directory, sheets)
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--db", help="a pfchar.repository database, else the premade characters")
+    parser.add_argument("--campaign")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--force", action="store_true", help="re-render every sheet")
+    args = parser.parse_args(argv)
+
+    if args.db is None:
+        from pfchar.premade import ALL_CHARACTERS
+
+        report = export_sheets(ALL_CHARACTERS, args.directory, args.processes, args.force)
+        print(report.summary())
+        return 1 if report.errors else 0
+
+    from pfchar.repository import Repository
+
+    repository = Repository(args.db)
+    previous = {} if args.force else load_manifest(args.directory)
+    summaries, after = [], None
+    while page := repository.page(after=after, campaign=args.campaign, limit=500):
+        summaries += page
+        after = page[-1].name
+    unchanged = [
+        summary.name
+        for summary in summaries
+        if previous.get(summary.name, {}).get("fingerprint") == summary.fingerprint
+    ]
+    skip = set(unchanged)
+    try:
+        report = export_sheets(
+            (
+                repository.load(summary.name)
+                for summary in summaries
+                if summary.name not in skip
+            ),
+            args.directory,
+            args.processes,
+            args.force,
+            keep=unchanged,
+        )
+    finally:
+        repository.close()
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Undo/redo of the session state of a character: toggles, two handed, statuses
+and any feats, items or abilities added during the session.
+
+Snapshots hold references to the effect objects rather than copies, and reuse
+the previous snapshot's tuples when those parts didn't change, so a long
+history costs a handful of small tuples per entry.
+"""
+
+import collections
+import dataclasses
+
+from pfchar.char.base import Effect
+from pfchar.char.character import Character
+from pfchar.sheet import Sheet, peek_sheet, remember_sheet
+
+
+def _shared(current: tuple, previous: tuple) -> tuple:
+    """The previous tuple if it holds the same objects, so snapshots share it."""
+    if len(current) == len(previous) and all(
+        a is b for a, b in zip(current, previous)
+    ):
+        return previous
+    return current
+
+
+@dataclasses.dataclass(frozen=True)
+class CharacterState:
+    two_handed: bool
+    toggles: tuple[bool, ...]
+    statuses: tuple[Effect, ...]
+    abilities: tuple[Effect, ...] = ()
+    feats: tuple[Effect, ...] = ()
+    items: tuple[Effect, ...] = ()
+
+    @classmethod
+    def capture(
+        cls, character: Character, previous: "CharacterState | None" = None
+    ) -> "CharacterState":
+        state = cls(
+            two_handed=character._two_handed,
+            toggles=tuple(
+                effect.condition.enabled for effect in character.toggleable_effects()
+            ),
+            statuses=tuple(character.statuses),
+            abilities=tuple(character.abilities),
+            feats=tuple(character.feats),
+            items=tuple(character.items),
+        )
+        if previous is None:
+            return state
+        return cls(
+            two_handed=state.two_handed,
+            toggles=state.toggles if state.toggles != previous.toggles else previous.toggles,
+            statuses=_shared(state.statuses, previous.statuses),
+            abilities=_shared(state.abilities, previous.abilities),
+            feats=_shared(state.feats, previous.feats),
+            items=_shared(state.items, previous.items),
+        )
+
+    def apply(self, character: Character) -> None:
+        # Effects first, the toggles are for the restored effects.
+        character.set_effects("statuses", self.statuses)
+        character.set_effects("abilities", self.abilities)
+        character.set_effects("feats", self.feats)
+        character.set_effects("items", self.items)
+        character._two_handed = self.two_handed
+        for effect, enabled in zip(character.toggleable_effects(), self.toggles):
+            character.set_toggle(effect, enabled)
+
+
+class History:
+    def __init__(self, limit: int = 500):
+        self._undo: collections.deque[tuple[CharacterState, Sheet | None]] = (
+            collections.deque(maxlen=limit)
+        )
+        self._redo: list[tuple[CharacterState, Sheet | None]] = []
+
+    def _latest(self) -> CharacterState | None:
+        if self._undo:
+            return self._undo[-1][0]
+        return None
+
+    def _snapshot(self, character: Character) -> tuple[CharacterState, Sheet | None]:
+        state = CharacterState.capture(character, previous=self._latest())
+        return state, peek_sheet(character)
+
+    def record(self, character: Character) -> None:
+        """Record the current state, call this before mutating the character."""
+        self._undo.append(self._snapshot(character))
+        self._redo.clear()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self, character: Character) -> bool:
+        if not self._undo:
+            return False
+        self._redo.append(self._snapshot(character))
+        self._restore(character, *self._undo.pop())
+        return True
+
+    def redo(self, character: Character) -> bool:
+        if not self._redo:
+            return False
+        self._undo.append(self._snapshot(character))
+        self._restore(character, *self._redo.pop())
+        return True
+
+    @staticmethod
+    def _restore(character: Character, state: CharacterState, sheet: Sheet | None):
+        state.apply(character)
+        if sheet is not None:
+            remember_sheet(character, sheet)
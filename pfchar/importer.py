@@ -0,0 +1,619 @@
+"""
+Import characters from external character sheet exports, one at a time.
+
+    report = ImportReport()
+    for character in read_characters("campaign.xml", report=report):
+        repository.save(character)
+    report.unknown  # (section, name) of every effect which wasn't recognised
+
+or from the command line, into a repository (see `pfchar.repository`):
+
+    python -m pfchar.importer campaign.xml --db characters.db --campaign Runelords
+
+Two formats are read, gzipped or not.
+
+XML, shaped like Hero Lab's statblock export: any number of `<character>`
+elements, with `<attributes>`, `<saves>`, `<attack baseattack>`, `<feats>`,
+`<melee>`/`<ranged>` weapons (`damage="1d8+5" crit="19-20/x2"
+equipped="mainhand"`), `<defenses>` armour, `<magicitems>` and
+`<specialabilities>`. Characters nested in another (eg, animal companions)
+are skipped.
+
+JSON, either one character per line or a top level array of characters:
+
+    {"name": "Valeros", "level": 5, "size": "Medium",
+     "statistics": {"Strength": 18}, "base_attack_bonus": 5,
+     "saves": {"Fortitude": 4},
+     "weapons": [{"name": "+1 Flaming Longsword", "type": "Sword",
+                  "damage": "1d8", "critical": "19-20/x2", "hand": "main"}],
+     "armour": [{"name": "Chain Mail", "armour_bonus": 6, "max_dex_bonus": 2}],
+     "items": ["Ring of Protection +1",
+               {"name": "Ioun Stone", "statistics": {"Wisdom": 2}}],
+     "feats": ["Power Attack", "Weapon Focus (Longsword)"],
+     "abilities": [], "statuses": []}
+
+Both are parsed incrementally, each character is built and handed over as soon
+as its element or object ends and nothing of it is kept, so memory doesn't grow
+with the size of the export. Effects are matched by name: feats and items with
+their own classes first, then the effect catalog. Anything else is counted in
+the report and left out, and a character which can't be built at all is
+recorded in `report.errors`, neither stops the import.
+"""
+
+import argparse
+import collections
+import dataclasses
+import gzip
+import io
+import json
+import pathlib
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+from typing import IO, Callable, Iterator, Mapping
+
+from pfchar.char.abilities import DeadlyCritical
+from pfchar.char.base import CriticalBonus, Dice, Effect, Save, Size, Statistic, WeaponType
+from pfchar.char.catalog import Catalog, default_catalog
+from pfchar.char.character import Character
+from pfchar.char.enchantments import FlamingBurst, Merciful, Sneaky
+from pfchar.char.feats import Dodge, ImprovedCritical, PowerAttack, WeaponFocus, WeaponTraining
+from pfchar.char.items import (
+    AmuletOfNaturalArmor,
+    Armour,
+    CloakOfResistance,
+    RingOfProtection,
+    StatisticModifyingItem,
+    Weapon,
+)
+
+CHUNK_SIZE = 1 << 16
+
+# Words in a weapon's name (or a feat's parenthesis) giving its WeaponType.
+WEAPON_TYPE_WORDS = {
+    "sword": WeaponType.SWORD,
+    "longsword": WeaponType.SWORD,
+    "shortsword": WeaponType.SWORD,
+    "greatsword": WeaponType.SWORD,
+    "scimitar": WeaponType.SWORD,
+    "falchion": WeaponType.SWORD,
+    "rapier": WeaponType.SWORD,
+    "katana": WeaponType.SWORD,
+    "axe": WeaponType.AXE,
+    "battleaxe": WeaponType.AXE,
+    "greataxe": WeaponType.AXE,
+    "handaxe": WeaponType.AXE,
+    "bow": WeaponType.BOW,
+    "longbow": WeaponType.BOW,
+    "shortbow": WeaponType.BOW,
+    "hammer": WeaponType.HAMMER,
+    "warhammer": WeaponType.HAMMER,
+    "earthbreaker": WeaponType.HAMMER,
+    "dagger": WeaponType.DAGGER,
+    "kukri": WeaponType.DAGGER,
+    "staff": WeaponType.STAFF,
+    "quarterstaff": WeaponType.STAFF,
+    "spear": WeaponType.SPEAR,
+    "longspear": WeaponType.SPEAR,
+    "lance": WeaponType.SPEAR,
+    "trident": WeaponType.SPEAR,
+    "mace": WeaponType.MACE,
+    "morningstar": WeaponType.MACE,
+    "flail": WeaponType.MACE,
+    "unarmed": WeaponType.UNARMED,
+    "gauntlet": WeaponType.UNARMED,
+}
+
+# Weapon types which are light unless the export says otherwise.
+LIGHT_WEAPON_TYPES = frozenset({WeaponType.DAGGER, WeaponType.UNARMED})
+
+# Feats and abilities with their own classes, by name, taking the weapon type
+# in their parenthesis if they need one.
+TYPED_EFFECTS: dict[str, Callable[[WeaponType], Effect]] = {
+    "weapon focus": WeaponFocus,
+    "weapon training": WeaponTraining,
+    "improved critical": ImprovedCritical,
+    "deadly critical": DeadlyCritical,
+}
+EFFECTS: dict[str, Callable[[], Effect]] = {
+    "power attack": PowerAttack,
+    "dodge": Dodge,
+}
+BONUS_ITEMS: dict[str, Callable[[int], Effect]] = {
+    "ring of protection": RingOfProtection,
+    "amulet of natural armor": AmuletOfNaturalArmor,
+    "cloak of resistance": CloakOfResistance,
+}
+STATISTIC_ITEMS: dict[str, tuple[Statistic, ...]] = {
+    "belt of giant strength": (Statistic.STRENGTH,),
+    "belt of incredible dexterity": (Statistic.DEXTERITY,),
+    "belt of mighty constitution": (Statistic.CONSTITUTION,),
+    "belt of physical perfection": (
+        Statistic.STRENGTH,
+        Statistic.DEXTERITY,
+        Statistic.CONSTITUTION,
+    ),
+    "headband of vast intelligence": (Statistic.INTELLIGENCE,),
+    "headband of inspired wisdom": (Statistic.WISDOM,),
+    "headband of alluring charisma": (Statistic.CHARISMA,),
+    "headband of mental superiority": (
+        Statistic.INTELLIGENCE,
+        Statistic.WISDOM,
+        Statistic.CHARISMA,
+    ),
+}
+ENCHANTMENTS: dict[str, Callable[[], Effect]] = {
+    "flaming burst": FlamingBurst,
+    "merciful": Merciful,
+    "sneaky": Sneaky,
+}
+
+_BONUS = re.compile(r"^\+(\d+)\s+(.*)$|^(.*?)\s+\(?\+(\d+)\)?$")
+_PARENTHESIS = re.compile(r"^(.*?)\s*\((.*)\)$")
+_DICE = re.compile(r"^(\d+)d(\d+)")
+_CRITICAL = re.compile(r"^(?:(\d+)(?:-20)?)?(?:/)?(?:[x×](\d+))?$")
+
+
+class SheetImportError(ValueError):
+    pass
+
+
+@dataclasses.dataclass
+class ImportReport:
+    characters: int = 0
+    # (section, name) of effects which weren't recognised, with how often.
+    unknown: collections.Counter = dataclasses.field(default_factory=collections.Counter)
+    # (character name or position, reason) of characters which weren't imported.
+    errors: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+
+    def summary(self) -> str:
+        lines = [f"Imported {self.characters} characters"]
+        if self.errors:
+            lines.append(f"{len(self.errors)} characters failed:")
+            lines += [f"  {name}: {reason}" for name, reason in self.errors]
+        if self.unknown:
+            lines.append(f"{len(self.unknown)} unknown effects:")
+            lines += [
+                f"  {section}: {name} (x{count})"
+                for (section, name), count in self.unknown.most_common()
+            ]
+        return "\n".join(lines)
+
+
+def _split_bonus(name: str) -> tuple[str, int]:
+    """The name and bonus of eg, "+2 Longsword" or "Ring of Protection +1"."""
+    match = _BONUS.match(name.strip())
+    if match is None:
+        return name.strip(), 0
+    if match.group(1) is not None:
+        return match.group(2), int(match.group(1))
+    return match.group(3), int(match.group(4))
+
+
+def _int(value: object) -> int:
+    if isinstance(value, int):
+        return value
+    if value is None or not str(value).strip():
+        raise SheetImportError(f"expected a number, not {value!r}")
+    return int(str(value).strip().split("/")[0])
+
+
+def _dice(value: str) -> Dice:
+    match = _DICE.match(value.strip())
+    if match is None:
+        raise SheetImportError(f"invalid damage {value!r}")
+    return Dice(num=int(match.group(1)), sides=int(match.group(2)))
+
+
+def _critical(value: str | None) -> CriticalBonus:
+    if not value:
+        return CriticalBonus()
+    match = _CRITICAL.match(value.strip().replace(" ", ""))
+    if match is None:
+        raise SheetImportError(f"invalid critical {value!r}")
+    return CriticalBonus(
+        crit_range=int(match.group(1) or 20),
+        crit_multiplier=int(match.group(2) or 2),
+    )
+
+
+def weapon_type(name: str) -> WeaponType | None:
+    for value in WeaponType:
+        if name.strip().lower() == value.value.lower():
+            return value
+    for word in reversed(re.findall(r"[a-z]+", name.lower())):
+        if word in WEAPON_TYPE_WORDS:
+            return WEAPON_TYPE_WORDS[word]
+        if word.endswith("s") and word[:-1] in WEAPON_TYPE_WORDS:
+            return WEAPON_TYPE_WORDS[word[:-1]]
+    return None
+
+
+class _Builder:
+    def __init__(self, catalog: Catalog, report: ImportReport):
+        self.catalog = catalog
+        self.report = report
+        self._catalog_names = {name.lower(): name for name in catalog.names()}
+        # Longest first, so "Flaming Burst" is found before "Flaming".
+        self._enchantments = sorted(
+            set(ENCHANTMENTS)
+            | {name.lower() for name in catalog.names("enchantment")},
+            key=len,
+            reverse=True,
+        )
+
+    def _unknown(self, section: str, name: str) -> None:
+        self.report.unknown[section, name] += 1
+
+    def _catalog(self, name: str) -> Effect | None:
+        plain, bonus = _split_bonus(name)
+        for candidate in (name, f"{plain} (+{bonus})" if bonus else plain):
+            if (found := self._catalog_names.get(candidate.lower())) is not None:
+                return self.catalog.create(found)
+        return None
+
+    def effect(self, section: str, data: str | Mapping) -> Effect | None:
+        if isinstance(data, Mapping):
+            name = data.get("name")
+            if not name:
+                raise SheetImportError(f"{section} without a name: {data!r}")
+            if section == "items" and "statistics" in data:
+                return StatisticModifyingItem(
+                    name=name,
+                    stats={Statistic(key): _int(value) for key, value in data["statistics"].items()},
+                )
+            if "weapon_type" in data:
+                name = f"{name} ({data['weapon_type']})"
+        else:
+            name = data
+
+        key = name.strip().lower()
+        if (match := _PARENTHESIS.match(key)) is not None and match.group(1) in TYPED_EFFECTS:
+            if (found := weapon_type(match.group(2))) is not None:
+                return TYPED_EFFECTS[match.group(1)](found)
+        if key in EFFECTS:
+            return EFFECTS[key]()
+        plain, bonus = _split_bonus(key)
+        if bonus and plain in BONUS_ITEMS:
+            return BONUS_ITEMS[plain](bonus)
+        if bonus and plain in STATISTIC_ITEMS:
+            return StatisticModifyingItem(
+                name=f"{_split_bonus(name)[0]} (+{bonus})",
+                stats={stat: bonus for stat in STATISTIC_ITEMS[plain]},
+            )
+        if (effect := self._catalog(name)) is not None:
+            return effect
+        self._unknown(section, name)
+        return None
+
+    def weapon(self, data: Mapping) -> Weapon | None:
+        name = data.get("name")
+        if not name:
+            raise SheetImportError(f"weapon without a name: {data!r}")
+        type_name = data.get("type")
+        found = weapon_type(type_name or name)
+        if found is None:
+            self._unknown("weapons", name)
+            return None
+        plain, enhancement = _split_bonus(name)
+        enchantments = []
+        for enchantment in data.get("enchantments") or ():
+            if (effect := self.enchantment(enchantment)) is not None:
+                enchantments.append(effect)
+        if "enchantments" not in data:
+            # Read the enchantments out of the name, eg, "+1 Flaming Longsword".
+            plain = plain.lower()
+            for enchantment in self._enchantments:
+                if re.search(rf"\b{re.escape(enchantment)}\b", plain):
+                    plain = re.sub(rf"\b{re.escape(enchantment)}\b", "", plain)
+                    enchantments.append(self.enchantment(enchantment))
+        return Weapon(
+            name=name,
+            type=found,
+            base_damage=_dice(data.get("damage") or "1d3"),
+            critical=_critical(data.get("critical")),
+            is_ranged=bool(data.get("ranged", False)),
+            is_light=bool(data.get("light", found in LIGHT_WEAPON_TYPES)),
+            enchantment_modifier=_int(data.get("enhancement", enhancement)),
+            enchantments=enchantments,
+        )
+
+    def enchantment(self, name: str) -> Effect | None:
+        key = name.strip().lower()
+        if key in ENCHANTMENTS:
+            return ENCHANTMENTS[key]()
+        if (found := self._catalog_names.get(key)) is not None:
+            return self.catalog.create(found)
+        self._unknown("enchantments", name)
+        return None
+
+    def armour(self, data: Mapping) -> Armour:
+        name = data.get("name")
+        if not name:
+            raise SheetImportError(f"armour without a name: {data!r}")
+        fields = {
+            field: _int(data[field])
+            for field in (
+                "armour_bonus",
+                "shield_bonus",
+                "enhancement_bonus",
+                "max_dex_bonus",
+                "armor_check_penalty",
+                "spell_failure_chance",
+            )
+            if data.get(field) is not None
+        }
+        if "enhancement_bonus" not in fields:
+            fields["enhancement_bonus"] = _split_bonus(name)[1]
+        return Armour(name=name, **fields)
+
+    def character(self, record: Mapping) -> Character:
+        name = record.get("name")
+        if not name:
+            raise SheetImportError("character without a name")
+        statistics = {stat: 10 for stat in Statistic}
+        for key, value in (record.get("statistics") or {}).items():
+            statistics[Statistic(key)] = _int(value)
+        # Every save, effects add their bonuses to all three.
+        saves = {save: 0 for save in Save}
+        for key, value in (record.get("saves") or {}).items():
+            saves[Save(key)] = _int(value)
+        size = record.get("size")
+        if size and size.upper() not in Size.__members__:
+            raise SheetImportError(f"unknown size {size!r}")
+        weapons = []
+        for data in record.get("weapons") or ():
+            if (weapon := self.weapon(data)) is not None:
+                weapons.append((data.get("hand"), weapon))
+        hands = {hand: weapon for hand, weapon in reversed(weapons) if hand}
+        main_hand = hands.get("main", hands.get("both"))
+        if main_hand is None and weapons:
+            main_hand = next(
+                (weapon for _, weapon in weapons if not weapon.is_ranged), weapons[0][1]
+            )
+
+        effects = {
+            "items": [self.armour(data) for data in record.get("armour") or ()],
+            "feats": [],
+            "abilities": [],
+            "statuses": [],
+        }
+        for section, values in effects.items():
+            for data in record.get(section) or ():
+                if (effect := self.effect(section, data)) is not None:
+                    values.append(effect)
+
+        # Everything through the constructor, so the fingerprint isn't
+        # computed until something asks for it.
+        return Character(
+            name=name,
+            level=_int(record.get("level", 1)),
+            size=Size[size.upper()] if size else Size.MEDIUM,
+            statistics=statistics,
+            base_attack_bonus=_int(record.get("base_attack_bonus", 0)),
+            base_saves=saves,
+            main_hand=main_hand,
+            off_hand=hands.get("off"),
+            _two_handed="both" in hands and main_hand is hands["both"],
+            **effects,
+        )
+
+
+def build_character(
+    record: Mapping,
+    catalog: Catalog | None = None,
+    report: ImportReport | None = None,
+) -> Character:
+    """A character from one JSON shaped record, see the module docstring."""
+    return _Builder(catalog or default_catalog(), report or ImportReport()).character(record)
+
+
+def _xml_int(value: str | None, default: int = 0) -> int:
+    if value is None or not value.strip():
+        return default
+    return int(value.strip().lstrip("+").split("/")[0])
+
+
+def _xml_record(element: ElementTree.Element) -> dict:
+    """A Hero Lab style <character> element as a JSON shaped record."""
+    level = element.get("level")
+    if level is None and (classes := element.find("classes")) is not None:
+        level = classes.get("level")
+    size = element.find("size")
+    attack = element.find("attack")
+
+    statistics = {}
+    for attribute in element.iterfind("attributes/attribute"):
+        value = attribute.find("attrvalue")
+        if value is not None:
+            statistics[attribute.get("name")] = _xml_int(
+                value.get("base", value.get("text"))
+            )
+    saves = {}
+    for save in element.iterfind("saves/save"):
+        # "Fortitude Save" etc.
+        saves[save.get("name", "").split()[0]] = _xml_int(save.get("base"))
+
+    weapons = []
+    for section in ("melee", "ranged"):
+        for weapon in element.iterfind(f"{section}/weapon"):
+            equipped = weapon.get("equipped", "")
+            hand = {"mainhand": "main", "offhand": "off", "bothhands": "both"}.get(equipped)
+            weapons.append(
+                {
+                    "name": weapon.get("name"),
+                    "damage": weapon.get("damage"),
+                    "critical": weapon.get("crit"),
+                    "ranged": section == "ranged",
+                    "hand": hand,
+                }
+            )
+    armour = []
+    for armor in element.iterfind("defenses/armor"):
+        if armor.get("equipped", "yes") != "yes":
+            continue
+        name = armor.get("name", "")
+        enhancement = _split_bonus(name)[1]
+        bonus = _xml_int(armor.get("ac")) - enhancement
+        shield = re.search(r"\b(shield|buckler)\b", name, re.IGNORECASE) is not None
+        armour.append(
+            {
+                "name": name,
+                "shield_bonus" if shield else "armour_bonus": bonus,
+                "enhancement_bonus": enhancement,
+            }
+        )
+
+    return {
+        "name": element.get("name"),
+        "level": _xml_int(level, 1),
+        "size": size.get("name") if size is not None else None,
+        "statistics": statistics,
+        "base_attack_bonus": _xml_int(attack.get("baseattack") if attack is not None else None),
+        "saves": saves,
+        "weapons": weapons,
+        "armour": armour,
+        "items": [item.get("name") for item in element.iterfind("magicitems/item")],
+        "feats": [feat.get("name") for feat in element.iterfind("feats/feat")],
+        "abilities": [
+            special.get("name") for special in element.iterfind("specialabilities/special")
+        ],
+    }
+
+
+def iter_xml_records(source: IO[bytes]) -> Iterator[dict]:
+    """Top level <character> elements as records, each dropped once read."""
+    stack: list[ElementTree.Element] = []
+    depth = 0
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            if element.tag == "character":
+                depth += 1
+            continue
+        stack.pop()
+        if element.tag != "character":
+            continue
+        depth -= 1
+        if depth == 0:
+            yield _xml_record(element)
+            # Detach it, the parser keeps its parents until they end.
+            if stack:
+                stack[-1].remove(element)
+            element.clear()
+
+
+def iter_json_records(source: IO[bytes]) -> Iterator[dict]:
+    """Objects of a JSON lines file or of a top level JSON array, one at a time."""
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(source, encoding="utf-8")
+    buffer = ""
+    position = 0
+    eof = False
+    in_array = False
+
+    def fill(size: int = CHUNK_SIZE) -> bool:
+        nonlocal buffer, position, eof
+        chunk = reader.read(size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+        return bool(chunk)
+
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or not fill():
+                break
+        if position >= len(buffer):
+            return
+        if buffer[position] == "[" and not in_array:
+            in_array = True
+            position += 1
+            continue
+        if buffer[position] == "]" and in_array:
+            return
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                # Probably cut off at the end of the buffer. Read as much again
+                # as is buffered, so a large object is decoded a few times at most.
+                if eof or not fill(max(CHUNK_SIZE, len(buffer) - position)):
+                    raise
+        position = end
+        if not isinstance(record, dict):
+            raise SheetImportError(f"expected a character object, not {record!r:.40}")
+        yield record
+
+
+def _open(path: str | pathlib.Path) -> IO[bytes]:
+    path = pathlib.Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _format(path: pathlib.Path, source: IO[bytes]) -> str:
+    suffixes = [suffix for suffix in path.suffixes if suffix != ".gz"]
+    if suffixes and suffixes[-1] == ".xml":
+        return "xml"
+    if suffixes and suffixes[-1] in (".json", ".jsonl", ".ndjson"):
+        return "json"
+    start = source.peek(64)[:64].lstrip() if hasattr(source, "peek") else b""
+    return "xml" if start.startswith(b"<") else "json"
+
+
+def read_characters(
+    path: str | pathlib.Path,
+    format: str | None = None,
+    catalog: Catalog | None = None,
+    report: ImportReport | None = None,
+) -> Iterator[Character]:
+    """Characters from an export as they're parsed, `format` is "xml" or "json"."""
+    builder = _Builder(catalog or default_catalog(), report if report is not None else ImportReport())
+    with _open(path) as source:
+        if format is None:
+            format = _format(pathlib.Path(path), source)
+        if format == "xml":
+            records = iter_xml_records(source)
+        elif format == "json":
+            records = iter_json_records(source)
+        else:
+            raise SheetImportError(f"format must be xml or json, not {format!r}")
+        for position, record in enumerate(records):
+            try:
+                character = builder.character(record)
+            except (SheetImportError, ValueError, KeyError, TypeError) as e:
+                builder.report.errors.append((record.get("name") or f"#{position}", str(e)))
+                continue
+            builder.report.characters += 1
+            yield character
+
+
+def main(argv: list[str] | None = None) -> int:
+    from pfchar.repository import Repository
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("xml", "json"))
+    parser.add_argument("--db", default="characters.db")
+    parser.add_argument("--campaign")
+    args = parser.parse_args(argv)
+
+    report = ImportReport()
+    repository = Repository(args.db)
+    try:
+        repository.save_many(
+            read_characters(args.path, args.format, report=report), args.campaign
+        )
+    finally:
+        repository.close()
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
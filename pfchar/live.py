@@ -0,0 +1,97 @@
+"""
+Publish/subscribe of sheet changes, keyed by character name.
+
+A change is published once: the sheet is computed (or fetched from the sheet
+cache), diffed against the previously published state, and the delta handed to
+every subscriber viewing that character. Subscribers never recompute.
+"""
+
+import collections
+import itertools
+from typing import Callable
+
+from pfchar.char.character import Character
+from pfchar.sheet import Sheet, get_sheet, sheet_to_dict
+
+# Called with the new sheet and {flattened key: new value}, removed keys map to None.
+Subscriber = Callable[[Sheet, dict[str, object]], None]
+
+_MISSING = object()
+
+
+def _flatten(value: object, prefix: str = "") -> dict[str, object]:
+    if not isinstance(value, dict):
+        return {prefix: value}
+    flat = {}
+    for key, item in value.items():
+        flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def published_state(character: Character, sheet: Sheet) -> dict[str, object]:
+    return _flatten(
+        {
+            "sheet": sheet_to_dict(sheet),
+            "toggles": {
+                effect.name: effect.condition.enabled
+                for effect in character.toggleable_effects()
+            },
+            "two_handed": character.is_two_handed(),
+            "statuses": [status.name for status in character.statuses],
+            "effects": {
+                "abilities": [effect.name for effect in character.abilities],
+                "feats": [effect.name for effect in character.feats],
+                "items": [effect.name for effect in character.items],
+            },
+        }
+    )
+
+
+class SheetHub:
+    def __init__(self):
+        self._subscribers: dict[str, dict[int, Subscriber]] = (
+            collections.defaultdict(dict)
+        )
+        self._published: dict[str, dict[str, object]] = {}
+        self._tokens = itertools.count()
+
+    def subscribe(self, name: str, callback: Subscriber) -> int:
+        token = next(self._tokens)
+        self._subscribers[name][token] = callback
+        return token
+
+    def unsubscribe(self, name: str, token: int) -> None:
+        subscribers = self._subscribers.get(name)
+        if subscribers is None:
+            return
+        subscribers.pop(token, None)
+        if not subscribers:
+            del self._subscribers[name]
+
+    def forget(self, name: str) -> None:
+        """Drop the published state, so the next publish sends everything."""
+        self._published.pop(name, None)
+
+    def subscriber_count(self, name: str) -> int:
+        return len(self._subscribers.get(name, ()))
+
+    def publish(self, character: Character) -> dict[str, object]:
+        """Compute the character's sheet once and push the delta to its subscribers."""
+        sheet = get_sheet(character)
+        state = published_state(character, sheet)
+        previous = self._published.get(character.name, {})
+        delta = {
+            key: value
+            for key, value in state.items()
+            if previous.get(key, _MISSING) != value
+        }
+        delta.update({key: None for key in previous.keys() - state.keys()})
+        self._published[character.name] = state
+
+        if delta:
+            for callback in list(self._subscribers.get(character.name, {}).values()):
+                callback(sheet, delta)
+        return delta
+
+
+HUB = SheetHub()
@@ -0,0 +1,249 @@
+"""
+Metrics in the Prometheus text format, mounted on nicegui's FastAPI app.
+
+    GET /metrics    -> text/plain; version=0.0.4
+
+Latencies are observed into histograms where they happen:
+
+    HANDLER_SECONDS = REGISTRY.histogram("pfchar_handler_seconds", "...", "handler")
+
+    @HANDLER_SECONDS.time("toggle")
+    def handler(e): ...
+
+Everything else (connected clients, cache lookups, memory) is read by the
+collectors added with `Registry.add_collector` when the endpoint is scraped, so
+it costs nothing between scrapes. Each worker process serves its own metrics.
+"""
+
+import bisect
+import contextlib
+import os
+import sys
+import time
+from typing import Callable, Iterable, Mapping
+
+from fastapi import FastAPI, Response
+
+import pfchar.sheet
+
+MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, from a fast toggle to a refresh pushed to a full table.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# A collector returns (name, type, help, samples) families, samples being
+# ({label: value}, value) pairs.
+Samples = Iterable[tuple[Mapping[str, str], float]]
+Family = tuple[str, str, str, Samples]
+Collector = Callable[[], Iterable[Family]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_family(name: str, kind: str, help: str, samples: Samples) -> str:
+    lines = [f"# HELP {name} {_escape(help)}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+class _Series:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int):
+        # Observations per bucket, the last one being +Inf.
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label: str | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[str, _Series] = {}
+
+    def observe(self, value: float, label: str = "") -> None:
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = _Series(len(self.buckets))
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    @contextlib.contextmanager
+    def time(self, label: str = ""):
+        """Observe the seconds spent in the block, or in each call when decorating."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} histogram"]
+        for label, series in self._series.items():
+            labels = {self.label: label} if self.label else {}
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series.counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class Registry:
+    def __init__(self):
+        self._histograms: list[Histogram] = []
+        self._collectors: list[Collector] = []
+
+    def histogram(self, name: str, help: str, label: str | None = None, **kwargs) -> Histogram:
+        histogram = Histogram(name, help, label, **kwargs)
+        self._histograms.append(histogram)
+        return histogram
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        parts = [histogram.render() for histogram in self._histograms]
+        for collector in self._collectors:
+            parts += [render_family(*family) for family in collector()]
+        return "".join(parts)
+
+
+def _page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def process_metrics() -> list[Family]:
+    """CPU time and memory of this process, named as Prometheus' own clients do."""
+    families: list[Family] = [
+        (
+            "process_cpu_seconds_total",
+            "counter",
+            "User and system CPU time spent in seconds.",
+            [({}, time.process_time())],
+        )
+    ]
+    try:
+        with open("/proc/self/statm") as f:
+            virtual, resident = (int(pages) * _page_size() for pages in f.read().split()[:2])
+    except OSError:
+        pass
+    else:
+        families += [
+            (
+                "process_virtual_memory_bytes",
+                "gauge",
+                "Virtual memory size in bytes.",
+                [({}, virtual)],
+            ),
+            (
+                "process_resident_memory_bytes",
+                "gauge",
+                "Resident memory size in bytes.",
+                [({}, resident)],
+            ),
+        ]
+    try:
+        import resource
+    except ImportError:  # Windows
+        return families
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes everywhere but macOS.
+    peak *= 1 if sys.platform == "darwin" else 1024
+    families.append(
+        (
+            "process_max_resident_memory_bytes",
+            "gauge",
+            "Peak resident memory size in bytes.",
+            [({}, peak)],
+        )
+    )
+    return families
+
+
+def sheet_metrics() -> list[Family]:
+    """Where sheets came from (see `pfchar.sheet.LOOKUPS`) and the cache sizes."""
+    lookups = pfchar.sheet.LOOKUPS
+    with pfchar.sheet.PRECOMPUTED_LOCK:
+        precomputed = len(pfchar.sheet.PRECOMPUTED)
+    found = lookups["precomputed"] + lookups["cache"] + lookups["shared"]
+    targeted_found = lookups["targeted_cache"]
+    hit_ratios = [
+        ({"cache": "sheet"}, found / ((found + lookups["computed"]) or 1)),
+        (
+            {"cache": "targeted"},
+            targeted_found / ((targeted_found + lookups["targeted_computed"]) or 1),
+        ),
+    ]
+    return [
+        (
+            "pfchar_sheet_lookups_total",
+            "counter",
+            "Sheets asked for, by where they were found or computed.",
+            [({"source": source}, count) for source, count in sorted(lookups.items())],
+        ),
+        (
+            "pfchar_sheet_computed_total",
+            "counter",
+            "Sheets computed on demand rather than found in a cache.",
+            [
+                ({"kind": "sheet"}, lookups["computed"]),
+                ({"kind": "targeted"}, lookups["targeted_computed"]),
+            ],
+        ),
+        (
+            "pfchar_sheet_cache_hit_ratio",
+            "gauge",
+            "Share of sheet lookups served without computing, since the process started.",
+            hit_ratios,
+        ),
+        (
+            "pfchar_sheet_cache_entries",
+            "gauge",
+            "Sheets held in each cache.",
+            [
+                ({"cache": "sheet"}, len(pfchar.sheet.SHEETS)),
+                ({"cache": "targeted"}, len(pfchar.sheet.TARGETED_SHEETS)),
+                ({"cache": "precomputed"}, precomputed),
+            ],
+        ),
+    ]
+
+
+REGISTRY = Registry()
+REGISTRY.add_collector(process_metrics)
+
+
+def register_metrics(app: FastAPI, registry: Registry = REGISTRY) -> None:
+    # A coroutine, so the collectors run on the event loop rather than in a
+    # thread while the loop changes what they iterate.
+    @app.get("/metrics")
+    async def metrics() -> Response:
+        return Response(content=registry.render(), media_type=MEDIA_TYPE)
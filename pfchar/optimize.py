@@ -0,0 +1,304 @@
+"""
+Pick the best combination of items and feats for a character from a candidate pool.
+
+    optimize_loadout(DORAMAK, candidates, objective="ac", budget=50_000)
+    optimize_loadout(YOYU, candidates, objective="dpr", target_ac=30)
+
+Branch-and-bound over include/exclude decisions. Candidates are pushed onto and
+popped off a single scratch character, so each node only evaluates the sheet
+for one more effect rather than rebuilding the character.
+
+For AC the bound follows `Character.armour_bonuses`: bonuses of the same type
+don't stack, so the remaining candidates can only add the amount by which they
+beat the current bonus of each type. That bound is exact, so the result is
+optimal. Ties go to the cheaper loadout, and picks which add nothing (eg, a
+second deflection bonus under a bigger one) are dropped from the result, so
+gold and slots aren't spent on them. For DPR the bound is the sum of each
+remaining candidate's gain on its own, which assumes gains add up; pass
+`exact=True` to search exhaustively.
+
+Weapon enchantments are added to a copy of the main hand weapon, so the
+character's own weapon is left alone.
+"""
+
+import collections
+import copy
+import dataclasses
+import math
+from typing import Callable, Iterable, Mapping
+
+from pfchar.char.base import ACType, Effect, Statistic
+from pfchar.char.character import Character
+from pfchar.search import EFFECT_LISTS, effect_kind
+from pfchar.simulate import Combatant, expected_damage_per_round
+from pfchar.utils import get_total_ac
+
+# Slots which can hold more than one item, anything else holds one.
+DEFAULT_SLOTS = {"ring": 2}
+
+Objective = Callable[[Character], float]
+
+
+@dataclasses.dataclass(frozen=True)
+class Candidate:
+    effect: Effect
+    # Body slot, eg, "ring", "neck" or "armor". None for things like feats.
+    slot: str | None = None
+    cost: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class Loadout:
+    candidates: tuple[Candidate, ...]
+    value: float
+    cost: int
+    # Number of loadouts evaluated during the search.
+    evaluated: int
+
+    @property
+    def effects(self) -> list[Effect]:
+        return [candidate.effect for candidate in self.candidates]
+
+
+def total_ac(character: Character) -> float:
+    return get_total_ac(character.armour_bonuses())
+
+
+def damage_per_round(target_ac: int) -> Objective:
+    def objective(character: Character) -> float:
+        if character.main_hand is None:
+            return 0.0
+        return expected_damage_per_round(
+            Combatant.from_character(character, hit_points=1), target_ac
+        )
+
+    return objective
+
+
+def _ac_contribution(effect: Effect, character: Character) -> dict:
+    """The AC an effect could add, keyed by type (and by slot for enhancements)."""
+    bonuses = dict(effect.armour_class_bonus(character))
+    contribution = {}
+    if enhancement := bonuses.pop(ACType.ENHANCEMENT, 0):
+        for ac_type in {ACType.ARMOR, ACType.SHIELD} & set(bonuses):
+            contribution[(ACType.ENHANCEMENT, ac_type)] = enhancement
+    bonuses.pop(ACType.PENALTY, None)
+    contribution |= {ac_type: value for ac_type, value in bonuses.items() if value > 0}
+    if dexterity := effect.statistic_bonus(character, Statistic.DEXTERITY):
+        contribution[Statistic.DEXTERITY] = max(0, dexterity)
+    return contribution
+
+
+class _Search:
+    def __init__(
+        self,
+        character: Character,
+        candidates: list[Candidate],
+        objective: Objective,
+        budget: int | None,
+        slots: Mapping[str, int],
+    ):
+        self.scratch = copy.copy(character)
+        for attribute in EFFECT_LISTS.values():
+            setattr(self.scratch, attribute, list(getattr(character, attribute)))
+        if character.main_hand is None and any(
+            effect_kind(candidate.effect) == "enchantment" for candidate in candidates
+        ):
+            raise ValueError(f"{character.name} has no main hand weapon to enchant")
+        self.objective = objective
+        self.budget = math.inf if budget is None else budget
+        self.slots = slots
+        self.slot_use: collections.Counter = collections.Counter()
+        self.evaluated = 0
+
+        self.base_value = self.evaluate()
+        gains = []
+        for candidate in candidates:
+            self.push(candidate)
+            gains.append(self.evaluate() - self.base_value)
+            self.pop(candidate)
+        # Most promising first, so good incumbents are found early.
+        order = sorted(range(len(candidates)), key=lambda i: -gains[i])
+        self.candidates = [candidates[i] for i in order]
+        self.gains = [gains[i] for i in order]
+
+        self.best_value = self.base_value
+        self.best: tuple[Candidate, ...] = ()
+        self.best_cost = 0
+        self.chosen: list[Candidate] = []
+
+    def evaluate(self) -> float:
+        self.evaluated += 1
+        return self.objective(self.scratch)
+
+    def push(self, candidate: Candidate) -> None:
+        # Through the character so its fingerprint (and so get_sheet, for
+        # custom objectives) follows along.
+        kind = effect_kind(candidate.effect)
+        if kind == "enchantment":
+            # On a copy of the main hand, the character's own weapon is shared.
+            weapon = self.scratch.main_hand
+            self.scratch.main_hand = dataclasses.replace(
+                weapon, enchantments=[*weapon.enchantments, candidate.effect]
+            )
+        else:
+            self.scratch.add_effect(candidate.effect, EFFECT_LISTS[kind])
+
+    def pop(self, candidate: Candidate) -> None:
+        if effect_kind(candidate.effect) == "enchantment":
+            weapon = self.scratch.main_hand
+            self.scratch.main_hand = dataclasses.replace(
+                weapon,
+                enchantments=[
+                    enchantment
+                    for enchantment in weapon.enchantments
+                    if enchantment is not candidate.effect
+                ],
+            )
+        else:
+            self.scratch.remove_effect(candidate.effect)
+
+    def fits(self, candidate: Candidate, cost: int) -> bool:
+        if cost + candidate.cost > self.budget:
+            return False
+        if candidate.slot is None:
+            return True
+        return self.slot_use[candidate.slot] < self.slots.get(candidate.slot, 1)
+
+    def bound(self, index: int, value: float) -> float:
+        return math.inf
+
+    def run(self, index: int = 0, value: float | None = None, cost: int = 0) -> None:
+        if value is None:
+            value = self.base_value
+        if value > self.best_value or (
+            value == self.best_value and cost < self.best_cost
+        ):
+            self.best_value, self.best, self.best_cost = value, tuple(self.chosen), cost
+        if index == len(self.candidates) or self.bound(index, value) < self.best_value:
+            return
+
+        candidate = self.candidates[index]
+        if self.fits(candidate, cost):
+            self.push(candidate)
+            self.chosen.append(candidate)
+            if candidate.slot is not None:
+                self.slot_use[candidate.slot] += 1
+            self.run(index + 1, self.evaluate(), cost + candidate.cost)
+            if candidate.slot is not None:
+                self.slot_use[candidate.slot] -= 1
+            self.chosen.pop()
+            self.pop(candidate)
+        self.run(index + 1, value, cost)
+
+    def trim(self) -> None:
+        """Drop picks from the best loadout which don't add to its value."""
+        best = list(self.best)
+        for candidate in best:
+            self.push(candidate)
+        # Most expensive first, so of two overlapping picks the cheaper stays.
+        for candidate in sorted(self.best, key=lambda candidate: -candidate.cost):
+            self.pop(candidate)
+            if self.evaluate() >= self.best_value:
+                best.remove(candidate)
+                self.best_cost -= candidate.cost
+            else:
+                self.push(candidate)
+        for candidate in best:
+            self.pop(candidate)
+        self.best = tuple(best)
+
+
+class _ArmourClassSearch(_Search):
+    def __init__(self, character: Character, candidates: list[Candidate], *args):
+        # Candidates which can't add any AC are never worth their cost or slot,
+        # and branching on them doubles the search for nothing.
+        candidates = [
+            candidate
+            for candidate in candidates
+            if _ac_contribution(candidate.effect, character)
+        ]
+        super().__init__(character, candidates, total_ac, *args)
+        contributions = [
+            _ac_contribution(candidate.effect, self.scratch)
+            for candidate in self.candidates
+        ]
+        # Best bonus of each type among the candidates from index onwards.
+        self.remaining: list[dict] = [{}] * (len(contributions) + 1)
+        for i in range(len(contributions) - 1, -1, -1):
+            best = dict(self.remaining[i + 1])
+            for key, bonus in contributions[i].items():
+                if key == Statistic.DEXTERITY:
+                    best[key] = best.get(key, 0) + bonus
+                else:
+                    best[key] = max(best.get(key, 0), bonus)
+            self.remaining[i] = best
+
+    def bound(self, index: int, value: float) -> float:
+        current = self.scratch.armour_bonuses()
+        bound = value
+        for key, bonus in self.remaining[index].items():
+            if key == Statistic.DEXTERITY:
+                # Candidates can only lower max dex, so the current one caps it.
+                max_dex = min(
+                    getattr(effect, "max_dex_bonus", 99)
+                    for effect in self.scratch.all_effects()
+                )
+                headroom = max(0, max_dex - current.get(ACType.DEXTERITY, 0))
+                bound += min((bonus + 1) // 2, headroom)
+            elif isinstance(key, tuple):
+                # Enhancements are summed per armour and shield, so assume the
+                # current one could be replaced entirely.
+                bound += bonus
+            else:
+                bound += max(0, bonus - current.get(key, 0))
+        return bound
+
+
+class _GainSearch(_Search):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.remaining = [0.0] * (len(self.candidates) + 1)
+        for i in range(len(self.candidates) - 1, -1, -1):
+            self.remaining[i] = self.remaining[i + 1] + max(0.0, self.gains[i])
+
+    def bound(self, index: int, value: float) -> float:
+        return value + self.remaining[index]
+
+
+def optimize_loadout(
+    character: Character,
+    candidates: Iterable[Candidate],
+    objective: str | Objective = "ac",
+    budget: int | None = None,
+    slots: Mapping[str, int] | None = None,
+    target_ac: int = 25,
+    exact: bool = False,
+) -> Loadout:
+    """The combination of candidates which maximises the objective.
+
+    `objective` is "ac", "dpr" (expected damage per round against `target_ac`)
+    or any function of a character. Candidates are added on top of what the
+    character already has, subject to the gold budget and slot capacities.
+    """
+    candidates = list(candidates)
+    slots = DEFAULT_SLOTS | dict(slots or {})
+    if objective == "ac":
+        search = _ArmourClassSearch(character, candidates, budget, slots)
+    elif objective == "dpr" and not exact:
+        search = _GainSearch(
+            character, candidates, damage_per_round(target_ac), budget, slots
+        )
+    else:
+        if objective == "dpr":
+            objective = damage_per_round(target_ac)
+        search = _Search(character, candidates, objective, budget, slots)
+
+    search.run()
+    search.trim()
+    return Loadout(
+        candidates=search.best,
+        value=search.best_value,
+        cost=search.best_cost,
+        evaluated=search.evaluated,
+    )
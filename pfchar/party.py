@@ -0,0 +1,58 @@
+"""
+Statistics of a whole party at once, for dashboards.
+
+Every character is a row of base values plus one row per stat-modifying
+effect, all in `STATISTICS` order, so the modified statistics are column sums
+and the modifiers come from a lookup table rather than a call per cell.
+Statistic bonuses don't depend on toggles, so one row per character covers
+every toggle state.
+"""
+
+import dataclasses
+from typing import Iterable
+
+from pfchar.char.base import STATISTIC_INDEX, STATISTICS, Statistic, stat_modifier
+from pfchar.char.character import Character
+
+# stat_modifier for every score up to _MAX_SCORE, anything higher is computed.
+_MAX_SCORE = 60
+_MODIFIERS = tuple(stat_modifier(score) for score in range(_MAX_SCORE + 1))
+
+
+def _modifier(score: int) -> int:
+    return _MODIFIERS[score] if 0 <= score <= _MAX_SCORE else stat_modifier(score)
+
+
+@dataclasses.dataclass(frozen=True)
+class StatisticsMatrix:
+    characters: tuple[str, ...]
+    statistics: tuple[Statistic, ...]
+    # [character][statistic]
+    base: tuple[tuple[int, ...], ...]
+    modified: tuple[tuple[int, ...], ...]
+    modifiers: tuple[tuple[int, ...], ...]
+
+    def _cell(self, rows, name: str, stat: Statistic) -> int:
+        return rows[self.characters.index(name)][STATISTIC_INDEX[stat]]
+
+    def score(self, name: str, stat: Statistic) -> int:
+        return self._cell(self.modified, name, stat)
+
+    def modifier(self, name: str, stat: Statistic) -> int:
+        return self._cell(self.modifiers, name, stat)
+
+    def column(self, stat: Statistic) -> tuple[int, ...]:
+        """The modified score of every character for one statistic."""
+        return tuple(row[STATISTIC_INDEX[stat]] for row in self.modified)
+
+
+def party_statistics(party: Iterable[Character]) -> StatisticsMatrix:
+    party = tuple(party)
+    modified = tuple(character.modified_statistics() for character in party)
+    return StatisticsMatrix(
+        characters=tuple(character.name for character in party),
+        statistics=STATISTICS,
+        base=tuple(character.statistic_vector() for character in party),
+        modified=modified,
+        modifiers=tuple(tuple(map(_modifier, row)) for row in modified),
+    )
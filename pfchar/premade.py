@@ -230,3 +230,6 @@ CHELLYBEAN = Character(
         ),
     ],
 )
+
+
+ALL_CHARACTERS = (YOYU, DORAMAK, CHELLYBEAN)
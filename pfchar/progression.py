@@ -0,0 +1,143 @@
+"""
+A character's sheet at every level, for planning builds ahead.
+
+    table = level_progression(YOYU, full_bab, {Save.FORTITUDE: good_save, ...})
+    table.attack_strings[9]  # at level 10
+
+The table is computed column-wise on a single scratch copy of the character,
+only the level and base values change between levels. Values that can't depend
+on level (crit, armour class) are computed once.
+"""
+
+import copy
+import dataclasses
+from typing import Callable, Iterable, Mapping, Sequence
+
+from pfchar.char.base import BAB_KEY, Save
+from pfchar.char.character import Character
+from pfchar.utils import (
+    crit_to_string,
+    get_flat_footed_ac,
+    get_total_ac,
+    get_touch_ac,
+    iterative_attacks,
+    sum_up_modifiers,
+)
+
+MAX_LEVEL = 20
+
+# Either a per level function, or values indexed by the position in `levels`.
+Progression = Callable[[int], int] | Sequence[int]
+
+
+def full_bab(level: int) -> int:
+    return level
+
+
+def three_quarter_bab(level: int) -> int:
+    return level * 3 // 4
+
+
+def half_bab(level: int) -> int:
+    return level // 2
+
+
+def good_save(level: int) -> int:
+    return 2 + level // 2
+
+
+def poor_save(level: int) -> int:
+    return level // 3
+
+
+@dataclasses.dataclass(frozen=True)
+class ProgressionTable:
+    levels: tuple[int, ...]
+    base_attack_bonus: tuple[int, ...]
+    attacks: tuple[tuple[int, ...], ...]
+    attack_strings: tuple[str, ...]
+    damage_strings: tuple[str, ...]
+    cmb: tuple[int, ...]
+    cmd: tuple[int, ...]
+    saves: dict[Save, tuple[int, ...]]
+    # Level independent.
+    critical_string: str
+    total_ac: int
+    touch_ac: int
+    flat_footed_ac: int
+
+    def rows(self) -> list[dict[str, object]]:
+        return [
+            {
+                "Level": level,
+                BAB_KEY: self.base_attack_bonus[i],
+                "To Hit": self.attack_strings[i],
+                "Damage": self.damage_strings[i],
+                "CMB": self.cmb[i],
+                "CMD": self.cmd[i],
+                **{save.value: values[i] for save, values in self.saves.items()},
+            }
+            for i, level in enumerate(self.levels)
+        ]
+
+
+def _column(progression: Progression, levels: Sequence[int]) -> tuple[int, ...]:
+    if callable(progression):
+        return tuple(progression(level) for level in levels)
+    if len(progression) != len(levels):
+        raise ValueError(
+            f"Expected {len(levels)} progression values, got {len(progression)}"
+        )
+    return tuple(progression)
+
+
+def level_progression(
+    character: Character,
+    base_attack_bonus: Progression,
+    base_saves: Mapping[Save, Progression],
+    levels: Iterable[int] = range(1, MAX_LEVEL + 1),
+) -> ProgressionTable:
+    levels = tuple(levels)
+    bab_column = _column(base_attack_bonus, levels)
+    save_columns = {save: _column(values, levels) for save, values in base_saves.items()}
+
+    scratch = copy.copy(character)
+    armour_class = scratch.armour_bonuses()
+    critical = scratch.critical_bonus() if scratch.main_hand else None
+    # CMD only depends on level through BAB.
+    cmd_without_bab = sum(scratch.get_cmd().values()) - scratch.base_attack_bonus
+
+    attacks, attack_strings, damage_strings, cmb, cmd = [], [], [], [], []
+    saves = {save: [] for save in save_columns}
+    for i, level in enumerate(levels):
+        scratch.level = level
+        scratch.base_attack_bonus = bab_column[i]
+        scratch.base_saves = {save: column[i] for save, column in save_columns.items()}
+
+        if scratch.main_hand:
+            level_attacks = tuple(iterative_attacks(scratch.attack_bonus()))
+            damage = sum_up_modifiers(scratch.damage_bonus())
+        else:
+            level_attacks, damage = (), ""
+        attacks.append(level_attacks)
+        attack_strings.append("/".join(f"{attack:+d}" for attack in level_attacks))
+        damage_strings.append(damage)
+        cmb.append(sum(scratch.get_cmb().values()))
+        cmd.append(cmd_without_bab + bab_column[i])
+        for save, breakdown in scratch.get_saves().items():
+            saves[save].append(sum(breakdown.values()))
+
+    return ProgressionTable(
+        levels=levels,
+        base_attack_bonus=bab_column,
+        attacks=tuple(attacks),
+        attack_strings=tuple(attack_strings),
+        damage_strings=tuple(damage_strings),
+        cmb=tuple(cmb),
+        cmd=tuple(cmd),
+        saves={save: tuple(values) for save, values in saves.items()},
+        critical_string=crit_to_string(critical) if critical else "",
+        total_ac=get_total_ac(armour_class),
+        touch_ac=get_touch_ac(armour_class),
+        flat_footed_ac=get_flat_footed_ac(armour_class),
+    )
@@ -0,0 +1,96 @@
+"""
+Hot reload of character definitions into the running server.
+
+    watcher = DefinitionWatcher("pfchar.premade")
+    for definition in watcher.poll():  # characters whose definition was edited
+        transfer_state(live[definition.name], definition)
+
+The module's file is polled by modification time, so polling an unchanged file
+is a single stat. When it changes the module is re-run with `importlib.reload`
+and each character is compared with its previous definition by fingerprint
+(see `Character.fingerprint`), so only the characters which were actually
+edited come back. A module which fails to import is logged (and kept in
+`error`) and the previous definitions are kept, a typo mid-session doesn't stop
+the server.
+
+`transfer_state` carries the session over to the new definition: toggles and
+two handed where the effect names still match, and statuses added during the
+session.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import pathlib
+import traceback
+
+from pfchar.char.character import Character
+
+logger = logging.getLogger(__name__)
+
+
+class DefinitionWatcher:
+    def __init__(self, module_name: str = "pfchar.premade", attribute: str = "ALL_CHARACTERS"):
+        self.module = importlib.import_module(module_name)
+        self.attribute = attribute
+        self.path = pathlib.Path(self.module.__file__)
+        self._stat = self._file_stat()
+        self._fingerprints = self._definition_fingerprints(self.definitions())
+        # The traceback of the last failed reload, None once one succeeds.
+        self.error: str | None = None
+
+    def definitions(self) -> list[Character]:
+        return list(getattr(self.module, self.attribute))
+
+    def _file_stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _definition_fingerprints(characters: list[Character]) -> dict[str, str]:
+        return {character.name: character.fingerprint for character in characters}
+
+    def poll(self) -> list[Character]:
+        """Freshly built definitions of the characters edited since the last poll."""
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return []
+        self._stat = stat
+        # Cached bytecode is checked against the source's mtime in whole
+        # seconds and its size, so a quick edit of the same length would be
+        # missed.
+        pathlib.Path(importlib.util.cache_from_source(self.path)).unlink(missing_ok=True)
+        try:
+            importlib.reload(self.module)
+            definitions = self.definitions()
+        except Exception:
+            logger.exception("Couldn't reload %s", self.path)
+            self.error = traceback.format_exc()
+            return []
+        self.error = None
+
+        fingerprints = self._definition_fingerprints(definitions)
+        changed = [
+            character
+            for character in definitions
+            if self._fingerprints.get(character.name) != fingerprints[character.name]
+        ]
+        self._fingerprints = fingerprints
+        return changed
+
+
+def transfer_state(old: Character, new: Character) -> None:
+    """Carry the session state of `old` over to `new`, its new definition."""
+    toggles = {effect.name: effect.condition.enabled for effect in old.toggleable_effects()}
+    for effect in new.toggleable_effects():
+        if effect.name in toggles:
+            new.set_toggle(effect, toggles[effect.name])
+    defined = {status.name for status in new.statuses}
+    for status in old.statuses:
+        if status.name not in defined:
+            new.add_status(status)
+    new._two_handed = old._two_handed
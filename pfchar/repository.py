@@ -0,0 +1,242 @@
+"""
+Characters and NPCs stored in SQLite, indexed for listing and loaded lazily.
+
+    repository = Repository("characters.db")
+    repository.save_many(npcs, campaign="Rise of the Runelords")
+    repository.page(campaign="Rise of the Runelords", level=(5, 8), limit=20)
+    repository.load("Doramak Colegard")
+
+Listing only reads the indexed summary columns. A character is stored as two
+pickles: the core (statistics, saves, weapons) and its effect lists, so views
+which don't need effects don't unpickle them. Pages use the name as a cursor
+(`after=`) rather than an offset, so each page is a range scan of the index.
+"""
+
+import dataclasses
+import pickle
+import sqlite3
+from typing import Iterable, Iterator, Mapping
+
+from pfchar.char.character import EFFECT_ATTRIBUTES, Character
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    name TEXT PRIMARY KEY,
+    level INTEGER NOT NULL,
+    campaign TEXT,
+    weapon_type TEXT,
+    fingerprint TEXT NOT NULL,
+    core BLOB NOT NULL,
+    effects BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS characters_level ON characters (level, name);
+CREATE INDEX IF NOT EXISTS characters_campaign ON characters (campaign, name);
+CREATE INDEX IF NOT EXISTS characters_weapon_type ON characters (weapon_type, name);
+"""
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclasses.dataclass(frozen=True)
+class CharacterSummary:
+    name: str
+    level: int
+    campaign: str | None
+    weapon_type: str | None
+    fingerprint: str
+
+
+_FIELDS = frozenset(field.name for field in dataclasses.fields(Character))
+
+
+def _row(character: Character, campaign: str | None) -> tuple:
+    effects = {name: getattr(character, name) for name in EFFECT_ATTRIBUTES}
+    core = dict(vars(character))
+    for name in EFFECT_ATTRIBUTES:
+        core[name] = []
+    for name in [name for name in core if name not in _FIELDS]:
+        # Fingerprint digests and memoised values, rebuilt on load.
+        del core[name]
+    main_hand = character.main_hand
+    return (
+        character.name,
+        character.level,
+        campaign,
+        main_hand.type.value if main_hand is not None else None,
+        character.fingerprint,
+        pickle.dumps(core),
+        pickle.dumps(effects),
+    )
+
+
+class Repository:
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM characters").fetchone()[0]
+
+    def __contains__(self, name: str) -> bool:
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM characters WHERE name = ?", (name,)
+            ).fetchone()
+            is not None
+        )
+
+    def campaign(self, name: str) -> str | None:
+        """The campaign the character is stored under, None if none or not stored."""
+        row = self._connection.execute(
+            "SELECT campaign FROM characters WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def save(self, character: Character, campaign: str | None = None) -> None:
+        self.save_many([character], campaign)
+
+    def save_many(
+        self,
+        characters: Iterable[Character],
+        campaign: str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Insert or replace characters, one transaction per batch."""
+        saved = 0
+        batch = []
+        for character in characters:
+            batch.append(_row(character, campaign))
+            if len(batch) >= batch_size:
+                saved += self._write(batch)
+                batch = []
+        if batch:
+            saved += self._write(batch)
+        return saved
+
+    def _write(self, rows: list[tuple]) -> int:
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO characters"
+                " (name, level, campaign, weapon_type, fingerprint, core, effects)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def delete(self, name: str) -> bool:
+        with self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM characters WHERE name = ?", (name,)
+            )
+        return cursor.rowcount > 0
+
+    def page(
+        self,
+        after: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        campaign: str | None = None,
+        level: int | tuple[int, int] | None = None,
+        weapon_type: str | None = None,
+        name_prefix: str | None = None,
+    ) -> list[CharacterSummary]:
+        """Summaries ordered by name, starting after the `after` name.
+
+        `level` is either a level or an inclusive (low, high) range.
+        """
+        clauses, parameters = [], []
+        if after is not None:
+            clauses.append("name > ?")
+            parameters.append(after)
+        if campaign is not None:
+            clauses.append("campaign = ?")
+            parameters.append(campaign)
+        if isinstance(level, tuple):
+            clauses.append("level BETWEEN ? AND ?")
+            parameters.extend(level)
+        elif level is not None:
+            clauses.append("level = ?")
+            parameters.append(level)
+        if weapon_type is not None:
+            clauses.append("weapon_type = ?")
+            parameters.append(weapon_type)
+        if name_prefix:
+            # A range rather than LIKE, so the name index is used.
+            clauses.append("name >= ? AND name < ?")
+            parameters.extend((name_prefix, name_prefix + "\U0010ffff"))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection.execute(
+            "SELECT name, level, campaign, weapon_type, fingerprint FROM characters"
+            f" {where} ORDER BY name LIMIT ?",
+            (*parameters, limit),
+        )
+        return [CharacterSummary(*row) for row in rows]
+
+    def names(self) -> Iterator[str]:
+        for (name,) in self._connection.execute(
+            "SELECT name FROM characters ORDER BY name"
+        ):
+            yield name
+
+    def load(self, name: str, effects: bool = True) -> Character | None:
+        """The stored character, without its effect lists unless `effects`."""
+        columns = "core, effects" if effects else "core"
+        row = self._connection.execute(
+            f"SELECT {columns} FROM characters WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        fields = pickle.loads(row[0])
+        if effects:
+            fields |= pickle.loads(row[1])
+        return Character(**fields)
+
+
+class LoadedCharacters(Mapping[str, Character]):
+    """Live characters by name, loaded from the repository on first access.
+
+    Callers hold on to the returned objects (hub subscriptions, histories), so
+    a character is loaded once and kept, a second copy would diverge.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+        self._loaded: dict[str, Character] = {}
+
+    def __getitem__(self, name: str) -> Character:
+        character = self._loaded.get(name)
+        if character is None:
+            character = self.repository.load(name)
+            if character is None:
+                raise KeyError(name)
+            self._loaded[name] = character
+        return character
+
+    def replace(self, character: Character) -> Character | None:
+        """Swap in a new object for the character, eg, a reloaded definition.
+
+        Returns the object it replaces, if that was loaded, whoever holds on
+        to it has to let go of it.
+        """
+        previous = self._loaded.get(character.name)
+        self._loaded[character.name] = character
+        return previous
+
+    def loaded(self) -> list[Character]:
+        """The characters loaded so far, without loading any others."""
+        return list(self._loaded.values())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._loaded or (
+            isinstance(name, str) and name in self.repository
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return self.repository.names()
+
+    def __len__(self) -> int:
+        return len(self.repository)
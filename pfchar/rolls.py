@@ -0,0 +1,235 @@
+"""
+Dice rolled at the table, with how they compare to the odds.
+
+Each character has a `RollLog`, a ring buffer of its last `capacity` rolls, so a
+long session holds the same memory as a short one. Aggregates over the rolls
+in the log are kept as running sums, added to as a roll comes in and taken off
+as it falls out of the buffer, which keeps every roll O(1). Each roll also
+records its expected outcome (see `pfchar.simulate`) and those are summed the
+same way, so the actual rates can be shown next to the expected ones.
+
+Damage is rolled for each attack which hit in the last full attack rolled,
+multiplied on a confirmed critical, so it goes with the attack rolls before it.
+"""
+
+import collections
+import dataclasses
+import random
+from typing import Sequence
+
+from pfchar.char.base import Attack, Dice
+from pfchar.simulate import attack_roll_hits, average_damage, hit_chance, roll_dice
+from pfchar.utils import sum_up_dice
+
+DEFAULT_CAPACITY = 200
+DEFAULT_ARMOUR_CLASS = 20
+# Hit chances are in 20ths and critical chances in 400ths, summed as whole
+# 400ths so taking rolls off again doesn't drift.
+_CHANCE_SCALE = 400
+# Average damage is in halves (a die averages (sides + 1) / 2), summed as whole
+# halves for the same reason.
+_DAMAGE_SCALE = 2
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AttackRoll:
+    weapon: str
+    bonus: int
+    natural: int
+    armour_class: int
+    hit: bool
+    critical: bool
+    # Chances of a hit and of a confirmed critical with the bonus against the AC.
+    hit_chance: float
+    critical_chance: float
+
+    @property
+    def total(self) -> int:
+        return self.natural + self.bonus
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class DamageRoll:
+    dice: str
+    total: int
+    expected: float
+    # The attack whose damage this is, if rolled for a hit.
+    weapon: str = ""
+    critical: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class RollStatistics:
+    attacks: int
+    hit_rate: float
+    expected_hit_rate: float
+    critical_rate: float
+    expected_critical_rate: float
+    damage_rolls: int
+    mean_damage: float
+    expected_damage: float
+
+
+class _Totals:
+    __slots__ = (
+        "attacks",
+        "hits",
+        "criticals",
+        "hit_chance",
+        "critical_chance",
+        "damage_rolls",
+        "damage",
+        "expected_damage",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add(self, roll: AttackRoll | DamageRoll, sign: int = 1) -> None:
+        if isinstance(roll, AttackRoll):
+            self.attacks += sign
+            self.hits += sign * roll.hit
+            self.criticals += sign * roll.critical
+            self.hit_chance += sign * round(roll.hit_chance * _CHANCE_SCALE)
+            self.critical_chance += sign * round(roll.critical_chance * _CHANCE_SCALE)
+        else:
+            self.damage_rolls += sign
+            self.damage += sign * roll.total
+            self.expected_damage += sign * round(roll.expected * _DAMAGE_SCALE)
+
+
+def attack_damage(attack: Attack, critical: bool = False) -> list[Dice]:
+    """The dice of an attack which hit, multiplied on a confirmed critical."""
+    if not critical:
+        return [*attack.damage, *attack.extra_damage]
+    multiplier = attack.critical.crit_multiplier
+    return [
+        *(
+            dataclasses.replace(
+                dice, num=dice.num * multiplier, modifier=dice.modifier * multiplier
+            )
+            for dice in attack.damage
+        ),
+        *attack.extra_damage,
+        *attack.critical.damage_bonus,
+    ]
+
+
+class RollLog:
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        armour_class: int = DEFAULT_ARMOUR_CLASS,
+        rng: random.Random | None = None,
+    ):
+        self.capacity = capacity
+        # AC the attacks are rolled against.
+        self.armour_class = armour_class
+        self._rng = rng or random.Random()
+        self._rolls: collections.deque[AttackRoll | DamageRoll] = collections.deque(
+            maxlen=capacity
+        )
+        self._totals = _Totals()
+        # Attacks which hit in the last full attack, with whether they were
+        # confirmed criticals, until their damage is rolled.
+        self._hits: list[tuple[Attack, bool]] | None = None
+        # Rolls over the whole session, including those no longer in the log.
+        self.rolled = 0
+
+    def __len__(self) -> int:
+        return len(self._rolls)
+
+    def recent(self, count: int | None = None) -> list[AttackRoll | DamageRoll]:
+        """The most recent rolls, newest first."""
+        rolls = reversed(self._rolls)
+        if count is None:
+            return list(rolls)
+        return [roll for roll, _ in zip(rolls, range(count))]
+
+    def add(self, roll: AttackRoll | DamageRoll) -> None:
+        if len(self._rolls) == self.capacity:
+            self._totals.add(self._rolls[0], -1)
+        self._rolls.append(roll)
+        self._totals.add(roll)
+        self.rolled += 1
+
+    def clear(self) -> None:
+        self._rolls.clear()
+        self._totals = _Totals()
+        self._hits = None
+
+    def roll_attacks(self, attacks: Sequence[Attack]) -> list[AttackRoll]:
+        """A d20 for each attack of a full attack, confirming threats with another."""
+        rng = self._rng
+        armour_class = self.armour_class
+        rolls = []
+        for attack in attacks:
+            bonus, critical = attack.bonus, attack.critical
+            natural = rng.randint(1, 20)
+            hit = attack_roll_hits(natural, bonus, armour_class)
+            chance = hit_chance(bonus, armour_class)
+            threat_chance = (21 - critical.crit_range) / 20
+            roll = AttackRoll(
+                weapon=attack.weapon,
+                bonus=bonus,
+                natural=natural,
+                armour_class=armour_class,
+                hit=hit,
+                critical=(
+                    hit
+                    and natural >= critical.crit_range
+                    and attack_roll_hits(rng.randint(1, 20), bonus, armour_class)
+                ),
+                hit_chance=chance,
+                critical_chance=min(chance, threat_chance) * chance,
+            )
+            self.add(roll)
+            rolls.append(roll)
+        self._hits = [
+            (attack, roll.critical) for attack, roll in zip(attacks, rolls) if roll.hit
+        ]
+        return rolls
+
+    def roll_damage(
+        self, dice: list[Dice], weapon: str = "", critical: bool = False
+    ) -> DamageRoll:
+        roll = DamageRoll(
+            dice=sum_up_dice(dice).strip(),
+            total=roll_dice(dice, self._rng),
+            expected=average_damage(dice),
+            weapon=weapon,
+            critical=critical,
+        )
+        self.add(roll)
+        return roll
+
+    def roll_hit_damage(self) -> list[DamageRoll] | None:
+        """The damage of each hit of the last full attack, see `roll_attacks`.
+
+        None if no full attack was rolled since the last time, each hit's
+        damage is only rolled once.
+        """
+        hits, self._hits = self._hits, None
+        if hits is None:
+            return None
+        return [
+            self.roll_damage(attack_damage(attack, critical), attack.weapon, critical)
+            for attack, critical in hits
+        ]
+
+    def statistics(self) -> RollStatistics:
+        """Actual and expected rates over the rolls in the log."""
+        totals = self._totals
+        attacks = totals.attacks or 1
+        damage_rolls = totals.damage_rolls or 1
+        return RollStatistics(
+            attacks=totals.attacks,
+            hit_rate=totals.hits / attacks,
+            expected_hit_rate=totals.hit_chance / _CHANCE_SCALE / attacks,
+            critical_rate=totals.criticals / attacks,
+            expected_critical_rate=totals.critical_chance / _CHANCE_SCALE / attacks,
+            damage_rolls=totals.damage_rolls,
+            mean_damage=totals.damage / damage_rolls,
+            expected_damage=totals.expected_damage / _DAMAGE_SCALE / damage_rolls,
+        )
@@ -0,0 +1,211 @@
+"""
+Chance of each party member making each save across a range of DCs.
+
+A save succeeds on d20 + bonus >= DC, a natural 20 always succeeds and a natural
+1 always fails, so the chance only depends on DC - bonus. Every row of the
+matrix is a slice of one precomputed table, and the save totals come from the
+cached sheets, so recomputing after a status change is cheap enough to do
+every frame.
+
+`area_save` goes the other way, resolving a character's area effect (eg, a
+Reflex half blast) against a crowd of targets:
+
+    result = area_save([Dice(19, 6)], dc=21, bonuses=[4] * 30 + [9] * 6)
+    result.saved, result.damage
+
+It works on whole columns rather than target by target: every d20 comes from
+one call to the RNG, as do all the faces of each dice across every target, and
+the damage is kept as one column of per-target totals per damage type, so
+halving and resistances are a pass over each column.
+"""
+
+import dataclasses
+import operator
+import random
+from typing import Iterable, Mapping, Sequence
+
+from pfchar.char.base import DAMAGE_TYPE_INDEX, DAMAGE_TYPES, Dice, Save
+from pfchar.char.character import Character
+from pfchar.sheet import get_sheet
+
+# Chance of success indexed by (DC - bonus) + _OFFSET, clamped to 5% and 95%
+# outside of the range where the roll matters.
+_OFFSET = 1
+_CHANCES = tuple(min(19, max(1, 21 - needed)) / 20 for needed in range(-_OFFSET, 22))
+
+
+def save_chance(bonus: int, dc: int) -> float:
+    index = min(len(_CHANCES) - 1, max(0, dc - bonus + _OFFSET))
+    return _CHANCES[index]
+
+
+def _row(bonus: int, dcs: range) -> tuple[float, ...]:
+    start = dcs.start - bonus + _OFFSET
+    stop = dcs.stop - bonus + _OFFSET
+    # Inside the table this is a plain slice, only pad where it's clamped.
+    before = max(0, min(-start, len(dcs)))
+    after = max(0, min(stop - len(_CHANCES), len(dcs)))
+    middle = _CHANCES[max(0, start) : max(0, min(len(_CHANCES), stop))]
+    return (_CHANCES[0],) * before + middle + (_CHANCES[-1],) * after
+
+
+@dataclasses.dataclass(frozen=True)
+class SaveMatrix:
+    characters: tuple[str, ...]
+    saves: tuple[Save, ...]
+    dcs: range
+    # Save totals [character][save].
+    bonuses: tuple[tuple[int, ...], ...]
+    # Chance of success [character][save][dc].
+    probabilities: tuple[tuple[tuple[float, ...], ...], ...]
+
+    def chance(self, name: str, save: Save, dc: int) -> float:
+        return self.probabilities[self.characters.index(name)][
+            self.saves.index(save)
+        ][self.dcs.index(dc)]
+
+
+def save_matrix(
+    party: Iterable[Character],
+    dcs: range = range(10, 41),
+    situational: Mapping[Save, int] | None = None,
+    per_character: Mapping[str, Mapping[Save, int]] | None = None,
+) -> SaveMatrix:
+    """Success chances for every character, save and DC.
+
+    `situational` bonuses apply to the whole party (eg, +2 against fear) and
+    `per_character` adds bonuses that only some characters get, by name.
+    """
+    if dcs.step != 1:
+        raise ValueError("DC range must have a step of 1")
+    situational = situational or {}
+    per_character = per_character or {}
+    party = tuple(party)
+    saves = tuple(Save)
+
+    bonuses = []
+    for character in party:
+        breakdowns = get_sheet(character).saves
+        extra = per_character.get(character.name, {})
+        bonuses.append(
+            tuple(
+                sum(breakdowns.get(save, {}).values())
+                + situational.get(save, 0)
+                + extra.get(save, 0)
+                for save in saves
+            )
+        )
+
+    return SaveMatrix(
+        characters=tuple(character.name for character in party),
+        saves=saves,
+        dcs=dcs,
+        bonuses=tuple(bonuses),
+        probabilities=tuple(
+            tuple(_row(bonus, dcs) for bonus in character_bonuses)
+            for character_bonuses in bonuses
+        ),
+    )
+
+
+_D20 = range(1, 21)
+_NO_RESISTANCES = (0,) * len(DAMAGE_TYPES)
+
+
+@dataclasses.dataclass(frozen=True)
+class AreaSaveResult:
+    dc: int
+    # Per target, in the order of the bonuses.
+    rolls: tuple[int, ...]
+    saved: tuple[bool, ...]
+    damage: tuple[int, ...]
+
+    @property
+    def saves_made(self) -> int:
+        return sum(self.saved)
+
+    @property
+    def total_damage(self) -> int:
+        return sum(self.damage)
+
+
+def _damage_columns(
+    dice_list: Iterable[Dice], count: int, rng: random.Random
+) -> dict[int, list[int]]:
+    """Per-target totals of a roll of the dice, by damage type index."""
+    columns = {}
+    for dice in dice_list:
+        index = DAMAGE_TYPE_INDEX[dice.type]
+        column = columns.get(index, [0] * count)
+        # Without any dice only the modifier is added, as in `roll_dice`.
+        if dice.is_variable() and dice.num > 0:
+            faces = rng.choices(range(1, dice.sides + 1), k=count * dice.num)
+            # Sums of each consecutive run of `num` faces.
+            totals = map(sum, zip(*[iter(faces)] * dice.num))
+            column = [total + dice.modifier for total in map(operator.add, column, totals)]
+        else:
+            column = [total + dice.num + dice.modifier for total in column]
+        columns[index] = column
+    return columns
+
+
+def area_save(
+    damage: Sequence[Dice],
+    dc: int,
+    bonuses: Sequence[int],
+    shared_damage: bool = True,
+    negates: bool = False,
+    resistances: Sequence[Sequence[int]] | None = None,
+    rng: random.Random | None = None,
+) -> AreaSaveResult:
+    """Roll every target's save against the DC and the damage each takes.
+
+    With `shared_damage` the damage is rolled once for every target, as at the
+    table, otherwise once per target. A made save halves the total damage,
+    rounding down once rather than for each damage type, or negates it with
+    `negates`. `resistances` are per-target resistance vectors (see
+    `pfchar.simulate.resistance_vector`), applied after halving.
+    """
+    rng = rng or random.Random()
+    count = len(bonuses)
+    if resistances is not None and len(resistances) != count:
+        raise ValueError("resistances must be given for every target")
+
+    rolls = rng.choices(_D20, k=count)
+    saved = [
+        natural == 20 or (natural != 1 and natural + bonus >= dc)
+        for natural, bonus in zip(rolls, bonuses)
+    ]
+
+    if shared_damage:
+        columns = {
+            index: column * count
+            for index, column in _damage_columns(damage, 1, rng).items()
+        }
+    else:
+        columns = _damage_columns(damage, count, rng)
+    if resistances is not None:
+        resistances = [vector or _NO_RESISTANCES for vector in resistances]
+
+    # In halves, so the halved types are summed before rounding down.
+    totals = [0] * count
+    for index, column in columns.items():
+        if negates:
+            column = [0 if made else 2 * value for value, made in zip(column, saved)]
+        else:
+            column = [value if made else 2 * value for value, made in zip(column, saved)]
+        if resistances is not None:
+            column = [
+                max(0, value - 2 * vector[index])
+                for value, vector in zip(column, resistances)
+            ]
+        else:
+            column = [max(0, value) for value in column]
+        totals = list(map(operator.add, totals, column))
+
+    return AreaSaveResult(
+        dc=dc,
+        rolls=tuple(rolls),
+        saved=tuple(saved),
+        damage=tuple(total // 2 for total in totals),
+    )
@@ -0,0 +1,185 @@
+"""
+Typeahead search over every known effect: catalog entries, the effects of the
+premade characters and statuses created during the session.
+
+Names are indexed by prefix (the whole name and every word in it, kept sorted
+for bisection) and by trigram for matches in the middle of a word, so a query
+only ever looks at the names that can match.
+"""
+
+import bisect
+import copy
+import dataclasses
+from typing import Callable, Container, Iterable
+
+from pfchar.char.abilities import Ability
+from pfchar.char.base import Effect
+from pfchar.char.catalog import Catalog
+from pfchar.char.character import Character
+from pfchar.char.enchantments import WeaponEnchantment
+from pfchar.char.feats import Feat
+from pfchar.char.items import Item
+
+NGRAM = 3
+# The Character list each kind of effect is added to.
+EFFECT_LISTS = {
+    "ability": "abilities",
+    "feat": "feats",
+    "item": "items",
+    "status": "statuses",
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchEntry:
+    name: str
+    kind: str
+    factory: Callable[[], Effect]
+
+    def create(self) -> Effect:
+        return self.factory()
+
+
+def effect_kind(effect: Effect) -> str:
+    if kind := getattr(effect, "kind", None):
+        return kind
+    for cls, kind in (
+        (Feat, "feat"),
+        (Item, "item"),
+        (Ability, "ability"),
+        (WeaponEnchantment, "enchantment"),
+    ):
+        if isinstance(effect, cls):
+            return kind
+    return "status"
+
+
+def _copier(effect: Effect) -> Callable[[], Effect]:
+    def factory() -> Effect:
+        return copy.deepcopy(effect)
+
+    return factory
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class EffectIndex:
+    def __init__(self):
+        self._entries: list[SearchEntry] = []
+        self._ids: dict[str, int] = {}
+        # Sorted (lowercase name or name from each word onwards, entry id)
+        self._prefixes: list[tuple[str, int]] = []
+        self._ngrams: dict[str, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._ids
+
+    def _keys(self, name: str) -> list[str]:
+        lowered = name.lower()
+        keys = [lowered]
+        for i, char in enumerate(lowered):
+            if i and lowered[i - 1] in " (-/" and char not in " (-/":
+                keys.append(lowered[i:])
+        return keys
+
+    def add(self, name: str, kind: str, factory: Callable[[], Effect]) -> None:
+        """Add an entry, replacing any existing entry with the same name."""
+        self.update([SearchEntry(name, kind, factory)])
+
+    def update(self, entries: Iterable[SearchEntry]) -> None:
+        additions = []
+        for entry in entries:
+            lowered = entry.name.lower()
+            if (existing := self._ids.get(lowered)) is not None:
+                # Same keys, so only the entry itself needs replacing.
+                self._entries[existing] = entry
+                continue
+            entry_id = len(self._entries)
+            self._entries.append(entry)
+            self._ids[lowered] = entry_id
+            additions.extend((key, entry_id) for key in self._keys(entry.name))
+            for ngram in _ngrams(lowered):
+                self._ngrams.setdefault(ngram, set()).add(entry_id)
+
+        if len(additions) > 16:
+            self._prefixes.extend(additions)
+            self._prefixes.sort()
+        else:
+            for addition in additions:
+                bisect.insort(self._prefixes, addition)
+
+    def get(self, name: str) -> SearchEntry | None:
+        entry_id = self._ids.get(name.lower())
+        return None if entry_id is None else self._entries[entry_id]
+
+    def search(
+        self, query: str, limit: int = 10, kinds: Container[str] | None = None
+    ) -> list[SearchEntry]:
+        """Prefix matches (of the name or any word in it) first, then substrings."""
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        def wanted(entry_id: int) -> bool:
+            return kinds is None or self._entries[entry_id].kind in kinds
+
+        found: dict[int, None] = {}
+        start = bisect.bisect_left(self._prefixes, (query,))
+        for i in range(start, len(self._prefixes)):
+            key, entry_id = self._prefixes[i]
+            if not key.startswith(query) or len(found) >= limit:
+                break
+            if wanted(entry_id):
+                found[entry_id] = None
+
+        if len(found) < limit and len(query) >= NGRAM:
+            postings = [self._ngrams.get(ngram, set()) for ngram in _ngrams(query)]
+            postings.sort(key=len)
+            candidates = set.intersection(*postings) if postings else set()
+            matches = sorted(
+                (
+                    entry_id
+                    for entry_id in candidates
+                    if entry_id not in found
+                    and wanted(entry_id)
+                    and query in self._entries[entry_id].name.lower()
+                ),
+                key=lambda entry_id: self._entries[entry_id].name.lower().index(query),
+            )
+            for entry_id in matches[: limit - len(found)]:
+                found[entry_id] = None
+
+        return [self._entries[entry_id] for entry_id in found]
+
+    def add_effect(self, effect: Effect) -> None:
+        self.add(effect.name, effect_kind(effect), _copier(effect))
+
+    def add_catalog(self, catalog: Catalog) -> None:
+        self.update(
+            SearchEntry(name, entry.kind, entry.create)
+            for name, entry in catalog.entries.items()
+        )
+
+    def add_characters(self, characters: Iterable[Character]) -> None:
+        entries = []
+        for character in characters:
+            entries.extend(
+                SearchEntry(effect.name, effect_kind(effect), _copier(effect))
+                for effect in character.all_effects()
+            )
+        self.update(entries)
+
+
+def build_index(
+    characters: Iterable[Character] = (), catalog: Catalog | None = None
+) -> EffectIndex:
+    index = EffectIndex()
+    if catalog is not None:
+        index.add_catalog(catalog)
+    index.add_characters(characters)
+    return index
@@ -0,0 +1,52 @@
+"""
+Run the web app as several worker processes sharing character state.
+
+    python -m pfchar.serve --workers 4 --port 8080
+
+Worker i listens on port + i. A nicegui page keeps its UI state in the process
+which rendered it, so a browser must stay on one worker: either hand each table
+its own port, or put a proxy with sticky sessions (eg, nginx `ip_hash`) in
+front. Workers share characters and computed sheets through the SQLite
+database given by --state, see `pfchar.shared`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--state", default="pfchar-state.db")
+    args = parser.parse_args(argv)
+
+    workers = []
+    for i in range(args.workers):
+        env = dict(
+            os.environ, PFCHAR_PORT=str(args.port + i), PFCHAR_STATE=args.state
+        )
+        workers.append(subprocess.Popen([sys.executable, "-m", "pfchar.web"], env=env))
+        print(f"Worker {i} on http://localhost:{args.port + i}", flush=True)
+
+    try:
+        while True:
+            for i, worker in enumerate(workers):
+                if worker.poll() is not None:
+                    print(f"Worker {i} exited with {worker.returncode}", flush=True)
+                    return worker.returncode or 1
+            time.sleep(1)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
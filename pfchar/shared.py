@@ -0,0 +1,172 @@
+"""
+Character session state shared between server processes, through SQLite.
+
+Each worker process keeps its own `Character` objects and sheet caches. After a
+worker changes a character it saves the character's session state (see
+`pfchar.history.CharacterState`) here, bumping the row's version. The other
+workers poll `PRAGMA data_version`, which only changes when another connection
+commits, so an idle poll is a single pragma. When it moves they apply every
+row whose version they haven't seen yet.
+
+Computed sheets are shared too, keyed by fingerprint: a worker's sheet cache
+reads through to the `sheets` table before computing, so a sheet is computed
+once across all the workers.
+
+Applying a state keeps this process's effect objects wherever the same name
+is at the same position, since the pages' switches are bound to them. Only
+effects which were added or moved are taken from the other process, and when
+that isn't enough to reproduce its state the character's name is put in
+`replaced` so the pages showing it can be rebuilt.
+
+The database is in WAL mode, so readers never block the writer.
+"""
+
+import pickle
+import sqlite3
+from typing import Mapping
+
+from pfchar.char.base import Effect
+from pfchar.char.character import EFFECT_ATTRIBUTES, Character
+from pfchar.history import CharacterState
+from pfchar.sheet import Sheet
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    fingerprint TEXT PRIMARY KEY,
+    sheet BLOB NOT NULL
+);
+"""
+
+DEFAULT_POLL_INTERVAL = 0.1
+DEFAULT_MAX_SHEETS = 10_000
+
+
+def _merge_effects(current: list[Effect], incoming: tuple[Effect, ...]) -> list[Effect]:
+    """`incoming`, but with the current object where the name at its position matches."""
+    return [
+        current[i] if i < len(current) and current[i].name == effect.name else effect
+        for i, effect in enumerate(incoming)
+    ]
+
+
+def apply_state(state: CharacterState, character: Character) -> None:
+    """Apply another process's state, keeping this process's effect objects."""
+    for attribute in EFFECT_ATTRIBUTES:
+        current = getattr(character, attribute)
+        merged = _merge_effects(current, getattr(state, attribute))
+        if len(merged) != len(current) or any(a is not b for a, b in zip(merged, current)):
+            character.set_effects(attribute, merged)
+    character._two_handed = state.two_handed
+    for effect, enabled in zip(character.toggleable_effects(), state.toggles):
+        character.set_toggle(effect, enabled)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class SharedState:
+    def __init__(
+        self,
+        path: str,
+        characters: Mapping[str, Character],
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_sheets: int = DEFAULT_MAX_SHEETS,
+    ):
+        self.path = path
+        self.characters = characters
+        self.poll_interval = poll_interval
+        self.max_sheets = max_sheets
+        self._connection = connect(path)
+        # Version of each character this process has applied or saved.
+        self._versions: dict[str, int] = {}
+        self._data_version = self._pragma_data_version()
+        self._sheet_writes = 0
+        # Characters whose effects were all replaced by copies by the last poll,
+        # so handlers bound to the previous objects are stale.
+        self.replaced: set[str] = set()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _pragma_data_version(self) -> int:
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def save(self, character: Character) -> int:
+        """Publish the character's current state to the other processes."""
+        state = pickle.dumps(CharacterState.capture(character))
+        (version,) = self._connection.execute(
+            "INSERT INTO characters (name, version, fingerprint, state)"
+            " VALUES (?, 1, ?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET version = version + 1,"
+            " fingerprint = excluded.fingerprint, state = excluded.state"
+            " RETURNING version",
+            (character.name, character.fingerprint, state),
+        ).fetchone()
+        self._versions[character.name] = version
+        return version
+
+    def load(self) -> list[Character]:
+        """Apply every stored state, eg, when a worker starts."""
+        return self._apply(self._connection.execute(
+            "SELECT name, version, fingerprint, state FROM characters"
+        ))
+
+    def poll(self) -> list[Character]:
+        """Apply changes committed by other processes, returning the changed characters."""
+        data_version = self._pragma_data_version()
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        return self._apply(self._connection.execute(
+            "SELECT name, version, fingerprint, state FROM characters"
+        ))
+
+    def _apply(self, rows) -> list[Character]:
+        changed = []
+        self.replaced = set()
+        for name, version, fingerprint, state in rows:
+            character = self.characters.get(name)
+            if character is None or self._versions.get(name, 0) >= version:
+                continue
+            self._versions[name] = version
+            if character.fingerprint != fingerprint:
+                state = pickle.loads(state)
+                apply_state(state, character)
+                if character.fingerprint != fingerprint:
+                    # An effect kept its name but not its contents.
+                    state.apply(character)
+                    self.replaced.add(name)
+                changed.append(character)
+        return changed
+
+    def get(self, fingerprint: str) -> Sheet | None:
+        row = self._connection.execute(
+            "SELECT sheet FROM sheets WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def put(self, fingerprint: str, sheet: Sheet) -> None:
+        self._connection.execute(
+            "INSERT OR IGNORE INTO sheets (fingerprint, sheet) VALUES (?, ?)",
+            (fingerprint, pickle.dumps(sheet)),
+        )
+        self._sheet_writes += 1
+        if self._sheet_writes % 1000 == 0:
+            # Oldest first, by insertion order.
+            self._connection.execute(
+                "DELETE FROM sheets WHERE rowid <= ("
+                " SELECT MAX(rowid) FROM sheets) - ?",
+                (self.max_sheets,),
+            )
@@ -0,0 +1,291 @@
+"""
+The computed character sheet: every value the UI displays, computed in one go.
+
+Sheets are immutable snapshots, so they can be cached and handed around
+(history, other tabs, the HTTP layer) without being recomputed.
+
+The full attack (see `Character.full_attack`) is computed with the rest, so the
+attack lines, the dice roller and the damage per round maths all read the same
+per-attack bonuses, damage and crits.
+
+A sheet against a `Target` only recomputes the values which can depend on the
+target (attack, damage, critical, full attack and saves) and takes the rest
+from the sheet without a target. Targeted sheets have their own LRU cache keyed by the
+character's fingerprint and the target's profile, so switching between enemies
+in a fight is a lookup after the first time.
+"""
+
+import collections
+import dataclasses
+import threading
+from typing import Hashable, Protocol
+
+from pfchar.char.base import ACType, Attack, CriticalBonus, Dice, Save, Statistic, Target
+from pfchar.char.character import Character
+from pfchar.utils import (
+    crit_to_string,
+    get_flat_footed_ac,
+    get_total_ac,
+    get_touch_ac,
+    sum_up_modifiers,
+    to_attack_string,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Sheet:
+    # (base value, modified value) for each statistic.
+    statistics: dict[Statistic, tuple[int, int]]
+    attack: dict[str, int]
+    attack_string: str
+    damage: dict[str, list[Dice]]
+    damage_string: str
+    critical: CriticalBonus
+    critical_string: str
+    full_attack: tuple[Attack, ...]
+    armour_class: dict[ACType, int]
+    total_ac: int
+    touch_ac: int
+    flat_footed_ac: int
+    cmb: dict[str, int]
+    cmd: dict[str, int]
+    saves: dict[Save, dict[str, int]]
+
+    @property
+    def cmb_total(self) -> int:
+        return sum(self.cmb.values())
+
+    @property
+    def cmd_total(self) -> int:
+        return sum(self.cmd.values())
+
+
+def _attacks(character: Character, target: Target | None = None) -> tuple:
+    """Attack, damage, critical and full attack, empty without a main hand."""
+    if character.main_hand is None:
+        return {}, {}, CriticalBonus(), ()
+    return (
+        character.attack_bonus(target),
+        character.damage_bonus(target),
+        character.critical_bonus(target),
+        tuple(character.full_attack(target)),
+    )
+
+
+def compute_sheet(character: Character) -> Sheet:
+    attack, damage, critical, full_attack = _attacks(character)
+    armour_class = character.armour_bonuses()
+    return Sheet(
+        statistics={
+            stat: (character.statistics.get(stat, 10), character.modified_statistic(stat))
+            for stat in Statistic
+        },
+        attack=attack,
+        attack_string=to_attack_string(attack),
+        damage=damage,
+        damage_string=sum_up_modifiers(damage),
+        critical=critical,
+        critical_string=crit_to_string(critical),
+        full_attack=full_attack,
+        armour_class=armour_class,
+        total_ac=get_total_ac(armour_class),
+        touch_ac=get_touch_ac(armour_class),
+        flat_footed_ac=get_flat_footed_ac(armour_class),
+        cmb=character.get_cmb(),
+        cmd=character.get_cmd(),
+        saves=character.get_saves(),
+    )
+
+
+def compute_targeted_sheet(character: Character, target: Target, sheet: Sheet) -> Sheet:
+    """`sheet`, the character's sheet without a target, against the target."""
+    attack, damage, critical, full_attack = _attacks(character, target)
+    return dataclasses.replace(
+        sheet,
+        attack=attack,
+        attack_string=to_attack_string(attack),
+        damage=damage,
+        damage_string=sum_up_modifiers(damage),
+        critical=critical,
+        critical_string=crit_to_string(critical),
+        full_attack=full_attack,
+        saves=character.get_saves(target),
+    )
+
+
+def uses_target(character: Character) -> bool:
+    """Whether any of the character's effects depend on the target."""
+    effects = character.all_effects()
+    for weapon in (character.main_hand, character.off_hand, *character.extra_weapons()):
+        if weapon is not None:
+            effects += weapon.enchantments
+    return any(effect.condition.uses_target for effect in effects)
+
+
+def state_key(character: Character, target: Target | None = None) -> Hashable:
+    """A key for the character's exact state, see `Character.fingerprint`."""
+    if target is None:
+        return character.fingerprint
+    return f"{character.fingerprint}@{target.key}"
+
+
+class SheetCache:
+    """A small LRU cache of computed sheets."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._sheets: collections.OrderedDict[Hashable, Sheet] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+    def get(self, key: Hashable) -> Sheet | None:
+        sheet = self._sheets.get(key)
+        if sheet is not None:
+            self._sheets.move_to_end(key)
+        return sheet
+
+    def put(self, key: Hashable, sheet: Sheet) -> None:
+        self._sheets[key] = sheet
+        self._sheets.move_to_end(key)
+        while len(self._sheets) > self.maxsize:
+            self._sheets.popitem(last=False)
+
+    def clear(self) -> None:
+        self._sheets.clear()
+
+
+class SharedSheets(Protocol):
+    def get(self, key: str) -> Sheet | None: ...
+
+    def put(self, key: str, sheet: Sheet) -> None: ...
+
+
+SHEETS = SheetCache()
+# Sheets against a target, by state_key(character, target).
+TARGETED_SHEETS = SheetCache(maxsize=1024)
+# Sheets computed ahead of time (see pfchar.toggles), these are never evicted
+# by the LRU and are owned by whoever filled them in. They are filled in from
+# background threads, so only read or change it holding PRECOMPUTED_LOCK.
+PRECOMPUTED: dict[Hashable, Sheet] = {}
+PRECOMPUTED_LOCK = threading.Lock()
+# Sheets shared with other processes (see pfchar.shared), read through on a miss.
+SHARED: SharedSheets | None = None
+# Where get_sheet found each sheet: "precomputed", "cache", "shared" or
+# "computed", and "targeted_cache" or "targeted_computed" against a target.
+LOOKUPS: collections.Counter[str] = collections.Counter()
+
+
+def get_sheet(character: Character, target: Target | None = None) -> Sheet:
+    if target is not None:
+        return _get_targeted_sheet(character, target)
+    key = state_key(character)
+    with PRECOMPUTED_LOCK:
+        sheet = PRECOMPUTED.get(key)
+    if sheet is not None:
+        LOOKUPS["precomputed"] += 1
+        return sheet
+    sheet = SHEETS.get(key)
+    if sheet is not None:
+        LOOKUPS["cache"] += 1
+        return sheet
+    if SHARED is not None:
+        sheet = SHARED.get(key)
+    if sheet is None:
+        LOOKUPS["computed"] += 1
+        sheet = compute_sheet(character)
+        if SHARED is not None:
+            SHARED.put(key, sheet)
+    else:
+        LOOKUPS["shared"] += 1
+    SHEETS.put(key, sheet)
+    return sheet
+
+
+def _get_targeted_sheet(character: Character, target: Target) -> Sheet:
+    key = state_key(character, target)
+    sheet = TARGETED_SHEETS.get(key)
+    if sheet is not None:
+        LOOKUPS["targeted_cache"] += 1
+    else:
+        LOOKUPS["targeted_computed"] += 1
+        sheet = get_sheet(character)
+        if uses_target(character):
+            sheet = compute_targeted_sheet(character, target, sheet)
+        TARGETED_SHEETS.put(key, sheet)
+    return sheet
+
+
+def peek_sheet(character: Character) -> Sheet | None:
+    """The cached sheet for the character's current state, without computing it."""
+    key = state_key(character)
+    with PRECOMPUTED_LOCK:
+        sheet = PRECOMPUTED.get(key)
+    return sheet or SHEETS.get(key)
+
+
+def remember_sheet(character: Character, sheet: Sheet) -> None:
+    SHEETS.put(state_key(character), sheet)
+
+
+def _dice_to_dict(dice: Dice) -> dict[str, int | str]:
+    return {
+        "num": dice.num,
+        "sides": dice.sides,
+        "modifier": dice.modifier,
+        "type": dice.type.value,
+    }
+
+
+def sheet_to_dict(sheet: Sheet) -> dict:
+    """A JSON friendly representation of a sheet."""
+    return {
+        "statistics": {
+            stat.value: {"base": base, "modified": modified}
+            for stat, (base, modified) in sheet.statistics.items()
+        },
+        "attack": {
+            "total": sheet.attack_string,
+            "breakdown": sheet.attack,
+        },
+        "damage": {
+            "total": sheet.damage_string,
+            "breakdown": {
+                name: [_dice_to_dict(dice) for dice in dice_list]
+                for name, dice_list in sheet.damage.items()
+            },
+        },
+        "critical": {
+            "total": sheet.critical_string,
+            "range": sheet.critical.crit_range,
+            "multiplier": sheet.critical.crit_multiplier,
+            "damage": [_dice_to_dict(dice) for dice in sheet.critical.damage_bonus],
+        },
+        "full_attack": [
+            {
+                "weapon": attack.weapon,
+                "hand": attack.hand,
+                "bonus": attack.bonus,
+                "damage": [_dice_to_dict(dice) for dice in attack.damage],
+                "extra_damage": [_dice_to_dict(dice) for dice in attack.extra_damage],
+                "critical": crit_to_string(attack.critical),
+            }
+            for attack in sheet.full_attack
+        ],
+        "armour_class": {
+            "total": sheet.total_ac,
+            "touch": sheet.touch_ac,
+            "flat_footed": sheet.flat_footed_ac,
+            "breakdown": {
+                ac_type.value: value for ac_type, value in sheet.armour_class.items()
+            },
+        },
+        "cmb": {"total": sheet.cmb_total, "breakdown": sheet.cmb},
+        "cmd": {"total": sheet.cmd_total, "breakdown": sheet.cmd},
+        "saves": {
+            save.value: {"total": sum(breakdown.values()), "breakdown": breakdown}
+            for save, breakdown in sheet.saves.items()
+        },
+    }
@@ -0,0 +1,443 @@
+"""
+Monte Carlo encounter simulator: the party against a list of monster stat blocks.
+
+Characters are flattened into `Combatant` profiles up front (their full attack,
+see `Character.full_attack`, and AC), so the workers only ship plain data
+around and never touch the effect machinery.
+
+    summary = simulate_encounters(ALL_CHARACTERS, [Monster(...)], encounters=10_000)
+    summary.win_rate, summary.rounds_percentile(0.9), summary.damage_taken[name]
+
+Damage is typed (see `DamageType`). A defender's damage reduction, energy
+resistances and immunities are flattened into a resistance vector in
+`DAMAGE_TYPES` order, with immunity as an unreachable resistance, and a hit
+is rolled into a damage vector in the same order, so resisting it is a single
+clamped subtraction of the two. Defenders without any resistances skip typing
+the damage altogether.
+"""
+
+import collections
+import dataclasses
+import functools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Mapping, Sequence
+
+from pfchar.char.base import (
+    DAMAGE_TYPE_INDEX,
+    DAMAGE_TYPES,
+    Attack,
+    CriticalBonus,
+    DamageType,
+    Dice,
+    Statistic,
+    Target,
+    stat_modifier,
+)
+from pfchar.char.character import Character
+from pfchar.utils import get_total_ac
+
+DEFAULT_MAX_ROUNDS = 20
+# A resistance standing in for immunity, more than any hit can deal.
+IMMUNE = 1 << 30
+_PHYSICAL = DAMAGE_TYPE_INDEX[DamageType.PHYSICAL]
+
+
+def resistance_vector(
+    damage_reduction: int = 0,
+    resistances: Mapping[DamageType, int] | None = None,
+    immunities: Iterable[DamageType] = (),
+) -> tuple[int, ...]:
+    """Resistances in `DAMAGE_TYPES` order, or () if there are none."""
+    values = dict(resistances or {})
+    values[DamageType.PHYSICAL] = max(values.get(DamageType.PHYSICAL, 0), damage_reduction)
+    for damage_type in immunities:
+        values[damage_type] = IMMUNE
+    vector = tuple(values.get(damage_type, 0) for damage_type in DAMAGE_TYPES)
+    return vector if any(vector) else ()
+
+
+@dataclasses.dataclass(frozen=True)
+class Combatant:
+    name: str
+    hit_points: int
+    armour_class: int
+    attacks: tuple[Attack, ...]
+    # See `resistance_vector`.
+    resistances: tuple[int, ...] = ()
+
+    @classmethod
+    def from_character(
+        cls,
+        character: Character,
+        hit_points: int | None = None,
+        target: Target | None = None,
+    ) -> "Combatant":
+        if hit_points is None:
+            # Characters don't track hit points yet, so use a rough average.
+            con = stat_modifier(character.modified_statistic(Statistic.CONSTITUTION))
+            hit_points = max(1, character.level * (5 + con))
+
+        return cls(
+            name=character.name,
+            hit_points=hit_points,
+            armour_class=get_total_ac(character.armour_bonuses()),
+            attacks=tuple(character.full_attack(target)),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class Monster:
+    name: str
+    hit_points: int
+    armour_class: int
+    attacks: tuple[int, ...]
+    damage: tuple[Dice, ...]
+    critical: CriticalBonus = CriticalBonus()
+    damage_reduction: int = 0
+    resistances: Mapping[DamageType, int] = dataclasses.field(default_factory=dict)
+    immunities: frozenset[DamageType] = frozenset()
+
+    def to_combatant(self) -> Combatant:
+        return Combatant(
+            name=self.name,
+            hit_points=self.hit_points,
+            armour_class=self.armour_class,
+            attacks=tuple(
+                Attack(
+                    weapon=self.name,
+                    bonus=bonus,
+                    damage=tuple(self.damage),
+                    critical=self.critical,
+                )
+                for bonus in self.attacks
+            ),
+            resistances=resistance_vector(
+                self.damage_reduction, self.resistances, self.immunities
+            ),
+        )
+
+
+@dataclasses.dataclass
+class EncounterSummary:
+    encounters: int = 0
+    wins: int = 0
+    # Rounds taken to kill every monster, for won encounters only.
+    rounds_to_kill: collections.Counter = dataclasses.field(
+        default_factory=collections.Counter
+    )
+    # Per party member histogram of damage taken in a single encounter.
+    damage_taken: dict[str, collections.Counter] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.encounters if self.encounters else 0.0
+
+    def mean_rounds(self) -> float:
+        total = sum(self.rounds_to_kill.values())
+        if not total:
+            return 0.0
+        return sum(r * n for r, n in self.rounds_to_kill.items()) / total
+
+    def rounds_percentile(self, fraction: float) -> int:
+        return _percentile(self.rounds_to_kill, fraction)
+
+    def mean_damage_taken(self, name: str) -> float:
+        histogram = self.damage_taken.get(name)
+        if not histogram:
+            return 0.0
+        return sum(d * n for d, n in histogram.items()) / sum(histogram.values())
+
+    def damage_taken_percentile(self, name: str, fraction: float) -> int:
+        return _percentile(self.damage_taken.get(name, {}), fraction)
+
+    def merge(self, other: "EncounterSummary") -> "EncounterSummary":
+        self.encounters += other.encounters
+        self.wins += other.wins
+        self.rounds_to_kill.update(other.rounds_to_kill)
+        for name, histogram in other.damage_taken.items():
+            self.damage_taken.setdefault(name, collections.Counter()).update(
+                histogram
+            )
+        return self
+
+
+def _percentile(histogram: Mapping[int, int], fraction: float) -> int:
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    threshold = fraction * total
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= threshold:
+            return value
+    return max(histogram)
+
+
+def roll_dice(dice_list: Iterable[Dice], rng: random.Random) -> int:
+    total = 0
+    for dice in dice_list:
+        if dice.is_variable():
+            total += sum(rng.randint(1, dice.sides) for _ in range(dice.num))
+            total += dice.modifier
+        else:
+            total += dice.num + dice.modifier
+    return total
+
+
+def roll_typed_dice(dice_list: Iterable[Dice], rng: random.Random, totals: list[int]) -> None:
+    """Add a roll of each dice to its type's total, see `DAMAGE_TYPES`."""
+    for dice in dice_list:
+        if dice.is_variable():
+            rolled = sum(rng.randint(1, dice.sides) for _ in range(dice.num))
+            totals[DAMAGE_TYPE_INDEX[dice.type]] += rolled + dice.modifier
+        else:
+            totals[DAMAGE_TYPE_INDEX[dice.type]] += dice.num + dice.modifier
+
+
+def resist(damage: Sequence[int], resistances: Sequence[int]) -> int:
+    """Total damage of a typed damage vector after the resistance vector."""
+    return sum(max(0, value - resisted) for value, resisted in zip(damage, resistances))
+
+
+def average_damage(dice_list: Iterable[Dice]) -> float:
+    return sum(
+        dice.num * (dice.sides + 1) / 2 + dice.modifier
+        if dice.is_variable()
+        else dice.num + dice.modifier
+        for dice in dice_list
+    )
+
+
+def hit_chance(bonus: int, armour_class: int) -> float:
+    """Chance of hitting with a d20, where a natural 1 misses and a natural 20 hits."""
+    hitting_rolls = 21 - (armour_class - bonus)
+    return min(19, max(1, hitting_rolls)) / 20
+
+
+@functools.lru_cache(maxsize=1024)
+def _distribution(dice: tuple[tuple[int, int, int], ...]) -> dict[int, float]:
+    """Probability of each total of (num, sides, modifier) dice."""
+    totals = {0: 1.0}
+    for num, sides, modifier in dice:
+        if sides <= 1:
+            totals = {total + num + modifier: p for total, p in totals.items()}
+            continue
+        for _ in range(num):
+            rolled = collections.defaultdict(float)
+            for total, p in totals.items():
+                for face in range(1, sides + 1):
+                    rolled[total + face] += p / sides
+            totals = rolled
+        totals = {total + modifier: p for total, p in totals.items()}
+    return totals
+
+
+def average_resisted_damage(dice_list: Iterable[Dice], resistances: Sequence[int]) -> float:
+    """Average damage of a single roll of the dice after the resistance vector."""
+    by_type = collections.defaultdict(list)
+    for dice in dice_list:
+        by_type[DAMAGE_TYPE_INDEX[dice.type]].append((dice.num, dice.sides, dice.modifier))
+    return sum(
+        # As in full_attack, physical damage is at least 1 before resistance.
+        p * max(0, (max(1, total) if index == _PHYSICAL else total) - resistances[index])
+        for index, dice in by_type.items()
+        for total, p in _distribution(tuple(dice)).items()
+    )
+
+
+def expected_damage_per_round(
+    attacker: Combatant, armour_class: int, resistances: Sequence[int] = ()
+) -> float:
+    """The analytic average of `full_attack` against the given AC and resistances."""
+    return sum(
+        expected_attack_damage(attack, armour_class, resistances)
+        for attack in attacker.attacks
+    )
+
+
+def expected_attack_damage(
+    attack: Attack, armour_class: int, resistances: Sequence[int] = ()
+) -> float:
+    critical = attack.critical
+    hit = hit_chance(attack.bonus, armour_class)
+    threat = min(hit, (21 - critical.crit_range) / 20)
+    if resistances:
+        # Resistances apply to each hit as a whole, so take the average of the
+        # resisted hit rather than resisting the average.
+        damage = average_resisted_damage(
+            (*attack.damage, *attack.extra_damage), resistances
+        )
+        critical_damage = average_resisted_damage(
+            (
+                *attack.damage * critical.crit_multiplier,
+                *attack.extra_damage,
+                *critical.damage_bonus,
+            ),
+            resistances,
+        )
+        return (hit - threat * hit) * damage + threat * hit * critical_damage
+    damage = average_damage(attack.damage)
+    critical_damage = (critical.crit_multiplier - 1) * damage + average_damage(
+        critical.damage_bonus
+    )
+    return hit * (damage + average_damage(attack.extra_damage)) + threat * hit * critical_damage
+
+
+def attack_roll_hits(roll: int, bonus: int, armour_class: int) -> bool:
+    if roll == 1:
+        return False
+    return roll == 20 or roll + bonus >= armour_class
+
+
+def full_attack(attacker: Combatant, defender: Combatant, rng: random.Random) -> int:
+    """Roll every attack against the defender and return the damage dealt."""
+    resistances = defender.resistances
+    total = 0
+    for attack in attacker.attacks:
+        critical = attack.critical
+        roll = rng.randint(1, 20)
+        if not attack_roll_hits(roll, attack.bonus, defender.armour_class):
+            continue
+        multiplier = 1
+        if roll >= critical.crit_range and attack_roll_hits(
+            rng.randint(1, 20), attack.bonus, defender.armour_class
+        ):
+            multiplier = critical.crit_multiplier
+        if resistances:
+            damage = [0] * len(DAMAGE_TYPES)
+            for _ in range(multiplier):
+                roll_typed_dice(attack.damage, rng, damage)
+            roll_typed_dice(attack.extra_damage, rng, damage)
+            if multiplier > 1:
+                roll_typed_dice(critical.damage_bonus, rng, damage)
+            # The minimum of 1 damage applies before damage reduction, and
+            # only to attacks dealing physical damage.
+            if any(
+                dice.type == DamageType.PHYSICAL
+                for dice in (*attack.damage, *attack.extra_damage)
+            ):
+                damage[_PHYSICAL] = max(1, damage[_PHYSICAL])
+            total += resist(damage, resistances)
+            continue
+        damage = sum(roll_dice(attack.damage, rng) for _ in range(multiplier))
+        damage += roll_dice(attack.extra_damage, rng)
+        if multiplier > 1:
+            damage += roll_dice(critical.damage_bonus, rng)
+        total += max(1, damage)
+    return total
+
+
+def run_encounter(
+    party: Sequence[Combatant],
+    monsters: Sequence[Combatant],
+    rng: random.Random,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+) -> tuple[bool, int, dict[str, int]]:
+    """Fight a single encounter, returning (won, rounds, damage taken per party member)."""
+    party_hp = [c.hit_points for c in party]
+    monster_hp = [m.hit_points for m in monsters]
+    damage_taken = {c.name: 0 for c in party}
+
+    for round_number in range(1, max_rounds + 1):
+        # The party focus fires on the first monster still standing.
+        for i, character in enumerate(party):
+            if party_hp[i] <= 0:
+                continue
+            target = next((j for j, hp in enumerate(monster_hp) if hp > 0), None)
+            if target is None:
+                break
+            monster_hp[target] -= full_attack(character, monsters[target], rng)
+        if all(hp <= 0 for hp in monster_hp):
+            return True, round_number, damage_taken
+
+        for j, monster in enumerate(monsters):
+            if monster_hp[j] <= 0:
+                continue
+            standing = [i for i, hp in enumerate(party_hp) if hp > 0]
+            if not standing:
+                break
+            target = rng.choice(standing)
+            damage = full_attack(monster, party[target], rng)
+            party_hp[target] -= damage
+            damage_taken[party[target].name] += damage
+        if all(hp <= 0 for hp in party_hp):
+            return False, round_number, damage_taken
+
+    return False, max_rounds, damage_taken
+
+
+def _run_chunk(
+    party: Sequence[Combatant],
+    monsters: Sequence[Combatant],
+    encounters: int,
+    seed: int,
+    max_rounds: int,
+) -> EncounterSummary:
+    rng = random.Random(seed)
+    summary = EncounterSummary(
+        damage_taken={c.name: collections.Counter() for c in party}
+    )
+    for _ in range(encounters):
+        won, rounds, damage_taken = run_encounter(party, monsters, rng, max_rounds)
+        summary.encounters += 1
+        if won:
+            summary.wins += 1
+            summary.rounds_to_kill[rounds] += 1
+        for name, damage in damage_taken.items():
+            summary.damage_taken[name][damage] += 1
+    return summary
+
+
+def simulate_encounters(
+    party: Iterable[Character | Combatant],
+    monsters: Iterable[Monster | Combatant],
+    encounters: int = 1000,
+    seed: int = 0,
+    processes: int | None = None,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+    hit_points: Mapping[str, int] | None = None,
+) -> EncounterSummary:
+    """Run independent encounters across a process pool and aggregate the results.
+
+    Each chunk of encounters gets its own RNG seeded from `seed` and the chunk
+    index, so results are reproducible regardless of how chunks are scheduled.
+    """
+    hit_points = hit_points or {}
+    party = tuple(
+        (
+            c
+            if isinstance(c, Combatant)
+            else Combatant.from_character(c, hit_points.get(c.name))
+        )
+        for c in party
+    )
+    monsters = tuple(
+        m if isinstance(m, Combatant) else m.to_combatant() for m in monsters
+    )
+
+    processes = processes or os.cpu_count() or 1
+    chunks = min(encounters, processes * 4) or 1
+    sizes = [encounters // chunks + (i < encounters % chunks) for i in range(chunks)]
+    seeds = [seed * 1_000_003 + i for i in range(chunks)]
+
+    summary = EncounterSummary(
+        damage_taken={c.name: collections.Counter() for c in party}
+    )
+    if processes == 1:
+        for size, chunk_seed in zip(sizes, seeds):
+            summary.merge(_run_chunk(party, monsters, size, chunk_seed, max_rounds))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_run_chunk, party, monsters, size, chunk_seed, max_rounds)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+        for future in futures:
+            summary.merge(future.result())
+    return summary
@@ -0,0 +1,171 @@
+"""
+Per browser tab UI state, packed small and evicted when idle.
+
+A tab only needs to remember which character it shows, which expansions are
+open and who it's attacking, so each tab is a slotted record of a character
+number, two bitmasks (expansions which were toggled, and which of those are
+open) and a target rather than a dict of string keys. Character names are
+numbered the first time they're seen. Expansions are keyed by a fixed name
+rather than their title (which can show live values), and a name only holds a
+bit while some tab has toggled it, bits are released as the tabs holding them
+are evicted.
+
+Tabs are kept in least recently used order, so eviction only ever looks at the
+front: anything idle for longer than the TTL goes, then the oldest tabs while
+there are more than `max_tabs`.
+"""
+
+import collections
+import sys
+import time
+from typing import Callable
+
+from pfchar.char.base import Target
+
+
+class TabState:
+    __slots__ = ("character", "expansions_set", "expansions_open", "target", "last_seen")
+
+    def __init__(self, last_seen: float):
+        # Number of the character's name, 0 is the default character.
+        self.character = 0
+        self.expansions_set = 0
+        self.expansions_open = 0
+        # The Target being attacked, if any.
+        self.target = None
+        self.last_seen = last_seen
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sum(
+            sys.getsizeof(getattr(self, name)) for name in self.__slots__
+        )
+
+
+class TabStore:
+    def __init__(
+        self,
+        default_character: str,
+        max_tabs: int = 1000,
+        ttl: float = 7 * 24 * 60 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._character_names = [default_character]
+        self._character_numbers = {default_character: 0}
+        self.max_tabs = max_tabs
+        self.ttl = ttl
+        self._clock = clock
+        self._tabs: collections.OrderedDict[str, TabState] = collections.OrderedDict()
+        self._expansion_bits: dict[str, int] = {}
+        # All the bits in _expansion_bits.
+        self._used_bits = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tabs)
+
+    def get(self, tab_id: str) -> TabState:
+        """The tab's state, created if needed, and marked as just used."""
+        now = self._clock()
+        state = self._tabs.get(tab_id)
+        if state is None:
+            self.evict(now)
+            state = self._tabs[tab_id] = TabState(now)
+        else:
+            self._tabs.move_to_end(tab_id)
+            state.last_seen = now
+        return state
+
+    def evict(self, now: float | None = None) -> int:
+        if now is None:
+            now = self._clock()
+        evicted = 0
+        while self._tabs:
+            tab_id, state = next(iter(self._tabs.items()))
+            if now - state.last_seen <= self.ttl and len(self._tabs) < self.max_tabs:
+                break
+            del self._tabs[tab_id]
+            evicted += 1
+        self.evicted += evicted
+        if evicted:
+            self._release_bits()
+        return evicted
+
+    def discard(self, tab_id: str) -> None:
+        if self._tabs.pop(tab_id, None) is not None:
+            self._release_bits()
+
+    def selected_character(self, tab_id: str) -> str:
+        return self._character_names[self.get(tab_id).character]
+
+    def select_character(self, tab_id: str, name: str) -> None:
+        number = self._character_numbers.get(name)
+        if number is None:
+            number = self._character_numbers[name] = len(self._character_names)
+            self._character_names.append(name)
+        self.get(tab_id).character = number
+
+    def target(self, tab_id: str) -> Target | None:
+        return self.get(tab_id).target
+
+    def set_target(self, tab_id: str, target: Target | None) -> None:
+        self.get(tab_id).target = target
+
+    def _bit(self, name: str) -> int:
+        bit = self._expansion_bits.get(name)
+        if bit is None:
+            # The lowest free bit, so masks stay as small as the names in use.
+            bit = ~self._used_bits & (self._used_bits + 1)
+            self._expansion_bits[name] = bit
+            self._used_bits |= bit
+        return bit
+
+    def _release_bits(self) -> None:
+        """Free the bits of expansion names which no tab has toggled."""
+        toggled = 0
+        for state in self._tabs.values():
+            toggled |= state.expansions_set
+        for name, bit in list(self._expansion_bits.items()):
+            if not toggled & bit:
+                del self._expansion_bits[name]
+                self._used_bits &= ~bit
+
+    def is_open(self, tab_id: str, name: str, default: bool = False) -> bool:
+        state = self.get(tab_id)
+        bit = self._expansion_bits.get(name, 0)
+        if not state.expansions_set & bit:
+            return default
+        return bool(state.expansions_open & bit)
+
+    def set_open(self, tab_id: str, name: str, value: bool) -> None:
+        state = self.get(tab_id)
+        bit = self._bit(name)
+        state.expansions_set |= bit
+        if value:
+            state.expansions_open |= bit
+        else:
+            state.expansions_open &= ~bit
+
+    def memory_report(self) -> dict:
+        """Approximate bytes held per tab and in total."""
+        per_tab = {
+            tab_id: sys.getsizeof(tab_id) + state.nbytes()
+            for tab_id, state in self._tabs.items()
+        }
+        overhead = sum(
+            map(
+                sys.getsizeof,
+                (
+                    self._tabs,
+                    self._expansion_bits,
+                    self._character_names,
+                    self._character_numbers,
+                ),
+            )
+        )
+        return {
+            "tabs": len(per_tab),
+            "evicted": self.evicted,
+            "total_bytes": sum(per_tab.values()) + overhead,
+            "mean_bytes_per_tab": sum(per_tab.values()) / len(per_tab) if per_tab else 0,
+            "per_tab": per_tab,
+        }
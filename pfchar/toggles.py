@@ -0,0 +1,144 @@
+"""
+Precomputed sheets for every combination of a character's toggles.
+
+Most characters only have a few toggles (`EnabledCondition` effects and two
+handed), so every reachable combination can be computed in a background thread
+when the character is loaded, and flipping a switch becomes a dict lookup in
+`pfchar.sheet.get_sheet`. Characters with more combinations than the cutoff are
+left to the regular LRU sheet cache.
+
+Sheets are keyed by fingerprint, which a scratch copy in the same state shares
+with the original. The keys are worked out up front by walking the
+combinations in Gray code order, so each step flips and rehashes one toggle.
+"""
+
+import copy
+import threading
+
+from pfchar.char.character import Character
+from pfchar.sheet import PRECOMPUTED, PRECOMPUTED_LOCK, compute_sheet
+
+DEFAULT_MAX_COMBINATIONS = 1024
+
+
+def _scratch_copy(character: Character) -> Character:
+    """A copy whose toggles can be flipped without touching the original."""
+    scratch = copy.copy(character)
+    toggleable = {id(effect) for effect in character.toggleable_effects()}
+
+    def copy_effects(effects):
+        copies = []
+        for effect in effects:
+            if id(effect) in toggleable:
+                effect = copy.copy(effect)
+                effect.condition = copy.copy(effect.condition)
+            copies.append(effect)
+        return copies
+
+    scratch.abilities = copy_effects(character.abilities)
+    scratch.feats = copy_effects(character.feats)
+    scratch.items = copy_effects(character.items)
+    scratch.statuses = copy_effects(character.statuses)
+    return scratch
+
+
+class ToggleTable:
+    def __init__(self, character: Character):
+        self.can_be_two_handed = character.can_be_two_handed()
+        self.toggle_count = len(character.toggleable_effects())
+        self._scratch = _scratch_copy(character)
+        self._plan: list[tuple[int, str]] = []
+        self._planned: set[str] = set()
+        self._keys: list[str] = []
+        self._cancelled = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def combinations(self) -> int:
+        return 2 ** (self.toggle_count + self.can_be_two_handed)
+
+    def matches(self, character: Character) -> bool:
+        return character.fingerprint in self._planned
+
+    def _flip(self, switch: int) -> None:
+        effects = self._scratch.toggleable_effects()
+        if switch < len(effects):
+            self._scratch.toggle_effect(effects[switch])
+        else:
+            self._scratch._two_handed = not self._scratch._two_handed
+
+    def plan(self) -> None:
+        """Work out the key of every combination, flipping one switch per step."""
+        switches = self.toggle_count + self.can_be_two_handed
+        self._plan = [(-1, self._scratch.fingerprint)]
+        for step in range(1, 2**switches):
+            # The bit which changes between consecutive Gray codes.
+            switch = (step & -step).bit_length() - 1
+            self._flip(switch)
+            self._plan.append((switch, self._scratch.fingerprint))
+        self._planned = {key for _, key in self._plan}
+
+    def _fill(self) -> None:
+        # Unwind to the starting state, then replay the plan computing sheets.
+        for switch, _ in reversed(self._plan[1:]):
+            self._flip(switch)
+        for switch, key in self._plan:
+            if self._cancelled:
+                return
+            if switch >= 0:
+                self._flip(switch)
+            sheet = compute_sheet(self._scratch)
+            with PRECOMPUTED_LOCK:
+                PRECOMPUTED[key] = sheet
+            self._keys.append(key)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float | None = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def discard(self) -> None:
+        self._cancelled = True
+        self.wait()
+        with PRECOMPUTED_LOCK:
+            for key in self._keys:
+                PRECOMPUTED.pop(key, None)
+        self._keys.clear()
+
+
+_TABLES: dict[int, ToggleTable] = {}
+
+
+def discard_toggles(character: Character) -> None:
+    """Drop the character's precomputed sheets, eg, once it has been replaced."""
+    table = _TABLES.pop(id(character), None)
+    if table is not None:
+        table.discard()
+
+
+def precompute_toggles(
+    character: Character, max_combinations: int = DEFAULT_MAX_COMBINATIONS
+) -> ToggleTable | None:
+    """Precompute every toggle combination of the character in the background.
+
+    Returns None if there are more than `max_combinations`, in which case sheets
+    are computed lazily as usual. Calling this again is cheap unless the
+    character's effects (eg, statuses) changed, which rebuilds the table.
+    """
+    table = _TABLES.get(id(character))
+    if table is not None:
+        if table.matches(character):
+            return table
+        table.discard()
+        del _TABLES[id(character)]
+
+    table = ToggleTable(character)
+    if table.combinations > max_combinations:
+        return None
+    table.plan()
+    _TABLES[id(character)] = table
+    table.start()
+    return table
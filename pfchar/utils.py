@@ -1,6 +1,14 @@
 from typing import TYPE_CHECKING
 
-from pfchar.char.base import BAB_KEY, ACType, Effect, Dice, Save, Statistic
+from pfchar.char.base import (
+    BAB_KEY,
+    ACType,
+    Effect,
+    Dice,
+    Save,
+    Statistic,
+    statistic_vector,
+)
 
 if TYPE_CHECKING:
     from pfchar.char.base import CriticalBonus
@@ -38,14 +46,19 @@ def crit_to_string(critical_bonus: "CriticalBonus") -> str:
     return string
 
 
-def to_attack_string(attack_bonuses: dict[str, int]) -> str:
+def iterative_attacks(attack_bonuses: dict[str, int]) -> list[int]:
     attack_bonus = sum(attack_bonuses.values())
     attacks = [attack_bonus]
-    bab = attack_bonuses[BAB_KEY]
+    # Zero bonuses are left out of the breakdown, including a BAB of 0.
+    bab = attack_bonuses.get(BAB_KEY, 0)
     while bab > 5:
         bab -= 5
         attacks.append(attack_bonus - (len(attacks) * 5))
+    return attacks
+
 
+def to_attack_string(attack_bonuses: dict[str, int]) -> str:
+    attacks = iterative_attacks(attack_bonuses)
     return "/".join(f"{attack:+d}" for attack in attacks)
 
 
@@ -67,6 +80,9 @@ class CustomEffect(Effect):
     def statistic_bonus(self, character, statistic):
         return self._statistics.get(statistic, 0)
 
+    def statistic_vector(self, character):
+        return statistic_vector(self._statistics)
+
     def attack_bonus(self, character: "Character") -> int:
         return self._attack_bonus + super().attack_bonus(character)
 
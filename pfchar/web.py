@@ -9,57 +9,268 @@ is clicked in other devices still shows the click (but not the action).
 This may or may not work for multiple users.
 """
 
-from nicegui import app, ui
+import asyncio
+import collections
+import copy
+import dataclasses
+import os
 
-from pfchar.char.base import stat_modifier, Save, Statistic
+from nicegui import Client, app, background_tasks, ui
+
+import pfchar.sheet
+from pfchar.api import register_api
+from pfchar.char.base import stat_modifier, Alignment, CreatureType, Save, Statistic, Target
+from pfchar.char.catalog import default_catalog
+from pfchar.history import History
+from pfchar.live import HUB
+from pfchar.metrics import REGISTRY, register_metrics, sheet_metrics
+from pfchar.party import party_statistics
+from pfchar.reload import DefinitionWatcher, transfer_state
+from pfchar.repository import LoadedCharacters, Repository
+from pfchar.rolls import AttackRoll, RollLog, attack_damage
+from pfchar.saving_throws import save_matrix
+from pfchar.search import EFFECT_LISTS, SearchEntry, build_index
+from pfchar.shared import SharedState
+from pfchar.sheet import get_sheet
+from pfchar.tabs import TabStore
+from pfchar.toggles import DEFAULT_MAX_COMBINATIONS, discard_toggles, precompute_toggles
 from pfchar.utils import (
     crit_to_string,
     sum_up_dice,
-    sum_up_modifiers,
     create_status_effect,
-    get_touch_ac,
-    get_flat_footed_ac,
-    get_total_ac,
-    to_attack_string,
 )
 from pfchar.char.base import Save
-from pfchar.premade import YOYU, DORAMAK, CHELLYBEAN
+from pfchar.premade import ALL_CHARACTERS
+
+# Characters and NPCs, from the SQLite file at PFCHAR_CHARACTERS (in memory by
+# default), which gets the premade characters if it's empty.
+REPOSITORY = Repository(os.environ.get("PFCHAR_CHARACTERS", ":memory:"))
+if not len(REPOSITORY):
+    REPOSITORY.save_many(ALL_CHARACTERS, campaign="Premade")
+CHARACTERS_BY_NAME = LoadedCharacters(REPOSITORY)
+# Characters shown as tabs and on the GM screen, PFCHAR_CAMPAIGN narrows them
+# down to one campaign.
+CAMPAIGN = os.environ.get("PFCHAR_CAMPAIGN") or None
+TAB_PAGE_SIZE = 20
+# Compute every toggle combination in the background when a character is shown,
+# characters with more combinations than the cutoff are computed on demand.
+PRECOMPUTE_TOGGLES = True
+MAX_PRECOMPUTED_COMBINATIONS = DEFAULT_MAX_COMBINATIONS
+# Known effects for the typeahead in the status dialog, by the list they're added to.
+EFFECT_INDEX = build_index(ALL_CHARACTERS, default_catalog())
+SEARCH_LIMIT = 8
+HISTORIES: dict[str, History] = collections.defaultdict(History)
+# Attack and damage rolled in the app, the last few hundred per character.
+ROLLS: dict[str, RollLog] = collections.defaultdict(RollLog)
+RECENT_ROLLS = 10
+# Enemies in the current fight, shared by everyone at the table. Each tab picks
+# which one it's attacking, see `get_target`.
+ENEMIES: dict[str, Target] = {}
+
+
+def tab_names(
+    after: str | None = None, name_prefix: str | None = None, limit: int = TAB_PAGE_SIZE
+) -> list[str]:
+    return [
+        summary.name
+        for summary in REPOSITORY.page(
+            after=after, limit=limit, campaign=CAMPAIGN, name_prefix=name_prefix
+        )
+    ]
+
+
+class NamePager:
+    """Pages of character names, walked forwards with the repository's cursor."""
+
+    def __init__(self):
+        self.name_prefix: str | None = None
+        # The `after` cursor of each page up to the current one.
+        self._cursors: list[str | None] = [None]
+        self._load()
+
+    def _load(self):
+        # One more than a page, to know whether there is a next one.
+        names = tab_names(self._cursors[-1], self.name_prefix, TAB_PAGE_SIZE + 1)
+        self.names = names[:TAB_PAGE_SIZE]
+        self.has_next = len(names) > TAB_PAGE_SIZE
+
+    @property
+    def has_previous(self) -> bool:
+        return len(self._cursors) > 1
+
+    def next(self):
+        if self.has_next:
+            self._cursors.append(self.names[-1])
+            self._load()
+
+    def previous(self):
+        if self.has_previous:
+            self._cursors.pop()
+            self._load()
+
+    def search(self, name_prefix: str | None):
+        self.name_prefix = name_prefix or None
+        self._cursors = [None]
+        self._load()
+
+
+DEFAULT_CHARACTER = tab_names()[0]
+# Selected character and open expansions of each browser tab, idle tabs are
+# dropped after a week, and nicegui's own (unused) tab storage with them.
+TABS = TabStore(DEFAULT_CHARACTER)
+app.storage.max_tab_storage_age = TABS.ttl
+
+# Set by pfchar.serve when running several worker processes, which share
+# character state and computed sheets through the database at PFCHAR_STATE.
+PORT = int(os.environ.get("PFCHAR_PORT", 8080))
+SHARED_STATE = None
+if state_path := os.environ.get("PFCHAR_STATE"):
+    SHARED_STATE = SharedState(state_path, CHARACTERS_BY_NAME)
+    SHARED_STATE.load()
+    pfchar.sheet.SHARED = SHARED_STATE
+
+register_api(app, CHARACTERS_BY_NAME)
+
+# Scraped from /metrics, see pfchar.metrics. Refreshes run after the handler
+# returns, so re-rendering the viewers' pages is in RENDER_SECONDS.
+HANDLER_SECONDS = REGISTRY.histogram(
+    "pfchar_handler_seconds", "Time spent in event handlers.", "handler"
+)
+RENDER_SECONDS = REGISTRY.histogram(
+    "pfchar_render_seconds", "Time spent rendering a section of the page.", "section"
+)
 
-ALL_CHARACTERS = (YOYU, DORAMAK, CHELLYBEAN)
-CHARACTERS_BY_NAME = {c.name: c for c in ALL_CHARACTERS}
+
+def client_metrics():
+    connected = sum(client.has_socket_connection for client in Client.instances.values())
+    yield ("pfchar_connected_clients", "gauge", "Pages with an open websocket.", [({}, connected)])
+    yield ("pfchar_sheet_views", "gauge", "Character sheets being shown.", [({}, len(VIEWS))])
+    yield ("pfchar_browser_tabs", "gauge", "Browser tabs with kept state.", [({}, len(TABS))])
+
+
+REGISTRY.add_collector(client_metrics)
+REGISTRY.add_collector(sheet_metrics)
+register_metrics(app)
+
+
+@app.get("/api/tabs")
+async def tab_memory() -> dict:
+    return TABS.memory_report()
+
+
+def get_tab_id() -> str:
+    return ui.context.client.tab_id
 
 
 def get_character():
-    """Return the current character based on app.storage.tab selection.
+    """Return the current character based on the tab's selection.
     Falls back to the first character if none is stored or invalid."""
-    name = app.storage.tab.get("selected_character")
-    return CHARACTERS_BY_NAME.get(name) or ALL_CHARACTERS[0]
+    name = TABS.selected_character(get_tab_id())
+    return CHARACTERS_BY_NAME.get(name) or CHARACTERS_BY_NAME[DEFAULT_CHARACTER]
+
+
+def get_target() -> Target | None:
+    return TABS.target(get_tab_id())
+
+
+def get_history() -> History:
+    return HISTORIES[get_character().name]
+
+
+class SheetView:
+    """The sections of one client's page.
+
+    Refreshing a view only re-renders that client, and views are subscribed to
+    the hub so a change is computed once and pushed to every client viewing
+    the same character.
+    """
+
+    def __init__(self):
+        self._subscription: tuple[str, int] | None = None
+
+    def watch(self, name: str):
+        self.close()
+        if PRECOMPUTE_TOGGLES:
+            precompute_toggles(CHARACTERS_BY_NAME[name], MAX_PRECOMPUTED_COMBINATIONS)
+        self._subscription = (name, HUB.subscribe(name, self.on_change))
+
+    def close(self):
+        if self._subscription is not None:
+            HUB.unsubscribe(*self._subscription)
+            self._subscription = None
+
+    def on_change(self, sheet, delta: dict[str, object]):
+        if any(key.startswith("effects.") for key in delta):
+            # Feats, items or abilities were added, only the whole page shows them.
+            self.page.refresh()
+            return
+        if any(key.startswith("sheet.statistics.") for key in delta):
+            self.statistics.refresh()
+        if any(key.startswith("toggles.") for key in delta):
+            self.abilities.refresh()
+        if "statuses" in delta:
+            self.statuses.refresh()
+        self.combat_modifiers.refresh()
+
+    @ui.refreshable_method
+    def page(self):
+        render_page()
 
+    @ui.refreshable_method
+    def statistics(self):
+        render_statistics()
 
-def expansion(name: str, default: bool = False):
-    key = f"expansion.{name}"
+    @ui.refreshable_method
+    def abilities(self):
+        render_abilities()
+
+    @ui.refreshable_method
+    def statuses(self):
+        render_statuses()
+
+    @ui.refreshable_method
+    def combat_modifiers(self):
+        render_combat_modifiers()
+
+    @ui.refreshable_method
+    def rolls(self):
+        render_rolls()
+
+
+VIEWS: dict[str, SheetView] = {}
+
+
+def get_view() -> SheetView:
+    return VIEWS[ui.context.client.id]
+
+
+def expansion(title: str, default: bool = False, key: str | None = None):
+    """An expansion remembered per tab by `key`, which defaults to the title.
+
+    Titles showing live values need a fixed key, or the expansion would be
+    forgotten (and closed) each time the value changes.
+    """
+    tab_id = get_tab_id()
+    key = key or title
     return ui.expansion(
-        name,
-        value=app.storage.tab.get(key, default),
-        on_value_change=lambda e: app.storage.tab.update({key: e.value}),
+        title,
+        value=TABS.is_open(tab_id, key, default),
+        on_value_change=lambda e: TABS.set_open(tab_id, key, e.value),
     ).classes("w-full")
 
 
-def header_expansion(name: str, default: bool = False):
-    return expansion(name, default=default).props(
+def header_expansion(title: str, default: bool = False):
+    return expansion(title, default=default).props(
         'header-class="bg-secondary text-white"'
     )
 
 
 # Updates when statuses modify stats
-@ui.refreshable
 def render_statistics():
     with header_expansion("Statistics"):
-        character = get_character()
-        for stat in Statistic:
-            value = character.statistics.get(stat, 10)
+        sheet = get_sheet(get_character())
+        for stat, (value, modified_value) in sheet.statistics.items():
             modifier = stat_modifier(value)
-            modified_value = character.modified_statistic(stat)
             modified_modifier = stat_modifier(modified_value)
             if modified_value != value:
                 ui.label(
@@ -98,14 +309,6 @@ def render_abilities():
         character = get_character()
         for ability in character.abilities:
             if hasattr(ability.condition, "toggle"):
-
-                def make_handler(ab):
-                    def handler(e):
-                        ab.condition.toggle()
-                        update_combat_sections()
-
-                    return handler
-
                 ui.switch(
                     ability.name,
                     value=ability.condition.enabled,
@@ -122,39 +325,45 @@ def render_feats():
             ui.label(feat.name)
 
 
+@HANDLER_SECONDS.time("two_handed")
 def on_two_handed_change(e):
     character = get_character()
-    if not character.toggle_two_handed():
+    if not character.can_be_two_handed():
         e.value = character.is_two_handed()
         return
+    get_history().record(character)
+    character.toggle_two_handed()
     update_combat_sections()
 
 
 def make_handler(effect_):
+    @HANDLER_SECONDS.time("toggle")
     def handler(e):
-        effect_.condition.toggle()
+        character = get_character()
+        get_history().record(character)
+        character.toggle_effect(effect_)
         # only refresh the combat modifiers section
         update_combat_sections()
 
     return handler
 
 
-# Make attack/damage section refreshable so computed values update
-@ui.refreshable
+@RENDER_SECONDS.time("combat_modifiers")
 def render_combat_modifiers():
     character = get_character()
-    attack_mods = character.attack_bonus()
-    damage_mods = character.damage_bonus()
-    critical_bonus = character.critical_bonus()
-    ac_bonuses = character.armour_bonuses()
-    cmb_breakdown = character.get_cmb()
-    cmd_breakdown = character.get_cmd()
-    saves_breakdown = character.get_saves()
-    attack_string = to_attack_string(attack_mods)
-    damage_total_str = sum_up_modifiers(damage_mods)
-    cmb_total = sum(cmb_breakdown.values()) if cmb_breakdown else 0
-    cmd_total = sum(cmd_breakdown.values()) if cmd_breakdown else 0
+    sheet = get_sheet(character, get_target())
+    attack_mods = sheet.attack
+    damage_mods = sheet.damage
+    ac_bonuses = sheet.armour_class
+    cmb_breakdown = sheet.cmb
+    cmd_breakdown = sheet.cmd
+    saves_breakdown = sheet.saves
+    attack_string = sheet.attack_string
+    damage_total_str = sheet.damage_string
+    cmb_total = sheet.cmb_total
+    cmd_total = sheet.cmd_total
     with header_expansion("Combat Modifiers", default=True):
+        render_target()
         with ui.element("div").classes(
             "grid grid-cols-1 md:grid-cols-6 gap-2 items-start"
         ):
@@ -171,36 +380,43 @@ def render_combat_modifiers():
                         on_change=make_handler(effect),
                     )
             with ui.element("div").classes("flex flex-col"):
-                with expansion(f"To Hit {attack_string}").style(
+                with expansion(f"To Hit {attack_string}", key="To Hit").style(
                     "font-weight: bold; text-align: center"
                 ):
                     for name, val in attack_mods.items():
                         ui.label(f"• {name}: {val:+d}")
+                    if any(attack.hand != "main" for attack in sheet.full_attack):
+                        ui.label("Full attack:")
+                        for attack in sheet.full_attack:
+                            ui.label(f"• {describe_attack(attack)}")
+                ui.button("Roll attack", on_click=roll_attack).props("flat dense")
             with ui.element("div").classes("flex flex-col"):
                 with expansion(
-                    f"Damage {damage_total_str}/{crit_to_string(critical_bonus)}"
+                    f"Damage {damage_total_str}/{sheet.critical_string}", key="Damage"
                 ).style("font-weight: bold; text-align: center"):
                     for name, dice_list in damage_mods.items():
                         ui.label(f"• {name}: {sum_up_dice(dice_list)}")
+                ui.button("Roll damage", on_click=roll_damage).props("flat dense")
             with ui.element("div").classes("flex flex-col"):
-                total_ac = get_total_ac(ac_bonuses)
-                touch_ac = get_touch_ac(ac_bonuses)
-                flat_footed_ac = get_flat_footed_ac(ac_bonuses)
+                total_ac = sheet.total_ac
+                touch_ac = sheet.touch_ac
+                flat_footed_ac = sheet.flat_footed_ac
                 with expansion(
-                    f"AC: {total_ac:d} (touch: {touch_ac:d}, flat-footed: {flat_footed_ac:d})"
+                    f"AC: {total_ac:d} (touch: {touch_ac:d}, flat-footed: {flat_footed_ac:d})",
+                    key="AC",
                 ).style("font-weight: bold; text-align: center"):
                     for ac_type, val in ac_bonuses.items():
                         ui.label(
                             f"• {ac_type.value if hasattr(ac_type, 'value') else str(ac_type)}: {val:+d}"
                         )
             with ui.element("div").classes("flex flex-col"):
-                with expansion(f"CMB {cmb_total:+d}").style(
+                with expansion(f"CMB {cmb_total:+d}", key="CMB").style(
                     "font-weight: bold; text-align: center"
                 ):
                     for name, val in cmb_breakdown.items():
                         ui.label(f"• {name}: {val:+d}")
             with ui.element("div").classes("flex flex-col"):
-                with expansion(f"CMD {cmd_total:+d}").style(
+                with expansion(f"CMD {cmd_total:+d}", key="CMD").style(
                     "font-weight: bold; text-align: center"
                 ):
                     for name, val in cmd_breakdown.items():
@@ -208,27 +424,166 @@ def render_combat_modifiers():
             for save, data in saves_breakdown.items():
                 with ui.element("div").classes("flex flex-col"):
                     save_total = sum(data.values())
-                    with expansion(f"{save.value} {save_total:+d}").style(
-                        "font-weight: bold; text-align: center"
-                    ):
+                    with expansion(
+                        f"{save.value} {save_total:+d}", key=save.value
+                    ).style("font-weight: bold; text-align: center"):
                         for name, val in data.items():
                             ui.label(f"• {name}: {val:+d}")
+        get_view().rolls()
+
+
+def set_target(target: Target | None):
+    TABS.set_target(get_tab_id(), target)
+    get_view().combat_modifiers.refresh()
+
+
+def on_target_change(e):
+    set_target(ENEMIES.get(e.value))
+
+
+def on_target_situation_change(name: str, value: bool):
+    target = get_target()
+    if target is not None:
+        set_target(dataclasses.replace(target, **{name: value}))
+
+
+def add_enemy(name: str, creature_type: str | None, alignment: str | None):
+    name = (name or "").strip()
+    if not name:
+        ui.notify("The enemy needs a name", type="warning")
+        return
+    ENEMIES[name] = Target(
+        name=name,
+        creature_type=CreatureType(creature_type) if creature_type else None,
+        alignment=Alignment(alignment) if alignment else None,
+    )
+    set_target(ENEMIES[name])
+
+
+def render_target():
+    target = get_target()
+    with ui.row().classes("items-center"):
+        ui.select(
+            {None: "No target"} | {name: name for name in ENEMIES},
+            label="Target",
+            value=target.name if target is not None else None,
+            on_change=on_target_change,
+        ).style("min-width: 10rem")
+        if target is not None:
+            ui.switch(
+                "Flanked",
+                value=target.flanked,
+                on_change=lambda e: on_target_situation_change("flanked", e.value),
+            )
+            ui.switch(
+                "Flat-footed",
+                value=target.flat_footed,
+                on_change=lambda e: on_target_situation_change("flat_footed", e.value),
+            )
+        with expansion("Add Enemy"):
+            with ui.row().classes("items-center"):
+                name = ui.input("Name")
+                creature_type = ui.select(
+                    {None: "Any"} | {value.value: value.value for value in CreatureType},
+                    label="Creature type",
+                    value=None,
+                ).style("min-width: 10rem")
+                alignment = ui.select(
+                    {None: "Any"} | {value.value: value.value for value in Alignment},
+                    label="Alignment",
+                    value=None,
+                ).style("min-width: 6rem")
+                ui.button(
+                    "Add",
+                    on_click=lambda: add_enemy(
+                        name.value, creature_type.value, alignment.value
+                    ),
+                ).props("outline")
+
+
+def roll_attack():
+    character = get_character()
+    sheet = get_sheet(character, get_target())
+    ROLLS[character.name].roll_attacks(sheet.full_attack)
+    get_view().rolls.refresh()
+
+
+def roll_damage():
+    character = get_character()
+    log = ROLLS[character.name]
+    # The hits of the last full attack, or a single attack's damage without one.
+    if log.roll_hit_damage() is None:
+        sheet = get_sheet(character, get_target())
+        if sheet.full_attack:
+            attack = sheet.full_attack[0]
+            log.roll_damage(attack_damage(attack), attack.weapon)
+    get_view().rolls.refresh()
 
 
+def set_target_armour_class(e):
+    if e.value is not None:
+        ROLLS[get_character().name].armour_class = int(e.value)
+        get_view().rolls.refresh()
+
+
+def describe_attack(attack) -> str:
+    damage = sum_up_dice(attack_damage(attack))
+    return f"{attack.weapon} {attack.bonus:+d}, {damage}/{crit_to_string(attack.critical)}"
+
+
+def describe_roll(roll) -> str:
+    if isinstance(roll, AttackRoll):
+        result = "critical" if roll.critical else "hit" if roll.hit else "miss"
+        return (
+            f"Attack ({roll.weapon}) {roll.natural} {roll.bonus:+d} = {roll.total}"
+            f" vs AC {roll.armour_class}: {result}"
+        )
+    weapon = f" ({roll.weapon})" if roll.weapon else ""
+    critical = ", critical" if roll.critical else ""
+    return f"Damage{weapon} {roll.dice} = {roll.total}{critical}"
+
+
+def render_rolls():
+    log = ROLLS[get_character().name]
+    stats = log.statistics()
+    with ui.row().classes("items-center"):
+        ui.number(
+            "vs AC", value=log.armour_class, format="%d", on_change=set_target_armour_class
+        ).props("dense").style("width: 6rem")
+        if stats.attacks:
+            ui.label(
+                f"Hit {stats.hit_rate:.0%} (expected {stats.expected_hit_rate:.0%}),"
+                f" crit {stats.critical_rate:.0%}"
+                f" (expected {stats.expected_critical_rate:.0%})"
+                f" over {stats.attacks} attacks"
+            )
+        if stats.damage_rolls:
+            ui.label(
+                f"Damage {stats.mean_damage:.1f} (expected {stats.expected_damage:.1f})"
+                f" over {stats.damage_rolls} rolls"
+            )
+    if len(log):
+        with expansion("Roll Log"):
+            ui.label(f"{len(log)} rolls kept, up to {log.capacity}")
+            for roll in log.recent(RECENT_ROLLS):
+                ui.label(f"• {describe_roll(roll)}")
+
+
+@HANDLER_SECONDS.time("status_dialog")
 def open_add_status_dialog():
     status_dialog = create_status_dialog()
     status_dialog.open()
 
 
+@HANDLER_SECONDS.time("status_delete")
 def delete_status(index: int):
     character = get_character()
     if 0 <= index < len(character.statuses):
-        del character.statuses[index]
-        render_statuses.refresh()
+        get_history().record(character)
+        character.remove_status(character.statuses[index])
         update_combat_sections()
 
 
-@ui.refreshable
 def render_statuses():
     with header_expansion("Statuses"):
         character = get_character()
@@ -247,34 +602,134 @@ def render_statuses():
         )
 
 
+def undo():
+    if get_history().undo(get_character()):
+        update_combat_sections()
+
+
+def redo():
+    if get_history().redo(get_character()):
+        update_combat_sections()
+
+
 def update_combat_sections():
-    # re-render the computed sections
-    render_statistics.refresh()
-    render_combat_modifiers.refresh()
+    character = get_character()
+    if SHARED_STATE is not None:
+        SHARED_STATE.save(character)
+    publish(character)
+
+
+def publish(character):
+    # compute the new sheet once and push it to every client viewing the character
+    if PRECOMPUTE_TOGGLES:
+        # No-op unless the statuses changed
+        precompute_toggles(character, MAX_PRECOMPUTED_COMBINATIONS)
+    HUB.publish(character)
+
+
+async def follow_shared_state():
+    # Push changes made in other worker processes to this worker's clients.
+    while True:
+        await asyncio.sleep(SHARED_STATE.poll_interval)
+        for character in SHARED_STATE.poll():
+            if character.name in SHARED_STATE.replaced:
+                # Send everything, so its pages are rebuilt with the new effects.
+                HUB.forget(character.name)
+            publish(character)
+
+
+if SHARED_STATE is not None:
+    app.on_startup(
+        lambda: background_tasks.create(follow_shared_state(), name="shared state")
+    )
+
+
+# Edits to the premade characters are swapped into the running server rather
+# than restarting it, see pfchar.reload. Each worker process watches the file
+# itself.
+RELOAD_INTERVAL = 1.0
+WATCHER = DefinitionWatcher("pfchar.premade")
+
+
+def reload_character(definition):
+    """Swap in a character's new definition, keeping the session's state."""
+    name = definition.name
+    if name not in REPOSITORY:
+        # Not one of the characters served, eg, PFCHAR_CHARACTERS holds
+        # someone's own characters rather than the premade ones.
+        return
+    # A copy, toggles and statuses of the session mustn't change the module's
+    # definition.
+    character = copy.deepcopy(definition)
+    previous = CHARACTERS_BY_NAME.replace(character)
+    if previous is not None:
+        transfer_state(previous, character)
+        # Its precomputed sheets are for the old definition.
+        discard_toggles(previous)
+    REPOSITORY.save(character, campaign=REPOSITORY.campaign(name))
+    # Undo would bring back the old definition's effects.
+    HISTORIES.pop(name, None)
+    # Everything is sent again, so the tabs showing it re-render the page and
+    # its handlers hold the new effects.
+    HUB.forget(name)
+    publish(character)
+
+
+def rebuild_effect_index():
+    global EFFECT_INDEX
+    index = build_index(WATCHER.definitions(), default_catalog())
+    # Statuses added during the session.
+    index.add_characters(CHARACTERS_BY_NAME.loaded())
+    EFFECT_INDEX = index
+
+
+async def follow_definitions():
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        # A definition which fails to import is logged by the watcher.
+        definitions = WATCHER.poll()
+        for definition in definitions:
+            reload_character(definition)
+        if definitions:
+            rebuild_effect_index()
+
+
+app.on_startup(
+    lambda: background_tasks.create(follow_definitions(), name="definitions")
+)
 
 
 # Page renderer to rebuild sections for current character
-@ui.refreshable
 def render_page():
+    view = get_view()
     # rebuild all sections for the selected global `character`
     with ui.row():
         with ui.column().style("gap: 0.1rem; width: 100%"):
-            render_statistics()
+            view.statistics()
             render_weapons()
             render_items()
-            render_abilities()
+            view.abilities()
             render_feats()
-            render_statuses()
-            render_combat_modifiers()
+            view.statuses()
+            view.combat_modifiers()
 
 
 def on_character_change(name: str):
     # swap current character by name and store selection per tab
-    if name in CHARACTERS_BY_NAME:
-        app.storage.tab["selected_character"] = name
-    else:
-        app.storage.tab["selected_character"] = ALL_CHARACTERS[0].name
-    render_page.refresh()
+    if name not in CHARACTERS_BY_NAME:
+        name = DEFAULT_CHARACTER
+    TABS.select_character(get_tab_id(), name)
+    view = get_view()
+    view.watch(get_character().name)
+    view.page.refresh()
+
+
+@HANDLER_SECONDS.time("status_known_effect")
+def add_known_effect(entry: SearchEntry):
+    character = get_character()
+    get_history().record(character)
+    character.add_effect(entry.create(), EFFECT_LISTS[entry.kind])
+    update_combat_sections()
 
 
 def create_status_dialog():
@@ -282,6 +737,26 @@ def create_status_dialog():
     with status_dialog:
         with ui.card():
             ui.label("Add Status").style("font-weight: bold; font-size: 1.2rem")
+
+            @HANDLER_SECONDS.time("status_search")
+            def show_results(e):
+                search_results.clear()
+                with search_results:
+                    for entry in EFFECT_INDEX.search(
+                        e.value or "", limit=SEARCH_LIMIT, kinds=EFFECT_LISTS
+                    ):
+
+                        def add(_, entry=entry):
+                            add_known_effect(entry)
+                            status_dialog.close()
+
+                        ui.item(f"{entry.name} ({entry.kind})", on_click=add)
+
+            ui.input("Search known effects", on_change=show_results).props(
+                "clearable"
+            )
+            search_results = ui.list().props("dense")
+            ui.separator()
             status_name_input = ui.input("Name").props("clearable")
             status_attack_input = ui.number("Attack Bonus", value=0)
             status_damage_input = ui.number("Damage Bonus", value=0)
@@ -301,6 +776,7 @@ def create_status_dialog():
             warn_label.visible = False
             with ui.row():
 
+                @HANDLER_SECONDS.time("status_create")
                 def create_status():
                     name = (status_name_input.value or "").strip()
                     if not name:
@@ -333,6 +809,7 @@ def create_status_dialog():
                         return
                     warn_label.visible = False
                     character = get_character()
+                    get_history().record(character)
                     attack = int(status_attack_input.value or 0)
                     damage = int(status_damage_input.value or 0)
                     stats_dict = {}
@@ -351,15 +828,15 @@ def create_status_dialog():
                             v = 0
                         if v:
                             saves_dict[save] = v
-                    character.statuses.append(
-                        create_status_effect(
-                            name,
-                            attack_bonus=attack,
-                            damage_bonus=damage,
-                            statistics=stats_dict,
-                            saves=saves_dict,
-                        )
+                    status = create_status_effect(
+                        name,
+                        attack_bonus=attack,
+                        damage_bonus=damage,
+                        statistics=stats_dict,
+                        saves=saves_dict,
                     )
+                    character.add_status(status)
+                    EFFECT_INDEX.add_effect(status)
                     status_name_input.value = ""
                     status_name_input.props('error=false error-message=""')
                     status_attack_input.value = 0
@@ -369,7 +846,6 @@ def create_status_dialog():
                     for inp in save_inputs.values():
                         inp.value = 0
                     status_dialog.close()
-                    render_statuses.refresh()
                     update_combat_sections()
 
                 ui.button("Create", on_click=create_status).props("color=primary")
@@ -395,20 +871,177 @@ def create_status_dialog():
 
 @ui.page("/")
 async def page():
-    await ui.context.client.connected()
-    selected_name = app.storage.tab.get("selected_character")
-    if selected_name not in CHARACTERS_BY_NAME:
-        selected_name = ALL_CHARACTERS[0].name
+    client = ui.context.client
+    await client.connected()
+    selected_name = get_character().name
+    pager = NamePager()
+
+    view = VIEWS[client.id] = SheetView()
+    view.watch(selected_name)
+
+    def forget_view():
+        view.close()
+        VIEWS.pop(client.id, None)
+
+    client.on_delete(forget_view)
 
     def handle_tab_change(e):
         if e.value:
             on_character_change(e.value)
 
-    with ui.header():
-        with ui.tabs(value=selected_name, on_change=handle_tab_change):
-            for c in ALL_CHARACTERS:
-                ui.tab(c.name)
-    render_page()
+    @ui.refreshable
+    def character_tabs():
+        selected = get_character().name
+        names = pager.names if selected in pager.names else [*pager.names, selected]
+        ui.button(icon="chevron_left", on_click=lambda: turn(pager.previous)).props(
+            "flat color=white"
+        ).set_enabled(pager.has_previous)
+        with ui.tabs(value=selected, on_change=handle_tab_change):
+            for name in names:
+                ui.tab(name)
+        ui.button(icon="chevron_right", on_click=lambda: turn(pager.next)).props(
+            "flat color=white"
+        ).set_enabled(pager.has_next)
+
+    def turn(move, *args):
+        move(*args)
+        character_tabs.refresh()
+
+    with ui.header().classes("items-center"):
+        character_tabs()
+        ui.input(
+            placeholder="Find by name",
+            on_change=lambda e: turn(pager.search, (e.value or "").strip()),
+        ).props("dense dark clearable").style("width: 10rem")
+        ui.space()
+        ui.button(icon="undo", on_click=undo).props("flat color=white")
+        ui.button(icon="redo", on_click=redo).props("flat color=white")
+    view.page()
+
+
+class GMView:
+    """The party's statistics and chance to make each save, for the GM screen."""
+
+    def __init__(self):
+        self.dcs = range(10, 41)
+        self.pager = NamePager()
+        self._subscriptions = []
+        self._subscribe()
+
+    def _subscribe(self):
+        self._subscriptions = [
+            (name, HUB.subscribe(name, self.on_change)) for name in self.names
+        ]
+
+    @property
+    def names(self) -> list[str]:
+        return self.pager.names
 
+    def turn(self, move, *args):
+        """Show another page of the party, eg, `view.turn(view.pager.next)`."""
+        self.close()
+        move(*args)
+        self._subscribe()
+        self.statistics.refresh()
+        self.saves.refresh()
 
-ui.run()
+    @property
+    def party(self):
+        # By name, as reloading a definition swaps the character object.
+        return [CHARACTERS_BY_NAME[name] for name in self.names]
+
+    def close(self):
+        for subscription in self._subscriptions:
+            HUB.unsubscribe(*subscription)
+        self._subscriptions.clear()
+
+    def on_change(self, sheet, delta: dict[str, object]):
+        if any(key.startswith("sheet.statistics.") for key in delta):
+            self.statistics.refresh()
+        if any(key.startswith("sheet.saves.") for key in delta):
+            self.saves.refresh()
+
+    def set_dcs(self, low, high):
+        low, high = int(low or 0), int(high or 0)
+        if low <= high:
+            self.dcs = range(low, high + 1)
+            self.saves.refresh()
+
+    @ui.refreshable_method
+    def statistics(self):
+        matrix = party_statistics(self.party)
+        header = "".join(f"<th>{stat.value}</th>" for stat in matrix.statistics)
+        rows = "".join(
+            f"<tr><th>{name}</th>"
+            + "".join(
+                f"<td>{score} ({modifier:+d})</td>"
+                for score, modifier in zip(scores, modifiers)
+            )
+            + "</tr>"
+            for name, scores, modifiers in zip(
+                matrix.characters, matrix.modified, matrix.modifiers
+            )
+        )
+        ui.html(
+            '<table style="border-collapse: collapse; text-align: center">'
+            f"<tr><th></th>{header}</tr>{rows}</table>"
+        ).classes("text-sm")
+
+    @ui.refreshable_method
+    def saves(self):
+        matrix = save_matrix(self.party, self.dcs)
+        header = "".join(f"<th>{dc}</th>" for dc in matrix.dcs)
+        rows = []
+        for name, bonuses, chances in zip(
+            matrix.characters, matrix.bonuses, matrix.probabilities
+        ):
+            for save, bonus, row in zip(matrix.saves, bonuses, chances):
+                cells = "".join(
+                    f'<td style="background: hsl({chance * 120:.0f}, 70%, 75%)">'
+                    f"{chance:.0%}</td>"
+                    for chance in row
+                )
+                rows.append(f"<tr><th>{name} {save.value} {bonus:+d}</th>{cells}</tr>")
+        ui.html(
+            '<table style="border-collapse: collapse; text-align: center">'
+            f"<tr><th>DC</th>{header}</tr>{''.join(rows)}</table>"
+        ).classes("text-xs")
+
+
+@ui.page("/gm")
+async def gm_page():
+    client = ui.context.client
+    await client.connected()
+    view = GMView()
+    client.on_delete(view.close)
+
+    with ui.header().classes("items-center"):
+        ui.label("Party").style("font-weight: bold; font-size: 1.2rem")
+        ui.space()
+        ui.input(
+            placeholder="Find by name",
+            on_change=lambda e: view.turn(view.pager.search, (e.value or "").strip()),
+        ).props("dense dark clearable").style("width: 10rem")
+        ui.button(icon="chevron_left", on_click=lambda: view.turn(view.pager.previous)).props(
+            "flat color=white"
+        )
+        ui.button(icon="chevron_right", on_click=lambda: view.turn(view.pager.next)).props(
+            "flat color=white"
+        )
+    view.statistics()
+    with ui.row():
+        low = ui.number("Lowest DC", value=view.dcs.start)
+        high = ui.number("Highest DC", value=view.dcs.stop - 1)
+        for number in (low, high):
+            number.on_value_change(lambda _: view.set_dcs(low.value, high.value))
+    view.saves()
+
+
+# Workers are started and restarted by pfchar.serve, not the reloader. The
+# premade characters are reloaded in place (see WATCHER) rather than by
+# restarting the server.
+ui.run(
+    port=PORT,
+    reload=SHARED_STATE is None,
+    uvicorn_reload_excludes=".*, .py[cod], .sw.*, ~*, premade.py",
+)
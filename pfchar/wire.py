@@ -0,0 +1,334 @@
+"""
+Compact binary encoding of computed sheets, for slow connections.
+
+    data = encode_sheet(sheet)      # about a seventh of the JSON, half gzipped
+    sheet = decode_sheet(data)
+
+or to compare it against the JSON sheets (see `pfchar.sheet.sheet_to_dict`):
+
+    python -m pfchar.wire --repeat 2000
+
+A message starts with a 4 byte header: "PF", the format version and the kind
+of message. Then comes a table of the strings the message uses (breakdown
+names, weapon and character names), each written once and referred to by its
+index after that. Everything else is varints, signed values zigzag encoded.
+Enum keys (`Statistic`, `ACType`, `Save`, ...) are written as their position
+in the enum and a `Dice` is packed into a single integer. Values derived from
+others (the attack, damage and crit strings and the totals) aren't sent, the
+decoder recomputes them.
+
+Enums are written by position, so reordering or removing a member of one of
+the enums below means bumping `VERSION`. Adding a member at the end doesn't.
+"""
+
+import argparse
+import json
+import struct
+import sys
+import time
+
+from pfchar.char.base import (
+    DAMAGE_TYPES,
+    STATISTICS,
+    ACType,
+    Attack,
+    CriticalBonus,
+    Dice,
+    Save,
+)
+from pfchar.sheet import Sheet, sheet_to_dict
+from pfchar.utils import (
+    crit_to_string,
+    get_flat_footed_ac,
+    get_total_ac,
+    get_touch_ac,
+    sum_up_modifiers,
+    to_attack_string,
+)
+
+MAGIC = b"PF"
+VERSION = 2
+SHEET = 1
+MEDIA_TYPE = "application/x-pfchar-sheet"
+
+_HEADER = struct.Struct("<2sBB")
+AC_TYPES = tuple(ACType)
+SAVES = tuple(Save)
+HANDS = ("main", "off", "extra")
+
+# Dice are packed as modifier | num | sides | type, from the high bits down.
+_TYPE_BITS = 3
+_SIDES_BITS = 8
+_NUM_BITS = 12
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _Writer:
+    def __init__(self):
+        self._body = bytearray()
+        self._strings: dict[str, int] = {}
+
+    def uint(self, value: int) -> None:
+        if value < 0:
+            raise WireFormatError(f"{value} is negative, it needs sint")
+        body = self._body
+        while value > 0x7F:
+            body.append(value & 0x7F | 0x80)
+            value >>= 7
+        body.append(value)
+
+    def sint(self, value: int) -> None:
+        self.uint(_zigzag(value))
+
+    def string(self, value: str) -> None:
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+        self.uint(index)
+
+    def dice(self, dice_list: list[Dice] | tuple[Dice, ...]) -> None:
+        self.uint(len(dice_list))
+        for dice in dice_list:
+            num = _zigzag(dice.num)
+            if not 0 <= dice.sides < 1 << _SIDES_BITS or num >= 1 << _NUM_BITS:
+                raise WireFormatError(f"{dice} is too large to encode")
+            packed = (_zigzag(dice.modifier) << _NUM_BITS | num) << _SIDES_BITS
+            packed = (packed | dice.sides) << _TYPE_BITS
+            self.uint(packed | DAMAGE_TYPES.index(dice.type))
+
+    def critical(self, critical: CriticalBonus) -> None:
+        self.uint(critical.crit_range)
+        self.uint(critical.crit_multiplier)
+        self.dice(critical.damage_bonus)
+
+    def modifiers(self, modifiers: dict[str, int]) -> None:
+        self.uint(len(modifiers))
+        for name, value in modifiers.items():
+            self.string(name)
+            self.sint(value)
+
+    def getvalue(self, kind: int) -> bytes:
+        table = _Writer()
+        table.uint(len(self._strings))
+        for value in self._strings:
+            encoded = value.encode()
+            table.uint(len(encoded))
+            table._body += encoded
+        return _HEADER.pack(MAGIC, VERSION, kind) + table._body + self._body
+
+
+class _Reader:
+    def __init__(self, data: bytes, kind: int):
+        if len(data) < _HEADER.size:
+            raise WireFormatError("message is too short")
+        magic, version, found = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise WireFormatError("not a pfchar message")
+        if version != VERSION:
+            raise WireFormatError(f"unsupported version {version}, expected {VERSION}")
+        if found != kind:
+            raise WireFormatError(f"expected a message of kind {kind}, not {found}")
+        self._data = memoryview(data)
+        self._position = _HEADER.size
+        self._strings = []
+        for _ in range(self.uint()):
+            length = self.uint()
+            end = self._position + length
+            if end > len(data):
+                raise WireFormatError("message is truncated")
+            self._strings.append(str(self._data[self._position : end], "utf-8"))
+            self._position = end
+
+    def uint(self) -> int:
+        data, position = self._data, self._position
+        value = shift = 0
+        try:
+            while True:
+                byte = data[position]
+                position += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+        except IndexError:
+            raise WireFormatError("message is truncated") from None
+        self._position = position
+        return value
+
+    def sint(self) -> int:
+        return _unzigzag(self.uint())
+
+    def string(self) -> str:
+        index = self.uint()
+        try:
+            return self._strings[index]
+        except IndexError:
+            raise WireFormatError(f"unknown string {index}") from None
+
+    def member(self, members: tuple):
+        index = self.uint()
+        try:
+            return members[index]
+        except IndexError:
+            raise WireFormatError(f"unknown {type(members[0]).__name__} {index}") from None
+
+    def dice(self) -> list[Dice]:
+        dice_list = []
+        for _ in range(self.uint()):
+            packed = self.uint()
+            damage_type = packed & ((1 << _TYPE_BITS) - 1)
+            packed >>= _TYPE_BITS
+            sides = packed & ((1 << _SIDES_BITS) - 1)
+            packed >>= _SIDES_BITS
+            num = _unzigzag(packed & ((1 << _NUM_BITS) - 1))
+            modifier = _unzigzag(packed >> _NUM_BITS)
+            if damage_type >= len(DAMAGE_TYPES):
+                raise WireFormatError(f"unknown DamageType {damage_type}")
+            dice_list.append(Dice(num, sides, modifier, DAMAGE_TYPES[damage_type]))
+        return dice_list
+
+    def critical(self) -> CriticalBonus:
+        return CriticalBonus(
+            crit_range=self.uint(),
+            crit_multiplier=self.uint(),
+            damage_bonus=self.dice(),
+        )
+
+    def modifiers(self) -> dict[str, int]:
+        return {self.string(): self.sint() for _ in range(self.uint())}
+
+    def done(self) -> None:
+        if self._position != len(self._data):
+            raise WireFormatError("unexpected data after the message")
+
+
+def encode_sheet(sheet: Sheet) -> bytes:
+    writer = _Writer()
+    writer.uint(len(sheet.statistics))
+    for stat, (base, modified) in sheet.statistics.items():
+        writer.uint(STATISTICS.index(stat))
+        writer.sint(base)
+        writer.sint(modified)
+    writer.modifiers(sheet.attack)
+    writer.uint(len(sheet.damage))
+    for name, dice_list in sheet.damage.items():
+        writer.string(name)
+        writer.dice(dice_list)
+    writer.critical(sheet.critical)
+    writer.uint(len(sheet.full_attack))
+    for attack in sheet.full_attack:
+        writer.string(attack.weapon)
+        writer.uint(HANDS.index(attack.hand))
+        writer.sint(attack.bonus)
+        writer.dice(attack.damage)
+        writer.dice(attack.extra_damage)
+        writer.critical(attack.critical)
+    writer.uint(len(sheet.armour_class))
+    for ac_type, value in sheet.armour_class.items():
+        writer.uint(AC_TYPES.index(ac_type))
+        writer.sint(value)
+    writer.modifiers(sheet.cmb)
+    writer.modifiers(sheet.cmd)
+    writer.uint(len(sheet.saves))
+    for save, breakdown in sheet.saves.items():
+        writer.uint(SAVES.index(save))
+        writer.modifiers(breakdown)
+    return writer.getvalue(SHEET)
+
+
+def decode_sheet(data: bytes) -> Sheet:
+    reader = _Reader(data, SHEET)
+    statistics = {}
+    for _ in range(reader.uint()):
+        stat = reader.member(STATISTICS)
+        statistics[stat] = (reader.sint(), reader.sint())
+    attack = reader.modifiers()
+    damage = {reader.string(): reader.dice() for _ in range(reader.uint())}
+    critical = reader.critical()
+    full_attack = tuple(
+        Attack(
+            weapon=reader.string(),
+            hand=reader.member(HANDS),
+            bonus=reader.sint(),
+            damage=tuple(reader.dice()),
+            extra_damage=tuple(reader.dice()),
+            critical=reader.critical(),
+        )
+        for _ in range(reader.uint())
+    )
+    armour_class = {reader.member(AC_TYPES): reader.sint() for _ in range(reader.uint())}
+    cmb = reader.modifiers()
+    cmd = reader.modifiers()
+    saves = {reader.member(SAVES): reader.modifiers() for _ in range(reader.uint())}
+    reader.done()
+    return Sheet(
+        statistics=statistics,
+        attack=attack,
+        attack_string=to_attack_string(attack),
+        damage=damage,
+        damage_string=sum_up_modifiers(damage),
+        critical=critical,
+        critical_string=crit_to_string(critical),
+        full_attack=full_attack,
+        armour_class=armour_class,
+        total_ac=get_total_ac(armour_class),
+        touch_ac=get_touch_ac(armour_class),
+        flat_footed_ac=get_flat_footed_ac(armour_class),
+        cmb=cmb,
+        cmd=cmd,
+        saves=saves,
+    )
+
+
+def _json_sheet(sheet: Sheet) -> bytes:
+    # As served by pfchar.api.
+    return json.dumps(sheet_to_dict(sheet), separators=(",", ":")).encode()
+
+
+def _time(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    import gzip
+
+    from pfchar.premade import ALL_CHARACTERS
+    from pfchar.sheet import compute_sheet
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'':<20} {'JSON':>7} {'gzip':>7} {'binary':>7} {'gzip':>7}"
+          f" {'JSON us':>8} {'binary us':>10} {'decode us':>10}")
+    for character in ALL_CHARACTERS:
+        sheet = compute_sheet(character)
+        as_json = _json_sheet(sheet)
+        binary = encode_sheet(sheet)
+        assert decode_sheet(binary) == sheet
+        print(
+            f"{character.name:<20} {len(as_json):>7} {len(gzip.compress(as_json)):>7}"
+            f" {len(binary):>7} {len(gzip.compress(binary)):>7}"
+            f" {_time(lambda: _json_sheet(sheet), args.repeat):>8.1f}"
+            f" {_time(lambda: encode_sheet(sheet), args.repeat):>10.1f}"
+            f" {_time(lambda: decode_sheet(binary), args.repeat):>10.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
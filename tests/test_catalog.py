@@ -0,0 +1,18 @@
+import copy
+
+import pytest
+
+from pfchar.char.catalog import default_catalog
+from pfchar.premade import YOYU
+
+
+@pytest.mark.parametrize(
+    "level, bonus", [(1, 1), (5, 1), (6, 2), (8, 2), (9, 3), (12, 3), (20, 3)]
+)
+def test_divine_favor_scales_every_three_levels(level, bonus):
+    character = copy.deepcopy(YOYU)
+    character.level = level
+    divine_favor = default_catalog().create("Divine Favor")
+    assert divine_favor.attack_bonus(character) == bonus
+    damage = divine_favor.damage_bonus(character)
+    assert sum(dice.num * dice.sides for dice in damage) == bonus
@@ -0,0 +1,126 @@
+import copy
+
+import pytest
+
+from pfchar.char.base import (
+    Alignment,
+    CreatureType,
+    Dice,
+    Save,
+    Statistic,
+    Target,
+    WeaponType,
+)
+from pfchar.char.catalog import default_catalog
+from pfchar.char.items import Weapon
+from pfchar.premade import CHELLYBEAN, YOYU
+from pfchar.sheet import compute_sheet, get_sheet
+from pfchar.utils import create_status_effect
+
+
+def test_in_place_statistic_edit_updates_fingerprint():
+    character = copy.deepcopy(YOYU)
+    fingerprint = character.fingerprint
+    strength = character.modified_statistic(Statistic.STRENGTH)
+
+    character.statistics[Statistic.STRENGTH] += 10
+    assert character.fingerprint != fingerprint
+    assert character.modified_statistic(Statistic.STRENGTH) == strength + 10
+
+    character.statistics[Statistic.STRENGTH] -= 10
+    assert character.fingerprint == fingerprint
+
+
+def test_in_place_base_save_edit_updates_fingerprint():
+    character = copy.deepcopy(YOYU)
+    fingerprint = character.fingerprint
+    character.base_saves[Save.WILL] += 1
+    assert character.fingerprint != fingerprint
+
+
+def test_fingerprint_depends_on_effect_order():
+    weak = create_status_effect("Blessing", attack_bonus=1)
+    strong = create_status_effect("Blessing", attack_bonus=3)
+    first, second = copy.deepcopy(YOYU), copy.deepcopy(YOYU)
+    first.add_status(weak)
+    first.add_status(strong)
+    second.add_status(strong)
+    second.add_status(weak)
+
+    # The later of two effects with the same name wins.
+    assert compute_sheet(first).attack != compute_sheet(second).attack
+    assert first.fingerprint != second.fingerprint
+
+
+def test_fingerprint_rejects_unknown_values():
+    character = copy.deepcopy(YOYU)
+    character.statuses = [{1, 2}]
+    with pytest.raises(TypeError):
+        character.refresh_fingerprint()
+
+
+@pytest.mark.parametrize(
+    "is_light, feat, penalties",
+    [
+        (False, False, (-6, -10)),
+        (True, False, (-4, -8)),
+        (False, True, (-4, -4)),
+        (True, True, (-2, -2)),
+    ],
+)
+def test_two_weapon_penalties(is_light, feat, penalties):
+    character = copy.deepcopy(CHELLYBEAN)
+    character.off_hand = Weapon(
+        name="Dagger",
+        type=WeaponType.DAGGER,
+        base_damage=Dice(num=1, sides=4),
+        is_light=is_light,
+    )
+    if feat:
+        character.add_effect(default_catalog().create("Two-Weapon Fighting"), "feats")
+
+    assert character.two_weapon_penalties() == penalties
+    attacks = compute_sheet(character).full_attack
+    main = attacks[0]
+    (off,) = [attack for attack in attacks if attack.hand == "off"]
+    # The main hand dagger is +2, the off hand one isn't enchanted.
+    assert off.bonus == main.bonus - 2 - penalties[0] + penalties[1]
+
+
+def _with_bane():
+    character = copy.deepcopy(YOYU)
+    character.main_hand.enchantments.append(default_catalog().create("Bane (Undead)"))
+    return character
+
+
+def test_bane_adds_to_hit_against_undead():
+    plain = compute_sheet(YOYU)
+    character = _with_bane()
+    zombie = Target("Zombie", creature_type=CreatureType.UNDEAD)
+    orc = Target("Orc", creature_type=CreatureType.HUMANOID)
+
+    undead_attack = get_sheet(character, zombie).full_attack
+    other_attack = get_sheet(character, orc).full_attack
+    assert [attack.bonus for attack in other_attack] == [
+        attack.bonus for attack in plain.full_attack
+    ]
+    assert [attack.bonus for attack in undead_attack] == [
+        attack.bonus + 2 for attack in plain.full_attack
+    ]
+    assert get_sheet(character, zombie).attack_string != plain.attack_string
+
+
+@pytest.mark.parametrize(
+    "alignment, component, expected",
+    [
+        (Alignment.NEUTRAL, "Neutral", True),
+        (Alignment.LAWFUL_NEUTRAL, "Neutral", True),
+        (Alignment.NEUTRAL_EVIL, "Neutral", True),
+        (Alignment.LAWFUL_GOOD, "Neutral", False),
+        (Alignment.NEUTRAL_EVIL, "Evil", True),
+        (Alignment.NEUTRAL, "Evil", False),
+        (Alignment.CHAOTIC_GOOD, "Chaotic", True),
+    ],
+)
+def test_alignment_components(alignment, component, expected):
+    assert alignment.has(component) is expected
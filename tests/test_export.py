@@ -0,0 +1,38 @@
+import io
+import json
+
+from pfchar.export import export_sheets
+from pfchar.importer import build_character, iter_json_records
+from pfchar.sheet import compute_sheet
+
+EZREN = {
+    "name": "Ezren",
+    "level": 5,
+    "statistics": {"Intelligence": 18},
+    "base_attack_bonus": 2,
+    "saves": {"Will": 4},
+    "items": ["Ring of Protection +1"],
+}
+
+
+def _ezren():
+    (record,) = iter_json_records(io.BytesIO(json.dumps(EZREN).encode()))
+    return build_character(record)
+
+
+def test_sheet_without_a_weapon():
+    character = _ezren()
+    assert character.main_hand is None
+
+    sheet = compute_sheet(character)
+    assert sheet.attack == {}
+    assert sheet.damage == {}
+    assert sheet.full_attack == ()
+    assert sheet.total_ac == 11
+
+
+def test_export_without_a_weapon(tmp_path):
+    report = export_sheets([_ezren()], tmp_path, processes=1)
+    assert report.errors == []
+    assert report.rendered == ["Ezren"]
+    assert "Ezren" in (tmp_path / "index.html").read_text()
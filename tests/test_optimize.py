@@ -0,0 +1,40 @@
+import pytest
+
+from pfchar.char.catalog import default_catalog
+from pfchar.char.character import Character
+from pfchar.optimize import Candidate, optimize_loadout
+from pfchar.premade import YOYU
+
+
+def test_enchantment_candidates():
+    catalog = default_catalog()
+    flaming = Candidate(catalog.create("Flaming"), cost=8000)
+    bulls_strength = Candidate(catalog.create("Bull's Strength"), cost=1000)
+    enchantments = list(YOYU.main_hand.enchantments)
+    fingerprint = YOYU.fingerprint
+
+    loadout = optimize_loadout(YOYU, [flaming, bulls_strength], "dpr", target_ac=30)
+
+    assert sorted(candidate.effect.name for candidate in loadout.candidates) == [
+        "Bull's Strength",
+        "Flaming",
+    ]
+    assert YOYU.main_hand.enchantments == enchantments
+    assert YOYU.fingerprint == fingerprint
+
+
+def test_enchantment_candidates_need_a_weapon():
+    flaming = Candidate(default_catalog().create("Flaming"))
+    with pytest.raises(ValueError):
+        optimize_loadout(Character("Ezren"), [flaming], "dpr")
+
+
+def test_ties_go_to_the_cheaper_loadout():
+    catalog = default_catalog()
+    expensive = Candidate(catalog.create("Ring of Protection (+3)"), "ring", 8000)
+    cheap = Candidate(catalog.create("Ring of Protection (+3)"), "ring", 4000)
+
+    loadout = optimize_loadout(YOYU, [expensive, cheap], "ac")
+
+    assert loadout.candidates == (cheap,)
+    assert loadout.cost == 4000
@@ -0,0 +1,38 @@
+import random
+
+from pfchar.char.base import Attack, CriticalBonus, Dice
+from pfchar.rolls import RollLog
+
+
+def test_expected_damage_doesnt_drift():
+    log = RollLog(capacity=3, rng=random.Random(1))
+    dice = [[Dice(num=1, sides=sides, modifier=1)] for sides in (3, 4, 6, 8, 10)]
+    for i in range(10_000):
+        log.roll_damage(dice[i % len(dice)])
+    expected = [roll.expected for roll in log.recent()]
+    assert log.statistics().expected_damage == sum(expected) / len(expected)
+
+
+def test_damage_of_each_hit():
+    attack = Attack(
+        weapon="Longsword",
+        bonus=10,
+        damage=(Dice(num=1, sides=8), Dice(num=5)),
+        extra_damage=(Dice(num=1, sides=6),),
+        critical=CriticalBonus(crit_range=15, crit_multiplier=3),
+    )
+    log = RollLog(armour_class=20, rng=random.Random(4))
+    attacks = log.roll_attacks([attack] * 20)
+    hits = [roll for roll in attacks if roll.hit]
+    assert any(roll.critical for roll in hits)
+    assert not all(roll.hit for roll in attacks)
+
+    damage = log.roll_hit_damage()
+    assert [roll.critical for roll in damage] == [roll.critical for roll in hits]
+    for roll in damage:
+        if roll.critical:
+            assert roll.dice == "3d8+1d6 +15"
+            assert 20 <= roll.total <= 45
+        else:
+            assert roll.dice == "1d8+1d6 +5"
+    assert log.roll_hit_damage() is None
@@ -0,0 +1,26 @@
+import random
+
+from pfchar.char.base import DamageType, Dice
+from pfchar.saving_throws import area_save
+
+
+def test_area_save_halves_the_total():
+    damage = [Dice(num=3, type=DamageType.FIRE), Dice(num=3, type=DamageType.COLD)]
+    result = area_save(damage, dc=15, bonuses=[5] * 40, rng=random.Random(2))
+
+    assert set(result.saved) == {True, False}
+    assert result.damage == tuple(3 if made else 6 for made in result.saved)
+
+
+def test_area_save_without_dice():
+    damage = [
+        Dice(num=0, sides=6, modifier=2),
+        Dice(num=1, sides=6, type=DamageType.FIRE),
+    ]
+    result = area_save(
+        damage, dc=15, bonuses=[0] * 10, shared_damage=False, rng=random.Random(3)
+    )
+
+    assert len(result.damage) == 10
+    for total, made in zip(result.damage, result.saved):
+        assert (1 if made else 3) <= total <= (4 if made else 8)
@@ -0,0 +1,35 @@
+import copy
+
+import pytest
+
+from pfchar.char.base import Statistic
+from pfchar.premade import ALL_CHARACTERS, YOYU
+from pfchar.sheet import compute_sheet
+from pfchar.utils import create_status_effect
+from pfchar.wire import WireFormatError, decode_sheet, encode_sheet
+
+
+@pytest.mark.parametrize("character", ALL_CHARACTERS, ids=lambda character: character.name)
+def test_sheet_round_trip(character):
+    sheet = compute_sheet(character)
+    assert decode_sheet(encode_sheet(sheet)) == sheet
+
+
+def test_negative_statistic():
+    character = copy.deepcopy(YOYU)
+    character.add_status(
+        create_status_effect("Cursed", statistics={Statistic.STRENGTH: -40})
+    )
+    sheet = compute_sheet(character)
+    base, modified = sheet.statistics[Statistic.STRENGTH]
+    assert modified < 0
+
+    decoded = decode_sheet(encode_sheet(sheet))
+    assert decoded.statistics[Statistic.STRENGTH] == (base, modified)
+    assert decoded == sheet
+
+
+def test_truncated_message():
+    data = encode_sheet(compute_sheet(YOYU))
+    with pytest.raises(WireFormatError):
+        decode_sheet(data[:-1])